@@ -0,0 +1,113 @@
+import threading
+import time
+
+from django.utils.functional import cached_property
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import (
+    JWTStatelessUserAuthentication
+)
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from users.models import RolesChoices
+
+# Поля пользователя, которые копируются в токен и в ClaimsUser.
+USER_CLAIMS = ('username', 'role', 'is_superuser')
+
+
+def get_user_claims(user):
+    return {claim: getattr(user, claim) for claim in USER_CLAIMS}
+
+
+class ClaimsAccessToken(AccessToken):
+    """Токен доступа с именем, ролью и признаком суперпользователя."""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for claim, value in get_user_claims(user).items():
+            token[claim] = value
+        return token
+
+
+class ClaimsUser(TokenUser):
+    """Пользователь, собранный из утверждений токена без запроса к БД."""
+
+    @cached_property
+    def role(self):
+        return self.token.get('role', RolesChoices.USER)
+
+    @property
+    def is_admin(self):
+        return self.role == RolesChoices.ADMIN or self.is_superuser
+
+    @property
+    def is_moderator(self):
+        return self.role == RolesChoices.MODERATOR
+
+
+class UserChanges:
+    """Недавние изменения пользователей в памяти процесса.
+
+    Изменение хранится, пока могут быть действительны токены, выданные до
+    него, то есть не дольше срока жизни токена доступа. Для таких токенов
+    утверждения заменяются текущими данными пользователя, а токены
+    удалённых и заблокированных пользователей отклоняются.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.changes = {}
+
+    @property
+    def ttl(self):
+        return api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()
+
+    def record(self, user_id, claims):
+        """Запоминает изменение; `claims` равно None для удалённых."""
+        now = time.time()
+        with self.lock:
+            self.changes = {
+                key: change for key, change in self.changes.items()
+                if change[0] > now - self.ttl
+            }
+            self.changes[user_id] = (now, claims)
+
+    def get(self, user_id, issued_at):
+        """Возвращает (изменено ли, текущие утверждения) для токена."""
+        changed_at, claims = self.changes.get(user_id, (0, None))
+        if changed_at <= issued_at or changed_at < time.time() - self.ttl:
+            return False, None
+        return True, claims
+
+    def clear(self):
+        with self.lock:
+            self.changes = {}
+
+
+user_changes = UserChanges()
+
+
+class StatelessJWTAuthentication(JWTStatelessUserAuthentication):
+    """Аутентификация по JWT без запроса пользователя из БД.
+
+    Роль и права берутся из утверждений, выданных ClaimsAccessToken.
+    Изменения пользователей учитываются через user_changes, которые
+    заполняют сигналы из api/signals.py. Изменения, сделанные в другом
+    процессе, вступают в силу после истечения выданных ранее токенов.
+    """
+
+    def get_user(self, validated_token):
+        user = super().get_user(validated_token)
+        changed, claims = user_changes.get(
+            user.id, validated_token.get('iat', 0)
+        )
+        if not changed:
+            return ClaimsUser(validated_token)
+        if claims is None:
+            raise AuthenticationFailed(
+                'Пользователь удалён или заблокирован.',
+                code='user_inactive'
+            )
+        return ClaimsUser({**validated_token.payload, **claims})
@@ -0,0 +1,230 @@
+import time
+from hashlib import md5
+from uuid import uuid4
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from api.routers import replica_may_lag
+
+VERSION_KEY = 'api:version:{}'
+RESPONSE_KEY = 'api:response:{}'
+STATS_KEY = 'api:stats:{}:{}'
+CACHE_HEADER = 'X-Cache'
+
+
+def get_cache():
+    return caches[settings.API_CACHE_ALIAS]
+
+
+def is_shared_cache():
+    """Общий ли кэш API для процессов сервера (не память процесса)."""
+    return not isinstance(get_cache(), LocMemCache)
+
+
+def new_version():
+    """Возвращает уникальную метку версии с временем изменения."""
+    return f'{time.time():.6f}:{uuid4().hex[:12]}'
+
+
+def get_versions(*names):
+    """Возвращает текущие метки версий, создавая недостающие."""
+    cache = get_cache()
+    keys = [VERSION_KEY.format(name) for name in names]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, new_version(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def version_time(version):
+    """Время изменения, записанное в метке версии."""
+    return float(version.split(':')[0])
+
+
+def bump_versions(*names):
+    """Помечает данные изменёнными: старые ключи кэша перестают совпадать."""
+    get_cache().set_many(
+        {VERSION_KEY.format(name): new_version() for name in names},
+        timeout=None
+    )
+
+
+def build_response_key(request, versions):
+    """Ключ ответа: адрес, нормализованные параметры запроса и версии."""
+    params = sorted(
+        (key, sorted(value for value in values if value))
+        for key, values in request.query_params.lists()
+    )
+    raw = repr((
+        request.build_absolute_uri(request.path),
+        [(key, values) for key, values in params if values],
+        versions,
+    ))
+    return RESPONSE_KEY.format(md5(raw.encode()).hexdigest())
+
+
+def record_lookup(resource, outcome):
+    """Увеличивает счётчик попаданий или промахов ресурса."""
+    cache = get_cache()
+    key = STATS_KEY.format(resource, outcome)
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, timeout=None)
+
+
+def get_stats(resources):
+    """Возвращает счётчики попаданий и промахов по ресурсам."""
+    keys = {
+        (resource, outcome): STATS_KEY.format(resource, outcome)
+        for resource in resources
+        for outcome in ('hit', 'miss')
+    }
+    values = get_cache().get_many(keys.values())
+    return {
+        resource: {
+            outcome: values.get(keys[resource, outcome], 0)
+            for outcome in ('hit', 'miss')
+        }
+        for resource in resources
+    }
+
+
+class CachedListMixin:
+    """Кэширует ответы list() до изменения данных, от которых они зависят.
+
+    `cache_dependencies` перечисляет имена версий, которые сбрасываются
+    сигналами из api/signals.py, в том числе сигналом bulk_changed от
+    записи через update() и bulk_create() в командах и запросах.
+    """
+
+    cache_dependencies = ()
+
+    def list(self, request, *args, **kwargs):
+        key, versions, response = self.get_cached_response(request)
+        if response is None:
+            response = self.cache_response(
+                key, versions, super().list(request, *args, **kwargs)
+            )
+        return response
+
+    async def alist(self, request, *args, **kwargs):
+        key, versions, response = await sync_to_async(
+            self.get_cached_response
+        )(request)
+        if response is None:
+            response = await sync_to_async(self.cache_response)(
+                key, versions, await super().alist(request, *args, **kwargs)
+            )
+        return response
+
+    def get_cached_response(self, request):
+        """Ключ, версии и ответ из кэша (None при промахе)."""
+        versions = get_versions(*self.cache_dependencies)
+        key = build_response_key(request, versions)
+        data = get_cache().get(key)
+        if data is None:
+            record_lookup(self.basename, 'miss')
+            return key, versions, None
+        record_lookup(self.basename, 'hit')
+        return key, versions, Response(data, headers={CACHE_HEADER: 'HIT'})
+
+    def cache_response(self, key, versions, response):
+        if response.status_code == status.HTTP_200_OK and not replica_may_lag(
+            max(map(version_time, versions), default=0)
+        ):
+            get_cache().set(key, response.data)
+        response[CACHE_HEADER] = 'MISS'
+        return response
+
+
+class ConditionalGetMixin:
+    """Поддерживает ETag и Last-Modified для list() и retrieve().
+
+    Валидаторы строятся из меток версий (`get_version_names`), поэтому
+    ответ 304 отдаётся без запросов к данным и без сериализации. Метки
+    хранятся в кэше API: если он в памяти процесса, запись в одном
+    процессе сервера не меняет меток других, и они отвечали бы 304 на
+    устаревшие данные, поэтому валидаторы выдаются только с общим кэшем.
+    """
+
+    def get_version_names(self):
+        return ()
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    async def alist(self, request, *args, **kwargs):
+        return await self.aconditional_response(
+            super().alist, request, *args, **kwargs
+        )
+
+    async def aretrieve(self, request, *args, **kwargs):
+        return await self.aconditional_response(
+            super().aretrieve, request, *args, **kwargs
+        )
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        validators = self.get_validators(request)
+        if validators is None:
+            return handler(request, *args, **kwargs)
+        response = get_conditional_response(request, **validators)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+        return self.set_validators(response, **validators)
+
+    async def aconditional_response(self, handler, request, *args, **kwargs):
+        validators = await sync_to_async(self.get_validators)(request)
+        if validators is None:
+            return await handler(request, *args, **kwargs)
+        response = get_conditional_response(request, **validators)
+        if response is None:
+            response = await handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+        return self.set_validators(response, **validators)
+
+    def get_validators(self, request):
+        """ETag и Last-Modified ответа или None.
+
+        None возвращается, если кэш API не общий или реплика отстаёт.
+        """
+        if not is_shared_cache():
+            return None
+        versions = get_versions(*self.get_version_names())
+        changed_at = max(map(version_time, versions), default=0)
+        if replica_may_lag(changed_at):
+            return None
+        return {
+            'etag': quote_etag(md5(repr((
+                request.get_full_path(),
+                request.accepted_renderer.format,
+                versions,
+            )).encode()).hexdigest()),
+            'last_modified': int(changed_at),
+        }
+
+    @staticmethod
+    def set_validators(response, etag, last_modified):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        return response
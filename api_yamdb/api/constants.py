@@ -0,0 +1,9 @@
+# размер пачки произведений при потоковой выгрузке
+EXPORT_CHUNK_SIZE = 1000
+
+# наибольшее число объектов в одном запросе массовой записи
+BULK_MAX_ITEMS = 500
+
+# число произведений в подборке /titles/top/: по умолчанию и наибольшее
+TOP_TITLES_LIMIT = 10
+TOP_TITLES_MAX_LIMIT = 100
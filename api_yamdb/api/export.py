@@ -0,0 +1,62 @@
+import csv
+import json
+
+from django.db.models import Prefetch
+from rest_framework.utils.encoders import JSONEncoder
+
+from api.serializers import ReviewSerializer, TitleReadSerializer
+from reviews.models import Review, Title
+
+CSV_FIELDS = (
+    'id', 'name', 'year', 'description', 'category', 'genre', 'rating'
+)
+
+
+class Echo:
+    """Псевдобуфер для csv.writer: возвращает записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+def iterate_titles(chunk_size, with_reviews=False):
+    """Обходит каталог пачками, подгружая связи для каждой пачки."""
+    queryset = (
+        Title.objects
+        .select_related('category')
+        .prefetch_related('genre')
+        .order_by('pk')
+    )
+    if with_reviews:
+        queryset = queryset.prefetch_related(Prefetch(
+            'reviews',
+            queryset=Review.objects.select_related('author').order_by('pk')
+        ))
+    for title in queryset.iterator(chunk_size=chunk_size):
+        data = TitleReadSerializer(title).data
+        if with_reviews:
+            data['reviews'] = ReviewSerializer(
+                title.reviews.all(), many=True
+            ).data
+        yield data
+
+
+def ndjson_lines(titles):
+    for data in titles:
+        yield json.dumps(data, cls=JSONEncoder, ensure_ascii=False) + '\n'
+
+
+def csv_lines(titles):
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_FIELDS)
+    for data in titles:
+        category = data['category']
+        yield writer.writerow((
+            data['id'],
+            data['name'],
+            data['year'],
+            data['description'],
+            category['slug'] if category else '',
+            ','.join(genre['slug'] for genre in data['genre']),
+            '' if data['rating'] is None else data['rating'],
+        ))
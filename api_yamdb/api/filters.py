@@ -1,13 +1,31 @@
 import django_filters as df
+from rest_framework import filters
 
 from reviews.models import Title
+from reviews.search import full_text_search
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """Поиск `?search=` по индексу FTS5 с откатом на LIKE."""
+
+    def filter_queryset(self, request, queryset, view):
+        found = full_text_search(queryset, self.get_search_terms(request))
+        if found is None:
+            return super().filter_queryset(request, queryset, view)
+        return found
 
 
 class TitleFilter(df.FilterSet):
     category = df.CharFilter(field_name='category__slug', lookup_expr='exact')
     genre = df.CharFilter(field_name='genre__slug', lookup_expr='exact')
-    name = df.CharFilter(field_name='name', lookup_expr='icontains')
+    name = df.CharFilter(method='filter_name')
 
     class Meta:
         model = Title
         fields = ('category', 'genre', 'name', 'year')
+
+    def filter_name(self, queryset, name, value):
+        found = full_text_search(queryset, (value,))
+        if found is None:
+            return queryset.filter(name__icontains=value)
+        return found
@@ -0,0 +1,66 @@
+import sqlite3
+import time
+from contextlib import closing
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    """Копирование основной базы SQLite в реплики."""
+
+    help = (
+        'Копирует основную базу SQLite в реплики из DATABASE_REPLICAS '
+        'через backup API. Заменяет репликацию СУБД при локальной работе.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='повторять копирование, пока команду не остановят',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1,
+            help='пауза между копированиями в режиме --loop, с',
+        )
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError(
+                'Реплики не настроены: задайте DATABASE_REPLICAS.'
+            )
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != 'sqlite':
+            raise CommandError(
+                'Команда копирует только SQLite, для других СУБД '
+                'используйте их собственную репликацию.'
+            )
+        if (
+            options['loop']
+            and options['interval'] >= settings.REPLICA_LAG_SECONDS
+        ):
+            self.stderr.write(
+                'Интервал не меньше REPLICA_LAG_SECONDS: клиенты могут не '
+                'увидеть свои изменения.'
+            )
+        while True:
+            started = time.perf_counter()
+            self.sync(primary)
+            self.stdout.write(self.style.SUCCESS(
+                f'Реплики обновлены: {len(settings.DATABASE_REPLICAS)} '
+                f'за {time.perf_counter() - started:.2f} с'
+            ))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+    def sync(self, primary):
+        primary.ensure_connection()
+        for alias in settings.DATABASE_REPLICAS:
+            name = str(connections[alias].settings_dict['NAME'])
+            with closing(sqlite3.connect(name)) as replica:
+                primary.connection.backup(replica)
@@ -0,0 +1,191 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+from functools import wraps
+
+# Верхние границы корзин гистограмм длительности, в секундах.
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+UNRESOLVED_ROUTE = 'unresolved'
+
+current_request = ContextVar('current_request_metrics', default=None)
+
+
+class RequestMetrics:
+    """Замеры одного запроса.
+
+    Экземпляр передаётся в connection.execute_wrapper() и считает
+    запросы к БД и время их выполнения. `database` и `routing` заполняет
+    ReplicaRoutingMiddleware, если настроены реплики.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.database = None
+        self.routing = None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += time.perf_counter() - started
+
+    def time_serializer(self, to_representation):
+        @wraps(to_representation)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return to_representation(*args, **kwargs)
+            finally:
+                self.serializer_time += time.perf_counter() - started
+        return wrapper
+
+
+class Histogram:
+    """Гистограмма в формате Prometheus: накопительные корзины."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def samples(self):
+        cumulative = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            cumulative += count
+            yield str(bound), cumulative
+
+
+class MetricsRegistry:
+    """Метрики запросов процесса, сгруппированные по имени маршрута.
+
+    Значения хранятся в памяти процесса: при нескольких процессах
+    сервера каждый отдаёт свои метрики.
+    """
+
+    # имя метрики: (тип, описание, имена меток)
+    metrics = {
+        'api_request_duration_seconds': (
+            'histogram', 'Время обработки запроса.', ('route',)
+        ),
+        'api_db_duration_seconds': (
+            'histogram', 'Время запросов к БД за запрос.', ('route',)
+        ),
+        'api_serializer_duration_seconds': (
+            'histogram', 'Время сериализации ответа.', ('route',)
+        ),
+        'api_requests_total': (
+            'counter', 'Число обработанных запросов.', ('route', 'status')
+        ),
+        'api_db_queries_total': (
+            'counter', 'Число запросов к БД.', ('route',)
+        ),
+        'api_response_bytes_total': (
+            'counter', 'Объём тел ответов в байтах.', ('route',)
+        ),
+        'api_db_routing_total': (
+            'counter', 'Выбор базы данных для чтения.',
+            ('route', 'database', 'reason')
+        ),
+    }
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            self.values = {
+                name: defaultdict(Histogram if kind == 'histogram' else int)
+                for name, (kind, _, _) in self.metrics.items()
+            }
+
+    def observe(self, route, status, duration, metrics, size):
+        with self.lock:
+            values = self.values
+            values['api_request_duration_seconds'][route,].observe(duration)
+            values['api_db_duration_seconds'][route,].observe(
+                metrics.db_time
+            )
+            values['api_serializer_duration_seconds'][route,].observe(
+                metrics.serializer_time
+            )
+            values['api_requests_total'][route, str(status)] += 1
+            values['api_db_queries_total'][route,] += metrics.queries
+            values['api_response_bytes_total'][route,] += size
+            if metrics.routing:
+                values['api_db_routing_total'][
+                    route, metrics.database, metrics.routing
+                ] += 1
+
+    def render(self, cache_stats=(), outbox_stats=()):
+        """Возвращает метрики в текстовом формате Prometheus.
+
+        `cache_stats` — счётчики кэша ответов в формате get_stats(),
+        `outbox_stats` — пары (состояние, число писем) таблицы исходящих.
+        """
+        lines = []
+        with self.lock:
+            for name, (kind, help_text, label_names) in self.metrics.items():
+                lines += (f'# HELP {name} {help_text}',
+                          f'# TYPE {name} {kind}')
+                for values, metric in sorted(self.values[name].items()):
+                    labels = dict(zip(label_names, values))
+                    if kind == 'counter':
+                        lines.append(f'{name}{format_labels(labels)} {metric}')
+                        continue
+                    for bound, count in metric.samples():
+                        lines.append(
+                            f'{name}_bucket'
+                            f'{format_labels({**labels, "le": bound})} {count}'
+                        )
+                    lines.append(
+                        f'{name}_sum{format_labels(labels)} {metric.sum}'
+                    )
+                    lines.append(
+                        f'{name}_count{format_labels(labels)} '
+                        f'{sum(metric.counts)}'
+                    )
+        lines += render_samples(
+            'api_cache_lookups_total', 'counter', 'Обращения к кэшу ответов.',
+            (
+                ({'resource': resource, 'outcome': outcome}, total)
+                for resource, outcomes in sorted(dict(cache_stats).items())
+                for outcome, total in sorted(outcomes.items())
+            )
+        )
+        lines += render_samples(
+            'api_email_outbox', 'gauge', 'Письма в таблице исходящих.',
+            (({'state': state}, total) for state, total in outbox_stats)
+        )
+        return '\n'.join(lines) + '\n'
+
+
+def render_samples(name, kind, help_text, samples):
+    """Строки метрики из пар (метки, значение)."""
+    return [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}'] + [
+        f'{name}{format_labels(labels)} {value}' for labels, value in samples
+    ]
+
+
+def format_labels(labels):
+    """Форматирует метки, экранируя значения по правилам Prometheus."""
+    return '{' + ','.join(
+        '{}="{}"'.format(key, str(value).replace('\\', r'\\')
+                         .replace('"', r'\"').replace('\n', r'\n'))
+        for key, value in labels.items()
+    ) + '}'
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,166 @@
+import random
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import (
+    iscoroutinefunction, markcoroutinefunction, sync_to_async
+)
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+
+from api.cache import get_cache
+from api.metrics import (
+    UNRESOLVED_ROUTE, RequestMetrics, current_request, registry
+)
+from api.routers import get_pin_key, read_database
+
+
+class AsyncCapableMiddleware:
+    """Middleware для синхронной и асинхронной цепочки обработчиков.
+
+    Если следующий обработчик — корутина (ASGI и асинхронное
+    представление), запрос обрабатывает __acall__(), иначе process().
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.process(request)
+
+
+class PerformanceMetricsMiddleware(AsyncCapableMiddleware):
+    """Замеряет запрос и учитывает его в метриках маршрута.
+
+    Считаются полное время обработки, число и время запросов к БД,
+    время сериализации (см. TimedSerializerMixin) и размер тела ответа;
+    у потоковых ответов размер не учитывается. Должен стоять первым в
+    MIDDLEWARE, чтобы в замер попали остальные middleware.
+    """
+
+    def process(self, request):
+        metrics = RequestMetrics()
+        token = current_request.set(metrics)
+        started = time.perf_counter()
+        try:
+            with wrap_connections(metrics):
+                response = self.get_response(request)
+        finally:
+            current_request.reset(token)
+        return observe(request, response, metrics, started)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = current_request.set(metrics)
+        started = time.perf_counter()
+        # Соединения с БД привязаны к потоку: запросы асинхронного ORM и
+        # sync_to_async() выполняются в одном потоке для синхронного кода,
+        # поэтому замер подключается к соединениям этого потока.
+        stack = await sync_to_async(wrap_connections)(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+            current_request.reset(token)
+        return observe(request, response, metrics, started)
+
+
+def wrap_connections(metrics):
+    """Подключает замер ко всем соединениям с БД текущего потока."""
+    stack = ExitStack()
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(metrics))
+    return stack
+
+
+def observe(request, response, metrics, started):
+    match = request.resolver_match
+    registry.observe(
+        route=match.view_name if match else UNRESOLVED_ROUTE,
+        status=response.status_code,
+        duration=time.perf_counter() - started,
+        metrics=metrics,
+        size=0 if response.streaming else len(response.content),
+    )
+    return response
+
+
+class ReplicaRoutingMiddleware(AsyncCapableMiddleware):
+    """Направляет чтение безопасных запросов в случайную реплику.
+
+    Запросы с записью выполняются в основной базе, после успешной записи
+    клиент (по заголовку Authorization или адресу) REPLICA_LAG_SECONDS
+    читает из основной базы и видит свои изменения. Метка о закреплении
+    хранится в кэше API, поэтому между процессами сервера она действует
+    только с общим бэкендом кэша. Выбор базы и его причина попадают в
+    метрику api_db_routing_total.
+    """
+
+    def process(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+        pin_key = get_pin_key(request)
+        token = self.route(
+            request, request.method in SAFE_METHODS
+            and get_cache().get(pin_key)
+        )
+        try:
+            response = self.get_response(request)
+        finally:
+            read_database.reset(token)
+        if self.pins(request, response):
+            get_cache().set(
+                pin_key, True, timeout=settings.REPLICA_LAG_SECONDS
+            )
+        return response
+
+    async def __acall__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return await self.get_response(request)
+        pin_key = get_pin_key(request)
+        token = self.route(
+            request, request.method in SAFE_METHODS
+            and await get_cache().aget(pin_key)
+        )
+        try:
+            response = await self.get_response(request)
+        finally:
+            read_database.reset(token)
+        if self.pins(request, response):
+            await get_cache().aset(
+                pin_key, True, timeout=settings.REPLICA_LAG_SECONDS
+            )
+        return response
+
+    @staticmethod
+    def route(request, pinned):
+        """Выбирает базу для чтения и возвращает токен контекста."""
+        if request.method not in SAFE_METHODS:
+            database, reason = DEFAULT_DB_ALIAS, 'write'
+        elif pinned:
+            database, reason = DEFAULT_DB_ALIAS, 'pinned'
+        else:
+            database = random.choice(settings.DATABASE_REPLICAS)
+            reason = 'replica'
+        metrics = current_request.get()
+        if metrics:
+            metrics.database, metrics.routing = database, reason
+        return read_database.set(
+            None if database == DEFAULT_DB_ALIAS else database
+        )
+
+    @staticmethod
+    def pins(request, response):
+        """Нужно ли закрепить клиента за основной базой."""
+        return (
+            request.method not in SAFE_METHODS
+            and response.status_code < 400
+        )
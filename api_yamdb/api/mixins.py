@@ -1,3 +1,22 @@
+from functools import update_wrapper
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.http import Http404
+from django.shortcuts import aget_object_or_404
+from rest_framework import serializers, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from api.constants import BULK_MAX_ITEMS
+from api.metrics import current_request
+from api.permissions import IsAdmin
+from api.plans import get_plan, select_fields
+from reviews.models import bulk_changed
 from users.validators import username_validator
 
 
@@ -6,3 +25,432 @@ class ValidateUsernameMixin:
 
     def validate_username(self, username):
         return username_validator(username)
+
+
+class TimedSerializerMixin:
+    """Учитывает время сериализации ответа в метриках запроса."""
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        metrics = current_request.get()
+        if metrics is not None:
+            serializer.to_representation = metrics.time_serializer(
+                serializer.to_representation
+            )
+        return serializer
+
+
+class SparseFieldsMixin:
+    """Параметр ?fields= для list() и retrieve().
+
+    В ответ попадают только перечисленные через запятую поля сериализатора,
+    а запрос к БД загружает через only() только их столбцы: JOIN и
+    prefetch_related() для незапрошенных связей не выполняются. Столбцы,
+    по которым пагинация строит курсор, и поля из `sparse_required_fields`
+    загружаются всегда.
+    """
+
+    fields_query_param = 'fields'
+    sparse_actions = ('list', 'retrieve')
+    sparse_required_fields = ()
+
+    def get_requested_fields(self):
+        """Запрошенные поля в порядке сериализатора или None."""
+        if not hasattr(self, '_requested_fields'):
+            self._requested_fields = self.parse_fields()
+        return self._requested_fields
+
+    def parse_fields(self):
+        value = self.request.query_params.get(self.fields_query_param)
+        if value is None or self.action not in self.sparse_actions:
+            return None
+        fields = self.get_serializer_class()().fields
+        available = tuple(
+            name for name, field in fields.items() if not field.write_only
+        )
+        names = {name.strip() for name in value.split(',')} - {''}
+        if not names or names - set(available):
+            raise ValidationError({self.fields_query_param: [
+                'Допустимые значения: ' + ', '.join(available) + '.'
+            ]})
+        return tuple(name for name in available if name in names)
+
+    def get_required_fields(self):
+        """Поля модели, по которым пагинация строит курсор."""
+        return tuple(
+            name.lstrip('-')
+            for name in getattr(self.paginator, 'ordering', ())
+        )
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        fields = self.get_requested_fields()
+        if fields:
+            select_fields(getattr(serializer, 'child', serializer), fields)
+        return serializer
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        fields = self.get_requested_fields()
+        if fields is None:
+            return queryset
+        return self.restrict_queryset(
+            queryset, select_fields(self.get_serializer_class()(), fields)
+        )
+
+    def restrict_queryset(self, queryset, serializer):
+        """Загружает только столбцы и связи полей сериализатора."""
+        only = [
+            'pk', *self.sparse_required_fields, *self.get_required_fields()
+        ]
+        select, prefetch = [], []
+        for field in serializer.fields.values():
+            source = field.source
+            if (
+                '.' in source or source == '*'
+                or isinstance(field, serializers.SerializerMethodField)
+            ):
+                return queryset
+            if isinstance(field, serializers.ListSerializer):
+                prefetch.append(source)
+            elif isinstance(field, serializers.BaseSerializer):
+                select.append(source)
+                only.extend(
+                    f'{source}__{child.source}'
+                    for child in field.fields.values()
+                )
+            elif isinstance(field, serializers.SlugRelatedField):
+                select.append(source)
+                only.append(f'{source}__{field.slug_field}')
+            else:
+                only.append(source)
+        queryset = queryset.select_related(None).prefetch_related(None)
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset.only(*only)
+
+
+class FastListMixin:
+    """list() без ModelSerializer при API_FAST_JSON.
+
+    Строки страницы выбираются через values_list() и превращаются в данные
+    ответа планом сериализатора (api/plans.py), а ответ кодируется
+    FastJSONRenderer. Если для сериализатора нет плана, list() работает
+    как обычно. Ответ совпадает с обычным байт в байт.
+    """
+
+    fast_json = False
+
+    def get_plan(self):
+        if not settings.API_FAST_JSON:
+            return None
+        fields = self.get_requested_fields()
+        if fields is None:
+            return get_plan(self.get_serializer_class())
+        return get_plan(
+            self.get_serializer_class(), fields, self.get_required_fields()
+        )
+
+    def get_requested_fields(self):
+        """Поля параметра ?fields= (см. SparseFieldsMixin)."""
+        return None
+
+    def list(self, request, *args, **kwargs):
+        plan = self.get_plan()
+        if plan is None:
+            return super().list(request, *args, **kwargs)
+        queryset = plan.queryset(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.build_rows(plan, page))
+        return Response(self.build_rows(plan, queryset))
+
+    async def alist(self, request, *args, **kwargs):
+        plan = self.get_plan()
+        if plan is None:
+            return await super().alist(request, *args, **kwargs)
+        queryset = plan.queryset(
+            self.filter_queryset(await self.aget_queryset())
+        )
+        page = await self.apaginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(
+                await sync_to_async(self.build_rows)(plan, page)
+            )
+        rows = [row async for row in queryset]
+        return Response(await sync_to_async(self.build_rows)(plan, rows))
+
+    def build_rows(self, plan, rows):
+        self.fast_json = True
+        build = plan.build
+        metrics = current_request.get()
+        if metrics is not None:
+            build = metrics.time_serializer(build)
+        return build(rows)
+
+
+class AsyncReadMixin:
+    """Асинхронные list() и retrieve() для работы под ASGI.
+
+    При API_ASYNC_VIEWS as_view() возвращает корутину: действия из
+    `async_actions` выполняются методами alist() и aretrieve() через
+    асинхронный ORM, а сериализация — в потоке, чтобы не блокировать цикл
+    событий. Остальные действия и проверки доступа выполняются синхронным
+    кодом DRF в потоке. Ответы совпадают с ответами синхронных действий.
+    """
+
+    async_actions = ('list', 'retrieve')
+    async_dispatch = False
+
+    @classmethod
+    def as_view(cls, actions=None, **initkwargs):
+        if not (
+            settings.API_ASYNC_VIEWS
+            and set(cls.async_actions) & set((actions or {}).values())
+        ):
+            return super().as_view(actions, **initkwargs)
+        view = super().as_view(actions, async_dispatch=True, **initkwargs)
+
+        async def async_view(request, *args, **kwargs):
+            return await view(request, *args, **kwargs)
+
+        return update_wrapper(async_view, view)
+
+    def dispatch(self, request, *args, **kwargs):
+        if not self.async_dispatch:
+            return super().dispatch(request, *args, **kwargs)
+        if self.action_map.get(request.method.lower()) in self.async_actions:
+            return self.adispatch(request, *args, **kwargs)
+        return sync_to_async(super().dispatch)(request, *args, **kwargs)
+
+    async def adispatch(self, request, *args, **kwargs):
+        """Аналог APIView.dispatch() для асинхронных действий."""
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            handler = getattr(self, f'a{self.action}')
+            response = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        self.response = self.finalize_response(
+            request, response, *args, **kwargs
+        )
+        return self.response
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(await self.aget_queryset())
+        page = await self.apaginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(
+                await self.aserialize(page, many=True)
+            )
+        return Response(await self.aserialize(
+            [obj async for obj in queryset], many=True
+        ))
+
+    async def aretrieve(self, request, *args, **kwargs):
+        return Response(await self.aserialize(await self.aget_object()))
+
+    async def aget_queryset(self):
+        """Запрос объектов; переопределяется, если для него нужна БД."""
+        return self.get_queryset()
+
+    async def aget_object(self):
+        queryset = self.filter_queryset(await self.aget_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            obj = await aget_object_or_404(queryset, **{
+                self.lookup_field: self.kwargs[lookup_url_kwarg]
+            })
+        except (TypeError, ValueError, DjangoValidationError):
+            raise Http404
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    async def apaginate_queryset(self, queryset):
+        if self.paginator is None:
+            return None
+        return await self.paginator.apaginate_queryset(
+            queryset, self.request, view=self
+        )
+
+    async def aserialize(self, instance, **kwargs):
+        """Данные сериализатора, полученные в потоке."""
+        serializer = self.get_serializer(instance, **kwargs)
+        return await sync_to_async(lambda: serializer.data)()
+
+
+class BulkWriteMixin:
+    """Массовое создание (POST) и изменение (PATCH) объектов.
+
+    Запрос — список объектов; каждый проверяется отдельно, а ответ содержит
+    результат для каждого объекта в порядке запроса: `status` и `data` либо
+    `errors`. Всё, что нужно для проверки, загружается заранее в
+    get_bulk_context(), а запись выполняется одной транзакцией через
+    bulk_create() и bulk_update(). Сигналы моделей при этом не срабатывают,
+    поэтому после записи отправляется сигнал bulk_changed для модели.
+    """
+
+    bulk_serializer_class = None
+    bulk_lookup_field = 'id'
+
+    @action(
+        detail=False,
+        methods=('post', 'patch'),
+        permission_classes=(IsAdmin,),
+        url_path='bulk'
+    )
+    def bulk(self, request):
+        items = request.data
+        if not isinstance(items, list) or not items:
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [
+                'Ожидается непустой список объектов.'
+            ]})
+        if len(items) > BULK_MAX_ITEMS:
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [
+                f'Не больше {BULK_MAX_ITEMS} объектов за запрос.'
+            ]})
+        partial = request.method == 'PATCH'
+        results, valid = self.validate_bulk(items, partial)
+        if valid:
+            with transaction.atomic():
+                if partial:
+                    objects = self.perform_bulk_update(valid.values())
+                else:
+                    objects = self.perform_bulk_create(valid.values())
+            bulk_changed.send(sender=self.get_queryset().model)
+            data = self.get_bulk_representation(objects)
+            for index, item in zip(valid, data):
+                results[index] = {
+                    'status': (
+                        status.HTTP_200_OK if partial
+                        else status.HTTP_201_CREATED
+                    ),
+                    'data': item,
+                }
+        return Response(results)
+
+    def validate_bulk(self, items, partial):
+        """Возвращает результаты отклонённых объектов и проверенные."""
+        lookups, instances = [None] * len(items), {}
+        if partial:
+            lookups = [self.get_bulk_lookup(item) for item in items]
+            instances = self.get_queryset().in_bulk(
+                {lookup for lookup in lookups if lookup is not None},
+                field_name=self.bulk_lookup_field
+            )
+        context = {
+            **self.get_serializer_context(),
+            **self.get_bulk_context(items, instances),
+        }
+        results, valid, seen = [None] * len(items), {}, set()
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                results[index] = {
+                    'status': status.HTTP_400_BAD_REQUEST,
+                    'errors': {api_settings.NON_FIELD_ERRORS_KEY: [
+                        'Ожидается объект.'
+                    ]},
+                }
+                continue
+            instance = None
+            if partial:
+                instance, results[index] = self.get_bulk_instance(
+                    lookups[index], instances, seen
+                )
+                if instance is None:
+                    continue
+            serializer = self.bulk_serializer_class(
+                instance, data=item, partial=partial, context=context
+            )
+            if serializer.is_valid():
+                valid[index] = serializer
+                self.reserve_bulk_item(serializer, context)
+            else:
+                results[index] = {
+                    'status': status.HTTP_400_BAD_REQUEST,
+                    'errors': serializer.errors,
+                }
+        return results, valid
+
+    def get_bulk_instance(self, lookup, instances, seen):
+        """Возвращает изменяемый объект либо результат с ошибкой."""
+        if lookup is None:
+            return None, {
+                'status': status.HTTP_400_BAD_REQUEST,
+                'errors': {self.bulk_lookup_field: [
+                    'Укажите корректное значение.'
+                ]},
+            }
+        if lookup not in instances:
+            return None, {
+                'status': status.HTTP_404_NOT_FOUND,
+                'errors': {self.bulk_lookup_field: ['Объект не найден.']},
+            }
+        # оба изменения пришлись бы на один экземпляр из in_bulk()
+        if lookup in seen:
+            return None, {
+                'status': status.HTTP_400_BAD_REQUEST,
+                'errors': {self.bulk_lookup_field: [
+                    'Объект уже изменяется в этом запросе.'
+                ]},
+            }
+        seen.add(lookup)
+        return instances[lookup], None
+
+    def get_bulk_lookup(self, item):
+        """Приводит значение поля поиска к типу поля модели.
+
+        Возвращает None, если значение не задано или некорректно.
+        """
+        value = item.get(self.bulk_lookup_field) if isinstance(
+            item, dict
+        ) else None
+        if not isinstance(value, (int, str)) or isinstance(value, bool):
+            return None
+        field = self.get_queryset().model._meta.get_field(
+            self.bulk_lookup_field
+        )
+        try:
+            value = field.to_python(value)
+            field.run_validators(value)
+        except DjangoValidationError:
+            return None
+        return value
+
+    def get_bulk_context(self, items, instances):
+        """Данные, общие для проверки всех объектов запроса."""
+        return {}
+
+    def reserve_bulk_item(self, serializer, context):
+        """Отмечает в контексте данные объекта, прошедшего проверку."""
+
+    def perform_bulk_create(self, serializers):
+        model = self.get_queryset().model
+        return model.objects.bulk_create(
+            [model(**serializer.validated_data) for serializer in serializers]
+        )
+
+    def perform_bulk_update(self, serializers):
+        objects, fields = [], set()
+        for serializer in serializers:
+            for attr, value in serializer.validated_data.items():
+                setattr(serializer.instance, attr, value)
+                fields.add(attr)
+            objects.append(serializer.instance)
+        if fields:
+            self.get_queryset().model.objects.bulk_update(objects, fields)
+        return objects
+
+    def get_bulk_representation(self, objects):
+        """Сериализует записанные объекты, перечитав их одним запросом."""
+        saved = self.get_queryset().in_bulk([obj.pk for obj in objects])
+        return self.get_serializer(
+            [saved[obj.pk] for obj in objects], many=True
+        ).data
@@ -0,0 +1,161 @@
+from base64 import b64decode, b64encode
+from binascii import Error as BinasciiError
+
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class AsyncPageNumberPagination(PageNumberPagination):
+    """PageNumberPagination с асинхронной выборкой страницы.
+
+    apaginate_queryset() выполняет те же запросы, что и paginate_queryset(),
+    через асинхронный ORM: COUNT(*) — acount(), страницу — aiterator().
+    """
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        paginator = self.django_paginator_class(queryset, page_size)
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=page_number, message=str(exc)
+            ))
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        self.page.object_list = [
+            obj async for obj in
+            self.page.object_list.aiterator(chunk_size=page_size)
+        ]
+        return self.page.object_list
+
+
+class PubDateCursorPagination(AsyncPageNumberPagination):
+    """Постраничный вывод с необязательным режимом курсора.
+
+    По умолчанию работает как PageNumberPagination. Параметр
+    `?pagination=cursor` или переданный `cursor` включает keyset-пагинацию
+    по паре (pub_date, id): страница выбирается по индексу без COUNT(*) и
+    OFFSET, а ответ сохраняет привычные ключи `count`, `next`, `previous`
+    и `results` (`count` в этом режиме равен null).
+    """
+
+    cursor_query_param = 'cursor'
+    mode_query_param = 'pagination'
+    cursor_mode = 'cursor'
+    ordering = ('-pub_date', '-id')
+    invalid_cursor_message = 'Некорректный курсор.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.is_cursor_mode(request):
+            return super().paginate_queryset(queryset, request, view)
+        return self.get_cursor_page(list(
+            self.get_cursor_queryset(queryset, request)
+        ))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        if not self.is_cursor_mode(request):
+            return await super().apaginate_queryset(queryset, request, view)
+        return self.get_cursor_page([
+            obj async for obj in self.get_cursor_queryset(queryset, request)
+        ])
+
+    def is_cursor_mode(self, request):
+        self.use_cursor = (
+            self.cursor_query_param in request.query_params
+            or request.query_params.get(self.mode_query_param)
+            == self.cursor_mode
+        )
+        return self.use_cursor
+
+    def get_cursor_queryset(self, queryset, request):
+        """Запрос страницы после курсора с одним лишним объектом."""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.reverse, self.position = self.decode_cursor(request)
+        queryset = queryset.order_by(*self.ordering)
+        if self.position:
+            pub_date, pk = self.position
+            if self.reverse:
+                queryset = queryset.filter(
+                    Q(pub_date__gt=pub_date) | Q(pub_date=pub_date, pk__gt=pk)
+                ).reverse()
+            else:
+                queryset = queryset.filter(
+                    Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk)
+                )
+        return queryset[:self.page_size + 1]
+
+    def get_cursor_page(self, results):
+        """Отбрасывает лишний объект и запоминает соседние курсоры."""
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if self.reverse:
+            results.reverse()
+        has_next = self.position is not None if self.reverse else has_more
+        has_previous = (
+            has_more if self.reverse else self.position is not None
+        )
+        self.next_position = (
+            self.get_position(results[-1]) if has_next and results else None
+        )
+        self.previous_position = (
+            self.get_position(results[0]) if has_previous and results
+            else None
+        )
+        return results
+
+    def get_paginated_response(self, data):
+        if not self.use_cursor:
+            return super().get_paginated_response(data)
+        return Response({
+            'count': None,
+            'next': self.get_cursor_link(False, self.next_position),
+            'previous': self.get_cursor_link(True, self.previous_position),
+            'results': data,
+        })
+
+    @staticmethod
+    def get_position(obj):
+        return obj.pub_date, obj.pk
+
+    def get_cursor_link(self, reverse, position):
+        if position is None:
+            return None
+        url = remove_query_param(
+            self.request.build_absolute_uri(), self.page_query_param
+        )
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(reverse, position)
+        )
+
+    @staticmethod
+    def encode_cursor(reverse, position):
+        pub_date, pk = position
+        raw = f'{int(reverse)}|{pub_date.isoformat()}|{pk}'
+        return b64encode(raw.encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return False, None
+        try:
+            reverse, pub_date, pk = (
+                b64decode(encoded.encode(), validate=True).decode().split('|')
+            )
+            position = (parse_datetime(pub_date), int(pk))
+        except (BinasciiError, UnicodeDecodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if position[0] is None or reverse not in ('0', '1'):
+            raise NotFound(self.invalid_cursor_message)
+        return reverse == '1', position
@@ -25,7 +25,7 @@ class IsAuthorOrAdminOrModeratorOrReadOnly(permissions.BasePermission):
         if request.method in permissions.SAFE_METHODS:
             return True
         return (
-            obj.author == request.user
+            obj.author_id == request.user.id
             or request.user.is_moderator
             or request.user.is_admin
         )
@@ -0,0 +1,184 @@
+"""Планы сериализаторов для быстрого вывода списков.
+
+План строится один раз на класс сериализатора и набор полей ?fields=:
+для каждого поля известен столбец values_list() и функция преобразования
+значения. Вложенные сериализаторы внешних ключей превращаются в столбцы
+с JOIN, а сериализаторы связей многие-ко-многим — в один дополнительный
+запрос на страницу, как prefetch_related(). Результат совпадает с данными
+сериализатора; поля, для которых это не гарантировано (числа с плавающей
+точкой, методы, источники с точкой), делают план недоступным.
+"""
+from django.db.models import F, ManyToManyField
+from rest_framework import serializers
+
+PARENT_COLUMN = '_plan_parent'
+
+# Преобразования, которые делает to_representation() этих полей.
+CONVERTERS = (
+    (serializers.BooleanField, bool),
+    (serializers.IntegerField, int),
+    (serializers.CharField, str),
+)
+UNSUPPORTED_FIELDS = (
+    serializers.FloatField,
+    serializers.DecimalField,
+    serializers.SerializerMethodField,
+    serializers.ManyRelatedField,
+    serializers.HiddenField,
+)
+
+
+class UnsupportedField(Exception):
+    pass
+
+
+class RowPlan:
+    """Строит данные сериализатора из кортежей values_list()."""
+
+    def __init__(self, serializer, required=()):
+        if not isinstance(serializer, serializers.ModelSerializer):
+            raise UnsupportedField(type(serializer).__name__)
+        self.model = serializer.Meta.model
+        # первичный ключ и поля, по которым строится курсор страницы
+        self.columns = list(dict.fromkeys(('pk', *required)))
+        self.related = {}
+        self.getters = self.compile(serializer, '')
+
+    def add_column(self, lookup):
+        if lookup not in self.columns:
+            self.columns.append(lookup)
+        return self.columns.index(lookup)
+
+    def compile(self, serializer, prefix):
+        getters = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if (
+                '.' in field.source or field.source == '*'
+                or isinstance(field, UNSUPPORTED_FIELDS)
+            ):
+                raise UnsupportedField(name)
+            lookup = prefix + field.source
+            if isinstance(field, serializers.ListSerializer):
+                if prefix:
+                    raise UnsupportedField(name)
+                getters.append((name, self.compile_many(name, field)))
+            elif isinstance(field, serializers.BaseSerializer):
+                getters.append((name, nested_getter(
+                    self.add_column(f'{lookup}__pk'),
+                    self.compile(field, f'{lookup}__'),
+                )))
+            elif isinstance(field, serializers.SlugRelatedField):
+                getters.append((name, value_getter(
+                    self.add_column(f'{lookup}__{field.slug_field}'), None
+                )))
+            elif isinstance(field, serializers.RelatedField):
+                raise UnsupportedField(name)
+            else:
+                getters.append((name, value_getter(
+                    self.add_column(lookup), get_converter(field)
+                )))
+        return getters
+
+    def compile_many(self, name, field):
+        model_field = self.model._meta.get_field(field.source)
+        if not isinstance(model_field, ManyToManyField):
+            raise UnsupportedField(name)
+        plan = RowPlan(field.child)
+        if plan.related:
+            raise UnsupportedField(name)
+        self.related[name] = (model_field, plan)
+
+        def getter(row, related):
+            return related[name].get(row[0], [])
+        return getter
+
+    def queryset(self, queryset):
+        """Запрос кортежей плана на основе запроса объектов."""
+        return queryset.prefetch_related(None).values_list(
+            *self.columns, named=True
+        )
+
+    def build(self, rows):
+        """Данные сериализатора для строк, полученных через queryset()."""
+        related = {
+            name: self.fetch_related(field, plan, [row[0] for row in rows])
+            for name, (field, plan) in self.related.items()
+        }
+        return [
+            {name: getter(row, related) for name, getter in self.getters}
+            for row in rows
+        ]
+
+    @staticmethod
+    def fetch_related(field, plan, pks):
+        """Связанные объекты, сгруппированные по первичному ключу строки."""
+        if not pks:
+            return {}
+        query_name = field.related_query_name()
+        rows = (
+            field.related_model.objects
+            .filter(**{f'{query_name}__in': pks})
+            .annotate(**{PARENT_COLUMN: F(query_name)})
+            .values_list(*plan.columns, PARENT_COLUMN)
+        )
+        grouped = {}
+        for row in rows:
+            grouped.setdefault(row[-1], []).append({
+                name: getter(row, None) for name, getter in plan.getters
+            })
+        return grouped
+
+
+def get_converter(field):
+    for field_class, converter in CONVERTERS:
+        if type(field).to_representation is field_class.to_representation:
+            return converter
+    return field.to_representation
+
+
+def value_getter(index, converter):
+    if converter is None:
+        return lambda row, related: row[index]
+
+    def getter(row, related):
+        value = row[index]
+        return None if value is None else converter(value)
+    return getter
+
+
+def nested_getter(index, getters):
+    def getter(row, related):
+        if row[index] is None:
+            return None
+        return {name: get(row, related) for name, get in getters}
+    return getter
+
+
+_plans = {}
+
+
+def select_fields(serializer, fields):
+    """Оставляет в сериализаторе только поля из `fields`."""
+    for name in set(serializer.fields) - set(fields):
+        serializer.fields.pop(name)
+    return serializer
+
+
+def get_plan(serializer_class, fields=None, required=()):
+    """План сериализатора или None, если его поля не поддерживаются.
+
+    `fields` ограничивает план полями ?fields=, а `required` добавляет
+    столбцы модели, которые нужны пагинации.
+    """
+    key = (serializer_class, fields, required)
+    if key not in _plans:
+        serializer = serializer_class()
+        if fields:
+            select_fields(serializer, fields)
+        try:
+            _plans[key] = RowPlan(serializer, required)
+        except UnsupportedField:
+            _plans[key] = None
+    return _plans[key]
@@ -0,0 +1,36 @@
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer, кодирующий ответы быстрого пути через orjson.
+
+    Представление включает orjson атрибутом `fast_json`, когда данные
+    ответа состоят только из строк, целых чисел, логических значений и
+    None (см. api/plans.py): для них orjson выдаёт те же байты, что и
+    JSONRenderer с настройками по умолчанию, включая экранирование U+2028
+    и U+2029. Остальные ответы и ответы с отступами кодируются как обычно.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        view = (renderer_context or {}).get('view')
+        if (
+            orjson is None
+            or data is None
+            or not getattr(view, 'fast_json', False)
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            content = orjson.dumps(data)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        return content.replace(
+            '\u2028'.encode(), b'\\u2028'
+        ).replace('\u2029'.encode(), b'\\u2029')
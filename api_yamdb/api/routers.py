@@ -0,0 +1,52 @@
+import time
+from contextvars import ContextVar
+from hashlib import md5
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+PIN_KEY = 'api:pin:{}'
+
+# Реплика, из которой читает текущий запрос; None — основная база.
+read_database = ContextVar('read_database', default=None)
+
+
+class PrimaryReplicaRouter:
+    """Чтение — из реплики, выбранной ReplicaRoutingMiddleware, запись и
+    миграции — только в основную базу.
+
+    Вне запросов (команды, тесты) всё выполняется в основной базе.
+    """
+
+    def db_for_read(self, model, **hints):
+        return read_database.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+def get_pin_key(request):
+    """Ключ кэша, по которому клиент после записи читает основную базу."""
+    client = (
+        request.META.get('HTTP_AUTHORIZATION')
+        or request.META.get('REMOTE_ADDR', '')
+    )
+    return PIN_KEY.format(md5(client.encode()).hexdigest())
+
+
+def replica_may_lag(changed_at):
+    """Может ли реплика текущего запроса ещё не знать об изменении.
+
+    Реплики отстают не больше чем на REPLICA_LAG_SECONDS, поэтому ответы,
+    построенные по реплике вскоре после изменения, нельзя кэшировать.
+    """
+    return (
+        read_database.get() is not None
+        and time.time() - changed_at < settings.REPLICA_LAG_SECONDS
+    )
@@ -5,11 +5,15 @@ from django.core.mail import send_mail
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from rest_framework import serializers
-from rest_framework_simplejwt.tokens import AccessToken
+from rest_framework.validators import UniqueValidator
 
+from .authentication import ClaimsAccessToken
 from .mixins import ValidateUsernameMixin
+from reviews.constants import MAX_SCORE, MIN_SCORE
 from reviews.models import Category, Comment, Genre, Review, Title
+from reviews.ranking import current_trending
 from users.constants import MAX_USERNAME_LENGTH, MAX_EMAIL_LENGTH
+from users.models import OutboxEmail
 
 
 User = get_user_model()
@@ -68,13 +72,17 @@ class SignUpSerializer(serializers.Serializer, ValidateUsernameMixin):
         )
         user.confirmation_code = default_token_generator.make_token(user)
         user.save()
-        send_mail(
-            subject='YaMDb confirmation code',
-            message=f'Ваш код подтверждения: {user.confirmation_code}',
-            recipient_list=(user.email,),
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            fail_silently=False
-        )
+        email = {
+            'subject': 'YaMDb confirmation code',
+            'message': f'Ваш код подтверждения: {user.confirmation_code}',
+            'from_email': settings.DEFAULT_FROM_EMAIL,
+        }
+        if settings.EMAIL_OUTBOX:
+            OutboxEmail.objects.create(recipient=user.email, **email)
+        else:
+            send_mail(
+                recipient_list=(user.email,), fail_silently=False, **email
+            )
         return user
 
 
@@ -95,7 +103,7 @@ class GetTokenSerializer(serializers.Serializer):
 
     def create(self, validated_data):
         user = get_object_or_404(User, username=validated_data['username'])
-        return {'token': str(AccessToken.for_user(user))}
+        return {'token': str(ClaimsAccessToken.for_user(user))}
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -114,6 +122,34 @@ class GenreSerializer(serializers.ModelSerializer):
         fields = ('name', 'slug')
 
 
+class BulkSlugMixin:
+    """Проверяет уникальность слага без запроса на каждый объект.
+
+    Занятые слаги загружаются заранее в `context['taken_slugs']` и
+    пополняются слагами объектов, прошедших проверку (см.
+    BaseSlugViewSet.reserve_bulk_item), так что повтор внутри одного
+    запроса тоже отклоняется.
+    """
+
+    def validate_slug(self, slug):
+        taken = self.context['taken_slugs']
+        if slug != getattr(self.instance, 'slug', None) and slug in taken:
+            raise serializers.ValidationError(UniqueValidator.message)
+        return slug
+
+
+class CategoryBulkSerializer(BulkSlugMixin, CategorySerializer):
+    """Массовая запись категорий."""
+
+    slug = serializers.SlugField(max_length=50)
+
+
+class GenreBulkSerializer(BulkSlugMixin, GenreSerializer):
+    """Массовая запись жанров."""
+
+    slug = serializers.SlugField(max_length=50)
+
+
 class TitleWriteSerializer(serializers.ModelSerializer):
     """Создаёт и изменяет объекты модели Title."""
 
@@ -160,6 +196,37 @@ class TitleWriteSerializer(serializers.ModelSerializer):
         return value
 
 
+class TitleBulkSerializer(TitleWriteSerializer):
+    """Массовая запись произведений.
+
+    Категории и жанры берутся из `context['categories']` и
+    `context['genres']` — словарей, загруженных одним запросом на весь
+    список объектов.
+    """
+
+    category = serializers.SlugField()
+    genre = serializers.ListField(child=serializers.SlugField())
+
+    def resolve_slugs(self, objects, slugs):
+        missing = [slug for slug in slugs if slug not in objects]
+        if missing:
+            raise serializers.ValidationError([
+                serializers.SlugRelatedField.default_error_messages[
+                    'does_not_exist'
+                ].format(slug_name='slug', value=slug)
+                for slug in missing
+            ])
+        return [objects[slug] for slug in slugs]
+
+    def validate_category(self, slug):
+        return self.resolve_slugs(self.context['categories'], [slug])[0]
+
+    def validate_genre(self, slugs):
+        return super().validate_genre(
+            self.resolve_slugs(self.context['genres'], slugs)
+        )
+
+
 class TitleReadSerializer(serializers.ModelSerializer):
     """Возвращает все поля произведения с вложенными категориями и жанрами."""
 
@@ -180,6 +247,57 @@ class TitleReadSerializer(serializers.ModelSerializer):
         )
 
 
+class TitleRankingSerializer(TitleReadSerializer):
+    """Произведение с байесовским рейтингом и текущим трендом."""
+
+    weighted_rating = serializers.FloatField(
+        source='ranking.weighted_rating', read_only=True
+    )
+    trending = serializers.SerializerMethodField()
+
+    class Meta(TitleReadSerializer.Meta):
+        fields = TitleReadSerializer.Meta.fields + (
+            'weighted_rating', 'trending'
+        )
+
+    def get_trending(self, title):
+        return current_trending(title.ranking.trending, timezone.now())
+
+
+class TitleStatsSerializer(serializers.BaseSerializer):
+    """Статистика оценок по счётчикам вида {оценка: число отзывов}."""
+
+    def to_representation(self, counts):
+        histogram = {
+            score: counts.get(score, 0)
+            for score in range(MIN_SCORE, MAX_SCORE + 1)
+        }
+        total = sum(histogram.values())
+        return {
+            'count': total,
+            'mean': (
+                sum(score * count for score, count in histogram.items())
+                / total if total else None
+            ),
+            'median': self.get_median(histogram, total),
+            'histogram': {
+                str(score): count for score, count in histogram.items()
+            },
+        }
+
+    @staticmethod
+    def get_median(histogram, total):
+        if not total:
+            return None
+        middle, seen, lower = (total - 1) // 2, 0, None
+        for score, count in histogram.items():
+            seen += count
+            if lower is None and seen > middle:
+                lower = score
+            if seen > total // 2:
+                return (lower + score) / 2
+
+
 class ReviewSerializer(serializers.ModelSerializer):
     """Сериализатор отзыва."""
 
@@ -198,19 +316,6 @@ class ReviewSerializer(serializers.ModelSerializer):
             'pub_date'
         )
 
-    def validate(self, attrs):
-        request = self.context.get('request')
-        if request and self.instance is None:
-            title_id = self.context['view'].kwargs.get('title_id')
-            if Review.objects.filter(
-                title_id=title_id,
-                author=request.user
-            ).exists():
-                raise serializers.ValidationError(
-                    'Вы уже оставляли отзыв к этому произведению.'
-                )
-        return attrs
-
 
 class CommentSerializer(serializers.ModelSerializer):
     """Сериализатор комментария."""
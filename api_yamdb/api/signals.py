@@ -0,0 +1,119 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.backends.signals import connection_created
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_save
+)
+from django.dispatch import receiver
+
+from api.authentication import get_user_claims, user_changes
+from api.cache import bump_versions
+from reviews.models import (
+    Category,
+    Comment,
+    Genre,
+    Review,
+    Title,
+    TitleRanking,
+    bulk_changed
+)
+
+User = get_user_model()
+
+# Версии, которые сбрасывает запись в обход сигналов моделей: изменённые
+# строки неизвестны, поэтому сбрасываются списки всех отзывов и комментариев.
+BULK_INVALIDATES = {
+    User: ('users',),
+    Category: ('categories', 'titles'),
+    Genre: ('genres', 'titles'),
+    Title: ('titles',),
+    Title.genre.through: ('titles',),
+    TitleRanking: ('titles',),
+    Review: ('titles', 'reviews'),
+    Comment: ('comments',),
+}
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(connection, **kwargs):
+    """Настраивает новое соединение с SQLite по SQLITE_PRAGMAS."""
+    if connection.vendor != 'sqlite':
+        return
+    for name, value in settings.SQLITE_PRAGMAS.items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
+
+
+@receiver((post_save, post_delete), sender=Category)
+def invalidate_categories(**kwargs):
+    bump_versions('categories', 'titles')
+
+
+@receiver((post_save, post_delete), sender=Genre)
+def invalidate_genres(**kwargs):
+    bump_versions('genres', 'titles')
+
+
+@receiver((post_save, post_delete), sender=Title)
+@receiver(m2m_changed, sender=Title.genre.through)
+def invalidate_titles(**kwargs):
+    bump_versions('titles')
+
+
+@receiver((post_save, post_delete), sender=Review)
+def invalidate_reviews(instance, **kwargs):
+    title_ids = {instance.title_id}
+    if getattr(instance, 'rated_state', None):
+        title_ids.add(instance.rated_state[0])
+    bump_versions(
+        'titles', *(f'reviews:{title_id}' for title_id in title_ids)
+    )
+
+
+@receiver(post_delete, sender=Title)
+def invalidate_title_reviews(instance, **kwargs):
+    """Список отзывов удалённого произведения должен отвечать 404."""
+    bump_versions(f'reviews:{instance.pk}')
+
+
+@receiver(post_delete, sender=Review)
+def invalidate_review_comments(instance, **kwargs):
+    """Список комментариев удалённого отзыва должен отвечать 404."""
+    bump_versions(f'comments:{instance.pk}')
+
+
+@receiver((post_save, post_delete), sender=Comment)
+def invalidate_comments(instance, **kwargs):
+    bump_versions(f'comments:{instance.review_id}')
+
+
+@receiver(bulk_changed)
+def invalidate_bulk_changes(sender, **kwargs):
+    bump_versions(*BULK_INVALIDATES.get(sender, ()))
+
+
+@receiver(pre_save, sender=User)
+def check_username_change(instance, **kwargs):
+    instance.username_changed = instance.pk is not None and (
+        User.objects.filter(pk=instance.pk)
+        .exclude(username=instance.username)
+        .exists()
+    )
+
+
+@receiver(post_save, sender=User)
+def invalidate_authors(instance, **kwargs):
+    if getattr(instance, 'username_changed', False):
+        bump_versions('users')
+
+
+@receiver(post_save, sender=User)
+def record_user_change(instance, **kwargs):
+    user_changes.record(
+        instance.pk,
+        get_user_claims(instance) if instance.is_active else None
+    )
+
+
+@receiver(post_delete, sender=User)
+def record_user_deletion(instance, **kwargs):
+    user_changes.record(instance.pk, None)
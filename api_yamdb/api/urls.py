@@ -2,10 +2,12 @@ from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
 from api.views import (
+    CacheStatsView,
     CategoryViewSet,
     CommentViewSet,
     GenreViewSet,
     GetTokenView,
+    MetricsView,
     ReviewViewSet,
     SignUpView,
     TitleViewSet,
@@ -55,4 +57,6 @@ auth_urls = [
 urlpatterns = [
     path('v1/', include(v1_router.urls)),
     path('v1/auth/', include(auth_urls)),
+    path('v1/cache/stats/', CacheStatsView.as_view(), name='cache-stats'),
+    path('v1/metrics/', MetricsView.as_view(), name='metrics'),
 ]
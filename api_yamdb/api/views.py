@@ -1,36 +1,63 @@
 from django.contrib.auth import get_user_model
-from django.db.models import Avg
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse, StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
-from django.shortcuts import get_object_or_404
+from django.shortcuts import aget_object_or_404, get_object_or_404
 from rest_framework import generics, filters, mixins, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 
-from api.filters import TitleFilter
+from api.cache import CachedListMixin, ConditionalGetMixin, get_stats
+from api.constants import (
+    EXPORT_CHUNK_SIZE,
+    TOP_TITLES_LIMIT,
+    TOP_TITLES_MAX_LIMIT
+)
+from api.export import csv_lines, iterate_titles, ndjson_lines
+from api.filters import FullTextSearchFilter, TitleFilter
+from api.metrics import registry
+from api.mixins import (
+    AsyncReadMixin,
+    BulkWriteMixin,
+    FastListMixin,
+    SparseFieldsMixin,
+    TimedSerializerMixin
+)
+from api.pagination import PubDateCursorPagination
 from api.permissions import (
     IsAdmin,
     IsAdminOrReadOnly,
     IsAuthorOrAdminOrModeratorOrReadOnly
 )
 from api.serializers import (
+    CategoryBulkSerializer,
     CategorySerializer,
     CommentSerializer,
+    GenreBulkSerializer,
     GenreSerializer,
     GetTokenSerializer,
     ReviewSerializer,
     SignUpSerializer,
+    TitleBulkSerializer,
     TitleWriteSerializer,
+    TitleRankingSerializer,
     TitleReadSerializer,
+    TitleStatsSerializer,
     UserSerializer,
     UsersMeSerializer
 )
+from reviews.constants import SIMILAR_TITLES_COUNT
 from reviews.models import Category, Genre, Review, Title
+from reviews.similarity import get_index, similar_by_genres
+from users.models import OutboxEmail
 
 User = get_user_model()
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(TimedSerializerMixin, viewsets.ModelViewSet):
     """ViewSet для модели пользователя."""
 
     queryset = User.objects.all()
@@ -41,19 +68,25 @@ class UserViewSet(viewsets.ModelViewSet):
     search_fields = ('username',)
     http_method_names = ('get', 'post', 'patch', 'delete')
 
+    def get_current_user(self):
+        """Модель текущего пользователя, даже при аутентификации без БД."""
+        if isinstance(self.request.user, User):
+            return self.request.user
+        return get_object_or_404(User, pk=self.request.user.pk)
+
     @action(
         detail=False,
         permission_classes=(IsAuthenticated,),
         url_path='me'
     )
     def me(self, request):
-        serializer = UsersMeSerializer(request.user)
+        serializer = UsersMeSerializer(self.get_current_user())
         return Response(serializer.data)
 
     @me.mapping.patch
     def update_me(self, request):
         serializer = UsersMeSerializer(
-            request.user,
+            self.get_current_user(),
             data=request.data,
             partial=True
         )
@@ -88,7 +121,35 @@ class SignUpView(generics.CreateAPIView):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+class CacheStatsView(generics.GenericAPIView):
+    """Счётчики попаданий и промахов кэша ответов каталога."""
+
+    permission_classes = (IsAdmin,)
+    cached_resources = ('categories', 'genres', 'titles')
+
+    def get(self, request):
+        return Response(get_stats(self.cached_resources))
+
+
+class MetricsView(CacheStatsView):
+    """Метрики запросов и кэша в текстовом формате Prometheus."""
+
+    content_type = 'text/plain; version=0.0.4; charset=utf-8'
+
+    def get(self, request):
+        return HttpResponse(
+            registry.render(
+                get_stats(self.cached_resources),
+                OutboxEmail.objects.stats().items()
+            ),
+            content_type=self.content_type
+        )
+
+
 class BaseSlugViewSet(
+    TimedSerializerMixin,
+    BulkWriteMixin,
+    CachedListMixin,
     mixins.ListModelMixin,
     mixins.CreateModelMixin,
     mixins.DestroyModelMixin,
@@ -99,6 +160,22 @@ class BaseSlugViewSet(
     filter_backends = (filters.SearchFilter,)
     search_fields = ('name',)
     lookup_field = 'slug'
+    bulk_lookup_field = 'slug'
+
+    def get_bulk_context(self, items, instances):
+        slugs = {
+            item.get('slug') for item in items
+            if isinstance(item, dict) and isinstance(item.get('slug'), str)
+        }
+        return {'taken_slugs': set(
+            self.get_queryset()
+            .filter(slug__in=slugs)
+            .values_list('slug', flat=True)
+        )}
+
+    def reserve_bulk_item(self, serializer, context):
+        if 'slug' in serializer.validated_data:
+            context['taken_slugs'].add(serializer.validated_data['slug'])
 
 
 class CategoryViewSet(BaseSlugViewSet):
@@ -106,6 +183,8 @@ class CategoryViewSet(BaseSlugViewSet):
 
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
+    bulk_serializer_class = CategoryBulkSerializer
+    cache_dependencies = ('categories',)
 
 
 class GenreViewSet(BaseSlugViewSet):
@@ -113,9 +192,20 @@ class GenreViewSet(BaseSlugViewSet):
 
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
-
-
-class TitleViewSet(viewsets.ModelViewSet):
+    bulk_serializer_class = GenreBulkSerializer
+    cache_dependencies = ('genres',)
+
+
+class TitleViewSet(
+    TimedSerializerMixin,
+    BulkWriteMixin,
+    ConditionalGetMixin,
+    CachedListMixin,
+    SparseFieldsMixin,
+    FastListMixin,
+    AsyncReadMixin,
+    viewsets.ModelViewSet
+):
     """Класс представления для работы с произведениями."""
 
     http_method_names = ('get', 'post', 'patch', 'delete')
@@ -123,61 +213,291 @@ class TitleViewSet(viewsets.ModelViewSet):
     permission_classes = (IsAdminOrReadOnly,)
     filter_backends = (
         DjangoFilterBackend,
-        filters.SearchFilter,
+        FullTextSearchFilter,
         filters.OrderingFilter
     )
     filterset_class = TitleFilter
     search_fields = ('name',)
     ordering_fields = ('name', 'year', 'rating')
     ordering = ('name',)
+    cache_dependencies = ('titles',)
+    bulk_serializer_class = TitleBulkSerializer
+    # параметр ?by= подборки лучших: поле материализованного рейтинга
+    top_orderings = {'rating': 'weighted_rating', 'trending': 'trending'}
 
     def get_serializer_class(self):
         if self.action in ('create', 'partial_update', 'update'):
             return TitleWriteSerializer
+        if self.action == 'top':
+            return TitleRankingSerializer
         return TitleReadSerializer
 
+    def get_version_names(self):
+        return self.cache_dependencies
+
+    @action(
+        detail=False,
+        permission_classes=(IsAdmin,),
+        url_path='export'
+    )
+    def export(self, request):
+        """Потоковая выгрузка каталога в NDJSON (по умолчанию) или CSV."""
+        export_type = request.query_params.get('type', 'ndjson')
+        with_reviews = request.query_params.get('reviews') in ('1', 'true')
+        if export_type not in ('ndjson', 'csv'):
+            raise ValidationError(
+                {'type': ['Допустимые значения: ndjson, csv.']}
+            )
+        if export_type == 'csv' and with_reviews:
+            raise ValidationError(
+                {'reviews': ['Отзывы выгружаются только в формате ndjson.']}
+            )
+        titles = iterate_titles(EXPORT_CHUNK_SIZE, with_reviews)
+        if export_type == 'csv':
+            lines, content_type = csv_lines(titles), 'text/csv'
+        else:
+            lines, content_type = ndjson_lines(titles), 'application/x-ndjson'
+        response = StreamingHttpResponse(lines, content_type=content_type)
+        response['Content-Disposition'] = (
+            f'attachment; filename="titles.{export_type}"'
+        )
+        return response
+
+    @action(detail=False, url_path='top')
+    def top(self, request):
+        """Лучшие по взвешенному рейтингу или трендовые произведения.
+
+        Читает готовый рейтинг по индексу вместо сортировки агрегатов
+        всего каталога; фильтры те же, что у списка произведений.
+        """
+        by = request.query_params.get('by', 'rating')
+        if by not in self.top_orderings:
+            raise ValidationError({'by': [
+                'Допустимые значения: ' + ', '.join(self.top_orderings) + '.'
+            ]})
+        limit = self.get_limit(TOP_TITLES_LIMIT, TOP_TITLES_MAX_LIMIT)
+        field = f'ranking__{self.top_orderings[by]}'
+        titles = DjangoFilterBackend().filter_queryset(
+            request,
+            Title.objects
+            .filter(**{f'{field}__isnull': False})
+            .select_related('category', 'ranking')
+            .prefetch_related('genre')
+            .order_by(f'-{field}', '-ranking__pk'),
+            self
+        )
+        return Response(
+            self.get_serializer(titles[:limit], many=True).data
+        )
+
+    @action(detail=True, url_path='similar')
+    def similar(self, request, pk=None):
+        """Похожие произведения: по индексу, а без него — по жанрам."""
+        limit = self.get_limit(TOP_TITLES_LIMIT, SIMILAR_TITLES_COUNT)
+        try:
+            title_id = int(pk)
+        except ValueError:
+            raise NotFound
+        index = get_index()
+        similar_ids = index.similar(title_id, limit) if index else None
+        if similar_ids is None:
+            get_object_or_404(Title, pk=title_id)
+            similar_ids = similar_by_genres(title_id, limit)
+            titles = self.get_queryset().in_bulk(similar_ids)
+        else:
+            titles = self.get_queryset().in_bulk(similar_ids + [title_id])
+            if titles.pop(title_id, None) is None:
+                raise NotFound
+        return Response(self.get_serializer(
+            [titles[pk] for pk in similar_ids if pk in titles], many=True
+        ).data)
+
+    def get_limit(self, default, maximum):
+        """Значение параметра ?limit= от 1 до `maximum`."""
+        try:
+            limit = int(self.request.query_params.get('limit', default))
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= maximum:
+            raise ValidationError({'limit': [
+                f'Укажите целое число от 1 до {maximum}.'
+            ]})
+        return limit
+
+    @action(detail=True, url_path='stats')
+    def stats(self, request, pk=None):
+        """Число отзывов, средняя и медианная оценка, гистограмма оценок."""
+        try:
+            rows = list(Title.objects.filter(pk=pk).values_list(
+                'score_counts__score', 'score_counts__count'
+            ))
+        except (TypeError, ValueError):
+            rows = []
+        if not rows:
+            raise NotFound
+        return Response(TitleStatsSerializer({
+            score: count for score, count in rows if score is not None
+        }).data)
+
+    def get_bulk_context(self, items, instances):
+        category_slugs, genre_slugs = set(), set()
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            if isinstance(item.get('category'), str):
+                category_slugs.add(item['category'])
+            if isinstance(item.get('genre'), list):
+                genre_slugs.update(
+                    slug for slug in item['genre'] if isinstance(slug, str)
+                )
+        return {
+            'categories': Category.objects.in_bulk(
+                category_slugs, field_name='slug'
+            ),
+            'genres': Genre.objects.in_bulk(genre_slugs, field_name='slug'),
+        }
+
+    def perform_bulk_create(self, serializers):
+        genres = [
+            serializer.validated_data.pop('genre')
+            for serializer in serializers
+        ]
+        titles = super().perform_bulk_create(serializers)
+        self.set_bulk_genres(zip(titles, genres))
+        return titles
+
+    def perform_bulk_update(self, serializers):
+        genres = [
+            (serializer.instance, serializer.validated_data.pop('genre'))
+            for serializer in serializers
+            if 'genre' in serializer.validated_data
+        ]
+        titles = super().perform_bulk_update(serializers)
+        if genres:
+            Title.genre.through.objects.filter(
+                title__in=[title for title, _ in genres]
+            ).delete()
+            self.set_bulk_genres(genres)
+        return titles
+
+    @staticmethod
+    def set_bulk_genres(genres):
+        """Записывает связи произведений с жанрами одним INSERT."""
+        Title.genre.through.objects.bulk_create(
+            [
+                Title.genre.through(title_id=title.pk, genre_id=genre.pk)
+                for title, title_genres in genres
+                for genre in dict.fromkeys(title_genres)
+            ]
+        )
+
     def get_queryset(self):
         return (
             super()
             .get_queryset()
-            .annotate(rating=Avg('reviews__score'))
+            .select_related('category')
+            .prefetch_related('genre')
             .order_by(*self.ordering)
         )
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(
+    TimedSerializerMixin,
+    ConditionalGetMixin,
+    SparseFieldsMixin,
+    FastListMixin,
+    AsyncReadMixin,
+    viewsets.ModelViewSet
+):
     """Отзывы к произведению."""
 
     http_method_names = ('get', 'post', 'patch', 'delete', 'head', 'options')
     serializer_class = ReviewSerializer
     permission_classes = (IsAuthorOrAdminOrModeratorOrReadOnly,)
+    pagination_class = PubDateCursorPagination
+    filter_backends = (FullTextSearchFilter,)
+    search_fields = ('text',)
+    # связанный менеджер произведения заполняет title у каждого отзыва
+    sparse_required_fields = ('title',)
 
     def get_title(self):
-        return get_object_or_404(Title, pk=self.kwargs['title_id'])
+        if not hasattr(self, '_title'):
+            self._title = get_object_or_404(Title, pk=self.kwargs['title_id'])
+        return self._title
 
     def get_queryset(self):
-        return self.get_title().reviews.all()
+        return self.get_title().reviews.select_related('author')
 
-    def perform_create(self, serializer):
-        serializer.save(author=self.request.user, title=self.get_title())
+    async def aget_queryset(self):
+        self._title = await aget_object_or_404(
+            Title, pk=self.kwargs['title_id']
+        )
+        return self.get_queryset()
 
+    def get_version_names(self):
+        return (f'reviews:{self.kwargs["title_id"]}', 'reviews', 'users')
 
-class CommentViewSet(viewsets.ModelViewSet):
+    def perform_create(self, serializer):
+        try:
+            with transaction.atomic():
+                serializer.save(
+                    author_id=self.request.user.id, title=self.get_title()
+                )
+        except IntegrityError:
+            # Другие нарушения (например, при пересчёте агрегатов) — ошибка
+            # сервера, а не повторный отзыв.
+            if not Review.objects.filter(
+                title=self.get_title(), author_id=self.request.user.id
+            ).exists():
+                raise
+            raise ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    'Вы уже оставляли отзыв к этому произведению.'
+                ]
+            })
+
+
+class CommentViewSet(
+    TimedSerializerMixin,
+    ConditionalGetMixin,
+    SparseFieldsMixin,
+    FastListMixin,
+    AsyncReadMixin,
+    viewsets.ModelViewSet
+):
     """Комментарии к отзыву."""
 
     http_method_names = ('get', 'post', 'patch', 'delete', 'head', 'options')
     serializer_class = CommentSerializer
     permission_classes = (IsAuthorOrAdminOrModeratorOrReadOnly,)
+    pagination_class = PubDateCursorPagination
+    # связанный менеджер отзыва заполняет review у каждого комментария
+    sparse_required_fields = ('review',)
 
     def get_review(self):
-        return get_object_or_404(
+        if not hasattr(self, '_review'):
+            self._review = get_object_or_404(
+                Review,
+                pk=self.kwargs['review_id'],
+                title_id=self.kwargs['title_id'],
+            )
+        return self._review
+
+    def get_queryset(self):
+        return self.get_review().comments.select_related('author')
+
+    async def aget_queryset(self):
+        self._review = await aget_object_or_404(
             Review,
             pk=self.kwargs['review_id'],
             title_id=self.kwargs['title_id'],
         )
+        return self.get_queryset()
 
-    def get_queryset(self):
-        return self.get_review().comments.all()
+    def get_version_names(self):
+        return (f'comments:{self.kwargs["review_id"]}', 'comments', 'users')
 
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user, review=self.get_review())
+        serializer.save(
+            author_id=self.request.user.id, review=self.get_review()
+        )
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 
@@ -25,6 +26,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.PerformanceMetricsMiddleware',
+    'api.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -55,13 +58,85 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'api_yamdb.wsgi.application'
 
+# SQLITE_PROFILE=throughput: журнал WAL, при котором чтение не ждёт записи,
+# постоянные соединения с проверкой и PRAGMA из SQLITE_PRAGMAS, которые
+# api/signals.py применяет к каждому новому соединению.
+SQLITE_PROFILES = {
+    'default': {'DATABASE': {}, 'PRAGMAS': {}},
+    'throughput': {
+        'DATABASE': {
+            'CONN_MAX_AGE': 600,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {'transaction_mode': 'IMMEDIATE', 'timeout': 5},
+        },
+        'PRAGMAS': {
+            'journal_mode': 'wal',
+            'synchronous': 'normal',
+            'busy_timeout': 5000,
+            'cache_size': -64000,
+            'mmap_size': 256 * 1024 * 1024,
+            'temp_store': 'memory',
+        },
+    },
+}
+
+SQLITE_PROFILE = SQLITE_PROFILES[os.getenv('SQLITE_PROFILE', 'default')]
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        **SQLITE_PROFILE['DATABASE'],
+    }
+}
+
+SQLITE_PRAGMAS = SQLITE_PROFILE['PRAGMAS']
+
+# DATABASE_REPLICAS=/path/a.sqlite3,/path/b.sqlite3: безопасные запросы
+# читают из реплик (api/routers.py), которые обновляет команда
+# sync_replicas; реплики отстают не больше чем на REPLICA_LAG_SECONDS.
+DATABASE_REPLICAS = []
+for number, name in enumerate(
+    filter(None, os.getenv('DATABASE_REPLICAS', '').split(',')), 1
+):
+    DATABASES[f'replica{number}'] = {
+        **DATABASES['default'],
+        'NAME': name,
+        'TEST': {'MIRROR': 'default'},
     }
+    DATABASE_REPLICAS.append(f'replica{number}')
+
+DATABASE_ROUTERS = ('api.routers.PrimaryReplicaRouter',)
+
+REPLICA_LAG_SECONDS = 5
+
+API_CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'api-responses',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+    },
+    'db': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'api_cache',
+    },
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'api': {
+        **API_CACHE_BACKENDS[os.getenv('API_CACHE_BACKEND', 'locmem')],
+        'TIMEOUT': 300,
+    },
+}
+
+API_CACHE_ALIAS = 'api'
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -92,14 +167,34 @@ STATIC_URL = '/static/'
 
 STATICFILES_DIRS = ((BASE_DIR / 'static/'),)
 
+# API_STATELESS_JWT=1 включает аутентификацию по утверждениям токена
+# без запроса пользователя из БД (см. api/authentication.py).
+API_AUTHENTICATION_CLASSES = {
+    False: 'rest_framework_simplejwt.authentication.JWTAuthentication',
+    True: 'api.authentication.StatelessJWTAuthentication',
+}
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        API_AUTHENTICATION_CLASSES[os.getenv('API_STATELESS_JWT') == '1'],
+    ),
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.AsyncPageNumberPagination',
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ),
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10
 }
 
+# API_ASYNC_VIEWS=1: списки и объекты произведений, отзывов и комментариев
+# отдаются асинхронными представлениями (см. AsyncReadMixin); в потоке
+# выполняются только запросы к БД и сериализация. Имеет смысл под ASGI.
+API_ASYNC_VIEWS = os.getenv('API_ASYNC_VIEWS') == '1'
+
+# API_FAST_JSON=1: списки произведений, отзывов и комментариев строятся из
+# values_list() по планам сериализаторов (api/plans.py) и кодируются orjson.
+API_FAST_JSON = os.getenv('API_FAST_JSON') == '1'
+
 SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
@@ -110,4 +205,14 @@ EMAIL_FILE_PATH = BASE_DIR / 'sent_emails'
 
 DEFAULT_FROM_EMAIL = 'admin@yamdb.com'
 
+# EMAIL_OUTBOX=1: письма с кодом подтверждения складываются в таблицу
+# исходящих и отправляются командой send_outbox, а не в обработчике запроса.
+EMAIL_OUTBOX = os.getenv('EMAIL_OUTBOX') == '1'
+
 AUTH_USER_MODEL = 'users.User'
+
+# Каталог индекса похожих произведений: его строит команда
+# build_similarity_index, без индекса /similar/ считает сходство по жанрам.
+SIMILARITY_INDEX_DIR = Path(
+    os.getenv('SIMILARITY_INDEX_DIR', BASE_DIR / 'similarity_index')
+)
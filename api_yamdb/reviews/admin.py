@@ -5,7 +5,9 @@ from .models import Category, Genre, Title, Review, Comment
 
 @admin.register(Title)
 class TitleAdmin(admin.ModelAdmin):
-    list_display = ('id', 'name', 'year', 'category', 'genres_list')
+    list_display = (
+        'id', 'name', 'year', 'category', 'genres_list', 'rating'
+    )
     list_filter = (
         'year',
         'category',
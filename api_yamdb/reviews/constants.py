@@ -7,3 +7,15 @@ MAX_CHARFIELD_LEN = 256
 
 # отображаемая длина строки
 SLUG_DISPLAY_MAX_LEN = 50
+
+# байесовский рейтинг: априорная оценка и её вес в числе отзывов
+RANKING_PRIOR_SCORE = (MIN_SCORE + MAX_SCORE) / 2
+RANKING_PRIOR_REVIEWS = 10
+
+# тренд: период полураспада вклада отзыва и окно полного пересчёта, дни
+TRENDING_HALF_LIFE_DAYS = 7
+TRENDING_WINDOW_DAYS = 90
+
+# похожие произведения: сколько соседей хранит индекс и веса признаков
+SIMILAR_TITLES_COUNT = 50
+SIMILARITY_WEIGHTS = {'genre': 1.0, 'category': 0.5, 'reviewers': 1.0}
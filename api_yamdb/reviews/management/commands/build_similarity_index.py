@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from reviews.constants import SIMILAR_TITLES_COUNT
+from reviews.similarity import build_index
+
+
+class Command(BaseCommand):
+    """Построение индекса похожих произведений."""
+
+    help = (
+        'Находит ближайших соседей каждого произведения по жанрам, '
+        'категории и авторам отзывов и сохраняет их для /similar/.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--neighbors',
+            type=int,
+            default=SIMILAR_TITLES_COUNT,
+            help='сколько похожих произведений хранить для каждого',
+        )
+
+    def handle(self, *args, **options):
+        if options['neighbors'] < 1:
+            raise CommandError('--neighbors должен быть больше нуля')
+        started = time.perf_counter()
+        try:
+            titles = build_index(count=options['neighbors'])
+        except ImportError as error:
+            raise CommandError(
+                f'Для построения индекса нужны numpy и scipy: {error}'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Проиндексировано произведений: {titles} '
+            f'за {time.perf_counter() - started:.2f} с'
+        ))
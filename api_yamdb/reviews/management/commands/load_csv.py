@@ -1,55 +1,404 @@
 import csv
+import os
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from hashlib import md5
+from itertools import islice
 from pathlib import Path
 
+import django
+from django.apps import apps
 from django.conf import settings
-from django.core.management.base import BaseCommand
-from django.contrib.auth import get_user_model
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
 
-from reviews.models import Category, Genre, Title, Review, Comment
+from reviews.models import CsvImportState, Review, Title, bulk_changed
+
+# Порядок загрузки: родительские таблицы раньше зависимых.
+SOURCES = (
+    ('users.User', 'users.csv', {}),
+    ('reviews.Category', 'category.csv', {}),
+    ('reviews.Genre', 'genre.csv', {}),
+    ('reviews.Title', 'titles.csv', {'category': 'category_id'}),
+    ('reviews.Title_genre', 'genre_title.csv', {}),
+    ('reviews.Review', 'review.csv', {'author': 'author_id'}),
+    ('reviews.Comment', 'comments.csv', {'author': 'author_id'}),
+)
+
+
+def clean_value(field, raw):
+    if raw == '' and field.null:
+        return None
+    if field.is_relation:
+        return field.target_field.to_python(raw)
+    value = field.to_python(raw)
+    field.validate(value, None)
+    field.run_validators(value)
+    return value
+
+
+def clean_rows(label, header, rows):
+    """Приводит строки CSV к значениям полей модели.
+
+    Выполняется в процессах пула, поэтому не обращается к базе данных:
+    ссылки и дубликаты проверяет основной процесс.
+    """
+    fields = [apps.get_model(label)._meta.get_field(name) for name in header]
+    cleaned, rejected = [], []
+    for line, row in rows:
+        if len(row) != len(fields):
+            rejected.append(
+                (line, f'ожидалось колонок: {len(fields)}, получено: '
+                       f'{len(row)}')
+            )
+            continue
+        values, errors = {}, []
+        for field, raw in zip(fields, row):
+            try:
+                values[field.attname] = clean_value(field, raw)
+            except ValidationError as error:
+                errors.append(f'{field.name}: {" ".join(error.messages)}')
+        if errors:
+            rejected.append((line, '; '.join(errors)))
+        else:
+            cleaned.append((line, values))
+    return cleaned, rejected
 
 
 class Command(BaseCommand):
-    """Команда згрузки CSV."""
+    """Команда загрузки CSV."""
+
+    help = (
+        'Загружает данные из CSV пачками в отдельных транзакциях. '
+        'Отклонённые строки выводятся с указанием причины.'
+    )
+
+    bulk_options = {}
 
-    def handle(self, *args, **kwargs):
-        data_dir = Path(settings.BASE_DIR) / 'static' / 'data'
-        user = get_user_model()
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--data-dir',
+            type=Path,
+            default=Path(settings.BASE_DIR) / 'static' / 'data',
+            help='каталог с CSV-файлами',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='количество строк в одной транзакции',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='число процессов для разбора CSV (0 — по числу ядер)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='только проверить файлы, ничего не записывая',
+        )
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help=(
+                'пропускать неизменённые файлы и пачки строк, а изменённые '
+                'строки обновлять по первичному ключу'
+            ),
+        )
 
-        def load(model, filename, rename=None, batch_size=1000):
-            path = data_dir / filename
-            if not path.exists():
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self.dry_run = options['dry_run']
+        self.incremental = options['incremental']
+        self.workers = options['workers'] or os.cpu_count()
+        if self.batch_size < 1:
+            raise CommandError('--batch-size должен быть больше нуля')
+
+        # Ключи, уже загруженные в этом запуске: в режиме проверки они
+        # заменяют базу данных при проверке ссылок и дубликатов.
+        self.seen_pks = defaultdict(set)
+        # Произведения, агрегаты отзывов которых надо пересчитать.
+        self.affected_titles = set()
+        executor = None
+        if self.workers > 1:
+            executor = ProcessPoolExecutor(
+                self.workers, initializer=django.setup
+            )
+        started = time.perf_counter()
+        total_rows = total_loaded = 0
+        try:
+            for label, filename, rename in SOURCES:
+                path = options['data_dir'] / filename
+                if not path.exists():
+                    continue
+                rows, loaded = self.load_file(
+                    executor, apps.get_model(label), path, rename
+                )
+                total_rows += rows
+                total_loaded += loaded
+        finally:
+            if executor:
+                executor.shutdown()
+
+        if not self.dry_run:
+            self.rebuild_review_stats()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'{"Проверено" if self.dry_run else "Загружено"} '
+            f'{total_loaded} из {total_rows} строк за {elapsed:.2f} с '
+            f'({total_rows / elapsed:.0f} строк/с)'
+        ))
+
+    def load_file(self, executor, model, path, rename):
+        started = time.perf_counter()
+        rows = loaded = 0
+        stat = path.stat()
+        state = None
+        if self.incremental:
+            state = CsvImportState.objects.filter(filename=path.name).first()
+            if state and state.matches(stat, self.batch_size):
+                self.stdout.write(f'{path.name}: без изменений, пропущен')
+                return rows, loaded
+        previous_hashes = (
+            state.chunk_hashes
+            if state and state.chunk_size == self.batch_size else []
+        )
+        hashes = []
+        self.changed_count = 0
+        self.pending_chunks = deque()
+        with path.open(encoding='utf-8', newline='') as file:
+            reader = csv.reader(file)
+            header = [rename.get(name, name) for name in next(reader, ())]
+            self.check_header(model, path, header)
+            self.bulk_options = self.get_bulk_options(model, header)
+            batches = self.read_batches(reader)
+            if self.incremental:
+                batches = self.changed_batches(
+                    batches, previous_hashes, hashes
+                )
+            for cleaned, rejected in self.clean_batches(
+                executor, model, header, batches
+            ):
+                rows += len(cleaned) + len(rejected)
+                cleaned = self.check_references(model, cleaned, rejected)
+                if not self.dry_run:
+                    cleaned = self.insert(model, cleaned, rejected)
+                self.record_chunk(hashes, rejected)
+                loaded += len(cleaned)
+                for line, reason in sorted(rejected):
+                    self.stderr.write(f'{path.name}:{line}: {reason}')
+        if loaded and not self.dry_run:
+            bulk_changed.send(sender=model)
+        if self.incremental and not self.dry_run:
+            CsvImportState.objects.update_or_create(
+                filename=path.name,
+                defaults={
+                    'size': stat.st_size,
+                    'mtime': stat.st_mtime,
+                    'chunk_size': self.batch_size,
+                    'chunk_hashes': hashes,
+                },
+            )
+        elapsed = time.perf_counter() - started
+        unchanged = (
+            f', неизменённых пачек {len(hashes) - self.changed_count}'
+            if self.incremental else ''
+        )
+        self.stdout.write(
+            f'{path.name}: строк {rows}, принято {loaded}, отклонено '
+            f'{rows - loaded}{unchanged}, {rows / elapsed:.0f} строк/с'
+        )
+        return rows, loaded
+
+    def check_header(self, model, path, header):
+        for name in header:
+            try:
+                model._meta.get_field(name)
+            except FieldDoesNotExist:
+                raise CommandError(
+                    f'{path.name}: неизвестная колонка {name!r}'
+                )
+
+    def read_batches(self, reader):
+        while True:
+            batch = [
+                (reader.line_num, row)
+                for row in islice(reader, self.batch_size)
+            ]
+            if not batch:
                 return
+            yield batch
 
-            objs = []
-            with path.open(encoding='utf-8', newline='') as file:
-                for row in csv.DictReader(file):
-                    if rename:
-                        for src, dst in rename.items():
-                            if src in row:
-                                row[dst] = row.pop(src)
-                    objs.append(model(**row))
-
-                    if len(objs) >= batch_size:
-                        model.objects.bulk_create(
-                            objs,
-                            ignore_conflicts=True,
-                            batch_size=batch_size
-                        )
-                        objs.clear()
-
-            if objs:
-                model.objects.bulk_create(
-                    objs,
-                    ignore_conflicts=True,
-                    batch_size=batch_size
+    def changed_batches(self, batches, previous_hashes, hashes):
+        """Пропускает пачки, совпадающие с прошлым импортом по хешу.
+
+        Номера отданных пачек складываются в `pending_chunks`: пачки
+        разбираются по порядку, и load_file() снимает номера с начала.
+        """
+        for index, batch in enumerate(batches):
+            digest = md5(repr([row for _, row in batch]).encode()).hexdigest()
+            hashes.append(digest)
+            if (
+                index < len(previous_hashes)
+                and previous_hashes[index] == digest
+            ):
+                continue
+            self.changed_count += 1
+            self.pending_chunks.append(index)
+            yield batch
+
+    def record_chunk(self, hashes, rejected):
+        """Отмечает пачку разобранной в инкрементальном режиме.
+
+        Хеш пачки с отклонёнными строками не записывается, поэтому при
+        следующем запуске они проверяются снова.
+        """
+        if not self.incremental:
+            return
+        chunk = self.pending_chunks.popleft()
+        if rejected:
+            hashes[chunk] = None
+
+    def get_bulk_options(self, model, header):
+        """Параметры bulk_create: в инкрементальном режиме — upsert."""
+        if not self.incremental:
+            return {}
+        fields = [model._meta.get_field(name) for name in header]
+        update_fields = [
+            field.name for field in fields
+            if not field.primary_key and not getattr(
+                field, 'auto_now_add', False
+            )
+        ]
+        if not update_fields:
+            return {'ignore_conflicts': True}
+        return {
+            'update_conflicts': True,
+            'unique_fields': (model._meta.pk.name,),
+            'update_fields': update_fields,
+        }
+
+    def clean_batches(self, executor, model, header, batches):
+        """Разбирает пачки по порядку, держа в работе ограниченное число."""
+        label = model._meta.label
+        if executor is None:
+            for batch in batches:
+                yield clean_rows(label, header, batch)
+            return
+        pending = deque()
+        for batch in batches:
+            pending.append(executor.submit(clean_rows, label, header, batch))
+            if len(pending) >= self.workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    def check_references(self, model, cleaned, rejected):
+        """Отклоняет строки с повторным ключом или ссылкой в пустоту."""
+        pk_name = model._meta.pk.attname
+        checks = [(model._meta.pk, pk_name, True)] + [
+            (field, field.attname, False)
+            for field in model._meta.concrete_fields
+            if field.many_to_one
+        ]
+        for field, attname, is_pk in checks:
+            related = model if is_pk else field.related_model
+            ids = {
+                values[attname] for _, values in cleaned
+                if values.get(attname) is not None
+            }
+            if not ids:
+                continue
+            known = self.seen_pks[related] & ids
+            if not (is_pk and self.incremental):
+                known.update(
+                    related._default_manager
+                    .filter(pk__in=ids - known)
+                    .values_list('pk', flat=True)
+                )
+            accepted = []
+            for line, values in cleaned:
+                value = values.get(attname)
+                if is_pk and value in known:
+                    rejected.append((line, f'{attname}: запись {value} '
+                                           'уже существует'))
+                elif not is_pk and value is not None and value not in known:
+                    rejected.append((line, f'{attname}: запись {value} '
+                                           'не найдена'))
+                else:
+                    accepted.append((line, values))
+                    if is_pk:
+                        known.add(value)
+            cleaned = accepted
+        if self.dry_run:
+            self.seen_pks[model].update(
+                values[pk_name] for _, values in cleaned
+            )
+        return cleaned
+
+    def track_titles(self, model, cleaned):
+        """Запоминает произведения, которых касаются строки пачки."""
+        if model is Title:
+            self.affected_titles.update(
+                values['id'] for _, values in cleaned
+                if values.get('id') is not None
+            )
+        elif model is Review:
+            self.affected_titles.update(
+                values['title_id'] for _, values in cleaned
+            )
+            if self.incremental:
+                # upsert может перенести отзыв к другому произведению
+                self.affected_titles.update(
+                    Review.objects.filter(
+                        pk__in=[values.get('id') for _, values in cleaned]
+                    ).values_list('title_id', flat=True)
                 )
 
-        load(user, 'users.csv')
-        load(Category, 'category.csv')
-        load(Genre, 'genre.csv')
-        load(Title, 'titles.csv', rename={'category': 'category_id'})
-        load(Title.genre.through, 'genre_title.csv')
-        load(Review, 'review.csv', rename={'author': 'author_id'})
-        load(Comment, 'comments.csv', rename={'author': 'author_id'})
+    def rebuild_review_stats(self):
+        """Пересчитывает агрегаты затронутых загрузкой произведений.
+
+        Без изменений в произведениях и отзывах ничего не пересчитывается,
+        в инкрементальном режиме — только затронутые произведения.
+        """
+        if not self.affected_titles:
+            return
+        if not self.incremental:
+            Title.objects.rebuild_review_stats()
+            return
+        title_ids = iter(sorted(self.affected_titles))
+        while batch := list(islice(title_ids, self.batch_size)):
+            Title.objects.filter(pk__in=batch).rebuild_review_stats()
 
-        self.stdout.write(self.style.SUCCESS('CSV загружены'))
+    def insert(self, model, cleaned, rejected):
+        """Записывает пачку одной транзакцией.
+
+        Если пачка нарушает ограничение уникальности, строки записываются
+        по одной, чтобы отклонить только конфликтующие.
+        """
+        self.track_titles(model, cleaned)
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create(
+                    [model(**values) for _, values in cleaned],
+                    **self.bulk_options
+                )
+            return cleaned
+        except IntegrityError:
+            pass
+        inserted = []
+        for line, values in cleaned:
+            try:
+                with transaction.atomic():
+                    model.objects.bulk_create(
+                        [model(**values)], **self.bulk_options
+                    )
+            except IntegrityError as error:
+                rejected.append((line, str(error)))
+            else:
+                inserted.append((line, values))
+        return inserted
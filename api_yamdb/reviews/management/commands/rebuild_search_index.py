@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from reviews.search import create_fts_indexes, drop_fts_indexes
+
+
+class Command(BaseCommand):
+    """Пересоздание полнотекстовых индексов."""
+
+    help = (
+        'Пересоздаёт индексы FTS5 по названиям произведений и текстам '
+        'отзывов вместе с триггерами синхронизации.'
+    )
+
+    def handle(self, *args, **kwargs):
+        if connection.vendor != 'sqlite':
+            self.stdout.write(
+                'Полнотекстовые индексы доступны только в SQLite'
+            )
+            return
+        with transaction.atomic():
+            drop_fts_indexes(connection)
+            create_fts_indexes(connection)
+        self.stdout.write(self.style.SUCCESS('Индексы поиска пересозданы'))
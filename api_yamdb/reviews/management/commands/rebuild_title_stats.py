@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from reviews.models import Title
+
+
+class Command(BaseCommand):
+    """Пересчёт агрегатов отзывов у всех произведений."""
+
+    help = (
+        'Пересчитывает количество отзывов, сумму оценок, рейтинг и '
+        'счётчики оценок.'
+    )
+
+    def handle(self, *args, **kwargs):
+        updated = Title.objects.rebuild_review_stats()
+        self.stdout.write(
+            self.style.SUCCESS(f'Пересчитаны агрегаты: {updated}')
+        )
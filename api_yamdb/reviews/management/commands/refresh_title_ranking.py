@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from reviews.models import TitleRanking
+
+
+class Command(BaseCommand):
+    """Пересчёт материализованного рейтинга произведений."""
+
+    help = (
+        'Заново заполняет взвешенный рейтинг и тренд произведений, '
+        'исключая из тренда удалённые и устаревшие отзывы.'
+    )
+
+    def handle(self, *args, **kwargs):
+        created = TitleRanking.objects.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(f'Пересчитан рейтинг произведений: {created}')
+        )
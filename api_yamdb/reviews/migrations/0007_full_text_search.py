@@ -0,0 +1,22 @@
+from django.db import migrations
+
+from reviews.search import create_fts_indexes, drop_fts_indexes
+
+
+def create_indexes(apps, schema_editor):
+    create_fts_indexes(schema_editor.connection)
+
+
+def drop_indexes(apps, schema_editor):
+    drop_fts_indexes(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0006_review_comment_pub_date_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
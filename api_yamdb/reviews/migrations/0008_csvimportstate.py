@@ -0,0 +1,30 @@
+# Generated by Django 5.1.1 on 2026-10-18 02:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0007_full_text_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CsvImportState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('filename', models.CharField(max_length=256, unique=True, verbose_name='Файл')),
+                ('size', models.PositiveBigIntegerField(verbose_name='Размер')),
+                ('mtime', models.FloatField(verbose_name='Время изменения')),
+                ('chunk_size', models.PositiveIntegerField(verbose_name='Строк в пачке')),
+                ('chunk_hashes', models.JSONField(default=list, verbose_name='Хеши пачек')),
+                ('imported_at', models.DateTimeField(auto_now=True, verbose_name='Дата импорта')),
+            ],
+            options={
+                'verbose_name': 'Состояние импорта CSV',
+                'verbose_name_plural': 'Состояния импорта CSV',
+                'ordering': ('filename',),
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.1 on 2026-10-18 03:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_score_counts(apps, schema_editor):
+    Review = apps.get_model('reviews', 'Review')
+    TitleScoreCount = apps.get_model('reviews', 'TitleScoreCount')
+    TitleScoreCount.objects.bulk_create(
+        TitleScoreCount(
+            title_id=row['title'], score=row['score'], count=row['count']
+        )
+        for row in Review.objects.order_by().values('title', 'score')
+        .annotate(count=Count('pk'))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0008_csvimportstate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TitleScoreCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.PositiveSmallIntegerField(verbose_name='Оценка')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Отзывов')),
+                ('title', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='score_counts', to='reviews.title', verbose_name='Произведение')),
+            ],
+            options={
+                'verbose_name': 'Счётчик оценок',
+                'verbose_name_plural': 'Счётчики оценок',
+                'ordering': ('title', 'score'),
+                'constraints': [models.UniqueConstraint(fields=('title', 'score'), name='unique_score_count_per_title')],
+            },
+        ),
+        migrations.RunPython(fill_score_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.1.1 on 2026-10-18 03:08
+
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+from reviews.constants import TRENDING_WINDOW_DAYS
+from reviews.ranking import log_add_exp, trending_term, weighted_rating
+
+
+def fill_rankings(apps, schema_editor):
+    Review = apps.get_model('reviews', 'Review')
+    Title = apps.get_model('reviews', 'Title')
+    TitleRanking = apps.get_model('reviews', 'TitleRanking')
+    since = timezone.now() - timedelta(days=TRENDING_WINDOW_DAYS)
+    trending = {}
+    for title_id, pub_date in Review.objects.filter(
+        pub_date__gte=since
+    ).values_list('title_id', 'pub_date'):
+        trending[title_id] = log_add_exp(
+            trending.get(title_id), trending_term(pub_date)
+        )
+    TitleRanking.objects.bulk_create(
+        TitleRanking(
+            title_id=pk,
+            weighted_rating=weighted_rating(score_sum, reviews_count),
+            trending=trending.get(pk),
+        )
+        for pk, score_sum, reviews_count in Title.objects.filter(
+            reviews_count__gt=0
+        ).values_list('pk', 'score_sum', 'reviews_count')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0009_title_score_counts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TitleRanking',
+            fields=[
+                ('title', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ranking', serialize=False, to='reviews.title', verbose_name='Произведение')),
+                ('weighted_rating', models.FloatField(db_index=True, null=True, verbose_name='Взвешенный рейтинг')),
+                ('trending', models.FloatField(db_index=True, null=True, verbose_name='Тренд (логарифм)')),
+            ],
+            options={
+                'verbose_name': 'Рейтинг произведения',
+                'verbose_name_plural': 'Рейтинги произведений',
+                'ordering': ('-weighted_rating',),
+            },
+        ),
+        migrations.RunPython(fill_rankings, migrations.RunPython.noop),
+    ]
@@ -1,15 +1,35 @@
+from datetime import timedelta
+from itertools import islice
+
 from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import Avg, Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Cast, Coalesce, NullIf
+from django.dispatch import Signal
+from django.utils import timezone
 
 from .constants import (
     MIN_SCORE,
     MAX_SCORE,
     MAX_CHARFIELD_LEN,
+    RANKING_PRIOR_REVIEWS,
+    RANKING_PRIOR_SCORE,
     SLUG_DISPLAY_MAX_LEN,
+    TRENDING_WINDOW_DAYS,
+)
+from .ranking import (
+    log_add_exp,
+    log_add_exp_expression,
+    trending_term,
+    weighted_rating,
 )
 from .validators import validate_not_future_year
 
+# Отправляется после записи в обход post_save и post_delete (update(),
+# bulk_create()); sender — модель, строки которой изменились.
+bulk_changed = Signal()
+
 
 class NameSlugAbstract(models.Model):
     """Абстрактная моель для категории и жанра."""
@@ -63,6 +83,65 @@ class Genre(NameSlugAbstract):
         verbose_name_plural = 'Жанры'
 
 
+class TitleQuerySet(models.QuerySet):
+    """Запросы к произведениям с поддержкой агрегатов отзывов."""
+
+    def apply_review_delta(self, count_delta, score_delta):
+        """Сдвигает счётчик отзывов и сумму оценок одним UPDATE."""
+        reviews_count = F('reviews_count') + count_delta
+        score_sum = F('score_sum') + score_delta
+        return self.update(
+            reviews_count=reviews_count,
+            score_sum=score_sum,
+            rating=(
+                Cast(score_sum, models.FloatField())
+                / NullIf(reviews_count, 0)
+            ),
+        )
+
+    def rebuild_review_stats(self, batch_size=10000):
+        """Пересчитывает агрегаты и счётчики оценок по таблице отзывов."""
+        reviews = (
+            Review.objects
+            .filter(title=OuterRef('pk'))
+            .order_by()
+            .values('title')
+        )
+        score_counts = (
+            TitleScoreCount(
+                title_id=row['title'], score=row['score'], count=row['count']
+            )
+            for row in Review.objects
+            .filter(title__in=self.values('pk'))
+            .order_by()
+            .values('title', 'score')
+            .annotate(count=Count('pk'))
+            .iterator()
+        )
+        with transaction.atomic():
+            TitleScoreCount.objects.filter(
+                title__in=self.values('pk')
+            ).delete()
+            while batch := list(islice(score_counts, batch_size)):
+                TitleScoreCount.objects.bulk_create(batch)
+        updated = self.update(
+            reviews_count=Coalesce(
+                Subquery(reviews.annotate(value=Count('pk')).values('value')),
+                0
+            ),
+            score_sum=Coalesce(
+                Subquery(reviews.annotate(value=Sum('score')).values('value')),
+                0
+            ),
+            rating=Subquery(
+                reviews.annotate(value=Avg('score')).values('value')
+            ),
+        )
+        bulk_changed.send(sender=Title)
+        TitleRanking.objects.rebuild(self, batch_size)
+        return updated
+
+
 class Title(models.Model):
     """Произведение."""
 
@@ -91,6 +170,24 @@ class Title(models.Model):
         related_name='titles',
         verbose_name='Жанры'
     )
+    reviews_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество отзывов'
+    )
+    score_sum = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Сумма оценок'
+    )
+    rating = models.FloatField(
+        null=True,
+        editable=False,
+        db_index=True,
+        verbose_name='Рейтинг'
+    )
+
+    objects = TitleQuerySet.as_manager()
 
     class Meta:
         ordering = ('name',)
@@ -131,10 +228,193 @@ class Review(AuthorTextPubDateAbstract):
                 name='unique_review_per_title_author',
             ),
         )
+        indexes = (
+            models.Index(
+                fields=('title', '-pub_date', '-id'),
+                name='review_title_pub_date_idx',
+            ),
+        )
 
     def __str__(self):
         return f'{self.author} — {self.title} — {self.score}'
 
+    def read_rated_state(self):
+        """Читает учтённые произведение и оценку, блокируя строку отзыва."""
+        return (
+            Review.objects
+            .select_for_update()
+            .filter(pk=self.pk)
+            .values_list('title_id', 'score')
+            .first()
+        )
+
+    def save(self, *args, **kwargs):
+        # Агрегаты сдвигаются на разницу с оценкой из БД, прочитанной в той
+        # же транзакции, а не с копией в памяти. Блокировку строки дают
+        # только БД с SELECT FOR UPDATE; на SQLite запись сериализует сама
+        # база: профиль throughput начинает транзакции с IMMEDIATE, иначе
+        # конкурирующая запись получит ошибку блокировки.
+        with transaction.atomic():
+            self.rated_state = (
+                None if self._state.adding else self.read_rated_state()
+            )
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            self.rated_state = self.read_rated_state()
+            if self.rated_state is None:
+                return 0, {}
+            return super().delete(*args, **kwargs)
+
+
+class TitleScoreCountQuerySet(models.QuerySet):
+    """Запросы к счётчикам оценок."""
+
+    def shift(self, title_id, score, delta):
+        """Сдвигает счётчик оценки, создавая его при первом отзыве."""
+        counts = self.filter(title_id=title_id, score=score)
+        if counts.update(count=F('count') + delta) or delta < 0:
+            return
+        try:
+            with transaction.atomic():
+                self.create(title_id=title_id, score=score, count=delta)
+        except IntegrityError:
+            counts.update(count=F('count') + delta)
+
+
+class TitleScoreCount(models.Model):
+    """Число отзывов с данной оценкой у произведения."""
+
+    title = models.ForeignKey(
+        Title,
+        on_delete=models.CASCADE,
+        related_name='score_counts',
+        verbose_name='Произведение',
+    )
+    score = models.PositiveSmallIntegerField(verbose_name='Оценка')
+    count = models.PositiveIntegerField(default=0, verbose_name='Отзывов')
+
+    objects = TitleScoreCountQuerySet.as_manager()
+
+    class Meta:
+        ordering = ('title', 'score')
+        verbose_name = 'Счётчик оценок'
+        verbose_name_plural = 'Счётчики оценок'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('title', 'score'),
+                name='unique_score_count_per_title',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.title_id}: {self.score} × {self.count}'
+
+
+class TitleRankingQuerySet(models.QuerySet):
+    """Запросы к материализованному рейтингу произведений."""
+
+    def update_for(self, title_id, pub_date=None):
+        """Пересчитывает рейтинг произведения по его агрегатам отзывов.
+
+        Если передан `pub_date`, новый отзыв добавляется в тренд.
+        """
+        stats = Title.objects.filter(pk=OuterRef('title_id')).annotate(
+            value=models.Case(
+                models.When(reviews_count=0, then=None),
+                default=(
+                    Cast(F('score_sum'), models.FloatField())
+                    + RANKING_PRIOR_REVIEWS * RANKING_PRIOR_SCORE
+                ) / (F('reviews_count') + RANKING_PRIOR_REVIEWS),
+                output_field=models.FloatField(),
+            )
+        )
+        changes = {'weighted_rating': Subquery(stats.values('value'))}
+        if pub_date is not None:
+            term = trending_term(pub_date)
+            changes['trending'] = Coalesce(
+                log_add_exp_expression(F('trending'), term),
+                models.Value(term, output_field=models.FloatField()),
+            )
+        rankings = self.filter(title_id=title_id)
+        if not rankings.update(**changes):
+            self.bulk_create((TitleRanking(title_id=title_id),),
+                             ignore_conflicts=True)
+            rankings.update(**changes)
+
+    def rebuild(self, titles=None, batch_size=10000):
+        """Заново заполняет рейтинг произведений по таблице отзывов.
+
+        Тренд считается по отзывам за последние TRENDING_WINDOW_DAYS дней:
+        вклад более старых отзывов пренебрежимо мал.
+        """
+        if titles is None:
+            titles = Title.objects.all()
+        since = timezone.now() - timedelta(days=TRENDING_WINDOW_DAYS)
+        trending = {}
+        for title_id, pub_date in (
+            Review.objects
+            .filter(title__in=titles.values('pk'), pub_date__gte=since)
+            .order_by()
+            .values_list('title_id', 'pub_date')
+            .iterator()
+        ):
+            trending[title_id] = log_add_exp(
+                trending.get(title_id), trending_term(pub_date)
+            )
+        rankings = (
+            TitleRanking(
+                title_id=pk,
+                weighted_rating=weighted_rating(score_sum, reviews_count),
+                trending=trending.get(pk),
+            )
+            for pk, score_sum, reviews_count in titles
+            .filter(reviews_count__gt=0)
+            .order_by()
+            .values_list('pk', 'score_sum', 'reviews_count')
+            .iterator()
+        )
+        created = 0
+        with transaction.atomic():
+            self.filter(title__in=titles.values('pk')).delete()
+            while batch := list(islice(rankings, batch_size)):
+                created += len(self.bulk_create(batch))
+        bulk_changed.send(sender=TitleRanking)
+        return created
+
+
+class TitleRanking(models.Model):
+    """Байесовский рейтинг и тренд произведения для подборки лучших."""
+
+    title = models.OneToOneField(
+        Title,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='ranking',
+        verbose_name='Произведение',
+    )
+    weighted_rating = models.FloatField(
+        null=True,
+        db_index=True,
+        verbose_name='Взвешенный рейтинг'
+    )
+    trending = models.FloatField(
+        null=True,
+        db_index=True,
+        verbose_name='Тренд (логарифм)'
+    )
+
+    objects = TitleRankingQuerySet.as_manager()
+
+    class Meta:
+        ordering = ('-weighted_rating',)
+        verbose_name = 'Рейтинг произведения'
+        verbose_name_plural = 'Рейтинги произведений'
+
+    def __str__(self):
+        return f'{self.title_id}: {self.weighted_rating}'
+
 
 class Comment(AuthorTextPubDateAbstract):
     """Комментарий к отзыву."""
@@ -149,6 +429,51 @@ class Comment(AuthorTextPubDateAbstract):
         default_related_name = 'comments'
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = (
+            models.Index(
+                fields=('review', '-pub_date', '-id'),
+                name='comment_review_pub_date_idx',
+            ),
+        )
 
     def __str__(self):
         return self.text[:SLUG_DISPLAY_MAX_LEN]
+
+
+class CsvImportState(models.Model):
+    """Отпечаток CSV-файла, загруженного командой load_csv."""
+
+    filename = models.CharField(
+        max_length=MAX_CHARFIELD_LEN,
+        unique=True,
+        verbose_name='Файл'
+    )
+    size = models.PositiveBigIntegerField(verbose_name='Размер')
+    mtime = models.FloatField(verbose_name='Время изменения')
+    chunk_size = models.PositiveIntegerField(verbose_name='Строк в пачке')
+    chunk_hashes = models.JSONField(
+        default=list,
+        verbose_name='Хеши пачек'
+    )
+    imported_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата импорта'
+    )
+
+    class Meta:
+        ordering = ('filename',)
+        verbose_name = 'Состояние импорта CSV'
+        verbose_name_plural = 'Состояния импорта CSV'
+
+    def __str__(self):
+        return self.filename
+
+    def matches(self, stat, chunk_size):
+        """Проверяет, что файл не менялся с прошлого импорта.
+
+        Файл, в пачках которого были отклонённые строки (хеш пачки не
+        записан), неизменённым не считается.
+        """
+        return None not in self.chunk_hashes and (
+            self.size, self.mtime, self.chunk_size
+        ) == (stat.st_size, stat.st_mtime, chunk_size)
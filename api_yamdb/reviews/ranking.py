@@ -0,0 +1,52 @@
+import math
+from datetime import datetime, timezone
+
+from django.db.models import FloatField, Value
+from django.db.models.functions import Abs, Exp, Greatest, Ln
+
+from .constants import (
+    RANKING_PRIOR_REVIEWS,
+    RANKING_PRIOR_SCORE,
+    TRENDING_HALF_LIFE_DAYS,
+)
+
+# Тренд хранится как логарифм суммы exp(λ·(t - TRENDING_EPOCH)) по отзывам.
+# Порядок таких сумм не меняется со временем, поэтому затухание не требует
+# пересчёта таблицы, а логарифм не даёт сумме переполниться.
+TRENDING_EPOCH = datetime(2000, 1, 1, tzinfo=timezone.utc)
+DECAY_RATE = math.log(2) / (TRENDING_HALF_LIFE_DAYS * 24 * 60 * 60)
+
+
+def weighted_rating(score_sum, reviews_count):
+    """Байесовская оценка: средняя, сдвинутая к априорной."""
+    if not reviews_count:
+        return None
+    return (score_sum + RANKING_PRIOR_REVIEWS * RANKING_PRIOR_SCORE) / (
+        reviews_count + RANKING_PRIOR_REVIEWS
+    )
+
+
+def trending_term(moment):
+    """Логарифм вклада отзыва, опубликованного в момент `moment`."""
+    return DECAY_RATE * (moment - TRENDING_EPOCH).total_seconds()
+
+
+def log_add_exp(total, term):
+    """log(exp(total) + exp(term)) без переполнения; total может быть None."""
+    if total is None:
+        return term
+    high, low = max(total, term), min(total, term)
+    return high + math.log1p(math.exp(low - high))
+
+
+def log_add_exp_expression(total, term):
+    """То же, что log_add_exp(), в виде выражения для UPDATE."""
+    term = Value(term, output_field=FloatField())
+    return Greatest(total, term) + Ln(1 + Exp(-Abs(total - term)))
+
+
+def current_trending(total, now):
+    """Сумма вкладов отзывов, затухших к моменту `now`."""
+    if total is None:
+        return 0.0
+    return math.exp(total - trending_term(now))
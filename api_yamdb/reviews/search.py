@@ -0,0 +1,86 @@
+from django.db import connections
+from django.db.models.expressions import RawSQL
+
+# Триграммный токенизатор находит подстроки не короче трёх символов.
+FTS_MIN_TERM_LENGTH = 3
+
+FTS_INDEXES = {
+    'reviews_title': ('reviews_title_fts', 'name'),
+    'reviews_review': ('reviews_review_fts', 'text'),
+}
+
+CREATE_FTS_SQL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS {index} USING fts5("
+    "{column}, content='{table}', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS {index}_ai AFTER INSERT ON {table} BEGIN "
+    "INSERT INTO {index}(rowid, {column}) VALUES (new.id, new.{column}); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS {index}_ad AFTER DELETE ON {table} BEGIN "
+    "INSERT INTO {index}({index}, rowid, {column}) "
+    "VALUES ('delete', old.id, old.{column}); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS {index}_au AFTER UPDATE OF {column} "
+    "ON {table} BEGIN "
+    "INSERT INTO {index}({index}, rowid, {column}) "
+    "VALUES ('delete', old.id, old.{column}); "
+    "INSERT INTO {index}(rowid, {column}) VALUES (new.id, new.{column}); "
+    "END",
+    "INSERT INTO {index}({index}) VALUES ('rebuild')",
+)
+
+DROP_FTS_SQL = (
+    'DROP TRIGGER IF EXISTS {index}_ai',
+    'DROP TRIGGER IF EXISTS {index}_ad',
+    'DROP TRIGGER IF EXISTS {index}_au',
+    'DROP TABLE IF EXISTS {index}',
+)
+
+
+def create_fts_indexes(connection):
+    """Создаёт индексы FTS5 с триггерами синхронизации (только SQLite).
+
+    Пересоздание таблицы при миграции SQLite удаляет её триггеры, поэтому
+    функция идемпотентна и повторно вызывается командой
+    rebuild_search_index.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for table, (index, column) in FTS_INDEXES.items():
+            for sql in CREATE_FTS_SQL:
+                cursor.execute(
+                    sql.format(table=table, index=index, column=column)
+                )
+
+
+def drop_fts_indexes(connection):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for index, _ in FTS_INDEXES.values():
+            for sql in DROP_FTS_SQL:
+                cursor.execute(sql.format(index=index))
+
+
+def full_text_search(queryset, terms):
+    """Отбирает объекты, содержащие все подстроки `terms`, по индексу FTS5.
+
+    Возвращает None, если индекс неприменим: база данных не SQLite, у модели
+    нет индекса или какая-то подстрока короче трёх символов. В этом случае
+    вызывающий код выполняет обычный поиск через LIKE.
+    """
+    table = queryset.model._meta.db_table
+    if (
+        table not in FTS_INDEXES
+        or connections[queryset.db].vendor != 'sqlite'
+        or not terms
+        or any(len(term) < FTS_MIN_TERM_LENGTH for term in terms)
+    ):
+        return None
+    index, _ = FTS_INDEXES[table]
+    match = ' '.join(
+        '"{}"'.format(term.replace('"', '""')) for term in terms
+    )
+    return queryset.filter(pk__in=RawSQL(
+        f'SELECT rowid FROM {index} WHERE {index} MATCH %s', (match,)
+    ))
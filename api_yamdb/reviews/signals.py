@@ -0,0 +1,51 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Review, Title, TitleRanking, TitleScoreCount
+
+
+@receiver(post_save, sender=Review)
+def update_title_stats_on_save(sender, instance, created=False, raw=False,
+                               **kwargs):
+    """Учитывает новый или изменённый отзыв в агрегатах произведения.
+
+    Фикстуры (raw) не учитываются: после loaddata агрегаты пересчитывает
+    команда rebuild_title_stats.
+    """
+    if raw:
+        return
+    score = int(instance.score)
+    if instance.rated_state:
+        title_id, previous_score = instance.rated_state
+        if title_id == instance.title_id:
+            if previous_score != score:
+                Title.objects.filter(pk=title_id).apply_review_delta(
+                    0, score - previous_score
+                )
+                TitleScoreCount.objects.shift(title_id, previous_score, -1)
+                TitleScoreCount.objects.shift(title_id, score, 1)
+                TitleRanking.objects.update_for(title_id)
+            return
+        Title.objects.filter(pk=title_id).apply_review_delta(
+            -1, -previous_score
+        )
+        TitleScoreCount.objects.shift(title_id, previous_score, -1)
+        TitleRanking.objects.update_for(title_id)
+    Title.objects.filter(pk=instance.title_id).apply_review_delta(1, score)
+    TitleScoreCount.objects.shift(instance.title_id, score, 1)
+    TitleRanking.objects.update_for(
+        instance.title_id, instance.pub_date if created else None
+    )
+
+
+@receiver(post_delete, sender=Review)
+def update_title_stats_on_delete(sender, instance, origin=None, **kwargs):
+    """Исключает удалённый отзыв из агрегатов произведения."""
+    if isinstance(origin, Title) or getattr(origin, 'model', None) is Title:
+        return
+    title_id, score = getattr(instance, 'rated_state', None) or (
+        instance.title_id, instance.score
+    )
+    Title.objects.filter(pk=title_id).apply_review_delta(-1, -int(score))
+    TitleScoreCount.objects.shift(title_id, int(score), -1)
+    TitleRanking.objects.update_for(title_id)
@@ -0,0 +1,202 @@
+"""Индекс похожих произведений.
+
+Произведение описывается разреженным вектором из трёх блоков: жанры,
+категория и авторы отзывов. Каждый блок нормируется отдельно и умножается
+на вес из SIMILARITY_WEIGHTS, сходство — косинус между векторами. Команда
+build_similarity_index заранее находит ближайших соседей каждого
+произведения и сохраняет их в файлы .npy, которые читаются через mmap.
+
+NumPy и SciPy импортируются только при построении и чтении индекса: без них
+/similar/ считает сходство запросом к БД по общим жанрам.
+"""
+import os
+import shutil
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import Case, Count, F, IntegerField, Q, Value, When
+
+from .constants import SIMILAR_TITLES_COUNT, SIMILARITY_WEIGHTS
+from .models import Review, Title
+
+INDEX_FILES = ('ids', 'neighbors', 'scores')
+CURRENT_FILE = 'CURRENT'
+# Сколько значений сходства держать в памяти при обработке пачки строк.
+CHUNK_CELLS = 2 ** 24
+
+
+def feature_block(np, sparse, ids, rows, columns, weight):
+    """Матрица произведения × признаки с нормированными строками."""
+    rows = np.searchsorted(ids, np.asarray(rows, dtype=np.int64))
+    columns, inverse = np.unique(
+        np.asarray(columns, dtype=np.int64), return_inverse=True
+    )
+    matrix = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.float32), (rows, inverse)),
+        shape=(len(ids), len(columns)),
+    )
+    matrix.data[:] = 1
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.diags((weight / norms).astype(np.float32)) @ matrix
+
+
+def nearest_neighbors(np, features, count):
+    """Ближайшие по косинусу строки для каждой строки матрицы."""
+    size = features.shape[0]
+    count = min(count, size - 1)
+    neighbors = np.full((size, count), -1, dtype=np.int64)
+    scores = np.zeros((size, count), dtype=np.float32)
+    if count < 1:
+        return neighbors, scores
+    transposed = features.T.tocsc()
+    step = max(1, CHUNK_CELLS // size)
+    for start in range(0, size, step):
+        stop = min(start + step, size)
+        similarity = (features[start:stop] @ transposed).toarray()
+        rows = np.arange(stop - start)
+        similarity[rows, rows + start] = 0
+        top = np.argpartition(-similarity, count - 1, axis=1)[:, :count]
+        top_scores = np.take_along_axis(similarity, top, axis=1)
+        order = np.lexsort((top, -top_scores), axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+        neighbors[start:stop] = np.where(top_scores > 0, top, -1)
+        scores[start:stop] = np.where(top_scores > 0, top_scores, 0)
+    return neighbors, scores
+
+
+def build_index(directory=None, count=SIMILAR_TITLES_COUNT):
+    """Строит индекс по текущей БД и делает его действующим.
+
+    Файлы записываются в новый подкаталог, после чего имя подкаталога
+    атомарно заменяется в файле CURRENT: читающие процессы видят либо
+    старый, либо новый индекс целиком. Возвращает число произведений.
+    """
+    import numpy as np
+    from scipy import sparse
+
+    directory = directory or settings.SIMILARITY_INDEX_DIR
+    ids = np.fromiter(
+        Title.objects.order_by('pk').values_list('pk', flat=True),
+        dtype=np.int64,
+    )
+    genres = list(zip(*Title.genre.through.objects.values_list(
+        'title_id', 'genre_id'
+    ))) or ((), ())
+    categories = list(zip(*Title.objects.filter(
+        category__isnull=False
+    ).values_list('pk', 'category_id'))) or ((), ())
+    reviewers = list(zip(*Review.objects.values_list(
+        'title_id', 'author_id'
+    ))) or ((), ())
+    features = sparse.hstack([
+        feature_block(np, sparse, ids, *pairs, SIMILARITY_WEIGHTS[name])
+        for name, pairs in (
+            ('genre', genres),
+            ('category', categories),
+            ('reviewers', reviewers),
+        )
+    ]).tocsr()
+    norms = np.sqrt(
+        np.asarray(features.multiply(features).sum(axis=1)).ravel()
+    )
+    norms[norms == 0] = 1
+    features = sparse.diags((1 / norms).astype(np.float32)) @ features
+    neighbors, scores = nearest_neighbors(np, features, count)
+    neighbors = np.where(neighbors >= 0, ids[np.maximum(neighbors, 0)], -1)
+
+    os.makedirs(directory, exist_ok=True)
+    build = f'{time.time_ns()}'
+    os.makedirs(os.path.join(directory, build))
+    for name, array in zip(INDEX_FILES, (ids, neighbors, scores)):
+        np.save(os.path.join(directory, build, f'{name}.npy'), array)
+    current = os.path.join(directory, CURRENT_FILE)
+    with open(f'{current}.tmp', 'w') as file:
+        file.write(build)
+    os.replace(f'{current}.tmp', current)
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if name != build and os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+    return len(ids)
+
+
+class SimilarityIndex:
+    """Индекс, открытый только для чтения через mmap."""
+
+    def __init__(self, path):
+        import numpy as np
+
+        self.np = np
+        self.ids, self.neighbors, self.scores = (
+            np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r')
+            for name in INDEX_FILES
+        )
+
+    def similar(self, title_id, limit):
+        """id соседей по убыванию сходства или None, если их нет в индексе."""
+        position = int(self.np.searchsorted(self.ids, title_id))
+        if position >= len(self.ids) or self.ids[position] != title_id:
+            return None
+        return [
+            int(neighbor) for neighbor in self.neighbors[position, :limit]
+            if neighbor >= 0
+        ]
+
+
+_lock = threading.Lock()
+_loaded = (None, None)
+
+
+def get_index():
+    """Действующий индекс процесса или None, если он не построен.
+
+    Индекс открывается при первом обращении и переоткрывается, когда
+    команда build_similarity_index заменяет файл CURRENT.
+    """
+    global _loaded
+    current = os.path.join(settings.SIMILARITY_INDEX_DIR, CURRENT_FILE)
+    try:
+        key = (current, os.stat(current).st_mtime_ns)
+    except OSError:
+        return None
+    loaded_key, index = _loaded
+    if loaded_key == key:
+        return index
+    with _lock:
+        try:
+            with open(current) as file:
+                build = file.read().strip()
+            index = SimilarityIndex(
+                os.path.join(settings.SIMILARITY_INDEX_DIR, build)
+            )
+        except (ImportError, OSError, ValueError):
+            return None
+        _loaded = (key, index)
+    return index
+
+
+def similar_by_genres(title_id, limit):
+    """Запасной вариант без индекса: общие жанры и та же категория."""
+    category = Title.objects.filter(pk=title_id).values('category_id')[:1]
+    genres = Title.genre.through.objects.filter(
+        title_id=title_id
+    ).values('genre_id')
+    return list(
+        Title.objects
+        .filter(Q(genre__in=genres) | Q(category_id=category))
+        .exclude(pk=title_id)
+        .annotate(
+            shared=Count('genre', filter=Q(genre__in=genres), distinct=True)
+            + Case(
+                When(category_id=category, then=Value(1)),
+                default=Value(0),
+                output_field=IntegerField(),
+            )
+        )
+        .filter(shared__gt=0)
+        .order_by('-shared', F('rating').desc(nulls_last=True), 'pk')
+        .values_list('pk', flat=True)[:limit]
+    )
@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 
-from .models import User
+from .models import OutboxEmail, User
 
 
 @admin.register(User)
@@ -17,3 +17,17 @@ class UserAdmin(BaseUserAdmin):
     list_editable = ('role',)
     search_fields = ('username', 'email', 'role',)
     empty_value_display = 'Не указано'
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = (
+        'recipient',
+        'subject',
+        'created_at',
+        'attempts',
+        'sent_at',
+    )
+    list_filter = ('sent_at',)
+    search_fields = ('recipient',)
+    readonly_fields = ('created_at', 'last_error')
@@ -3,5 +3,6 @@ MAX_EMAIL_LENGTH = 254
 MAX_FIRSTNAME_LENGTH = 150
 MAX_LASTNAME_LENGTH = 150
 MAX_CONFIRMATION_CODE_LENGTH = 300
+MAX_EMAIL_SUBJECT_LENGTH = 255
 
 ALLOWED_USERNAME_SYMBOLS = r'^[\w.@+-]+$'
@@ -0,0 +1,160 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F
+from django.utils import timezone
+
+from users.models import OutboxEmail
+
+# Сколько секунд письмо закреплено за запуском команды, пока отправляется.
+LEASE_SECONDS = 300
+# Задержка перед повтором: RETRY_DELAY_SECONDS * 2 ** (попытка - 1).
+RETRY_DELAY_SECONDS = 30
+
+
+def send_batch(emails):
+    """Отправляет пачку писем через одно соединение с почтовым сервером.
+
+    Выполняется в потоках пула и не обращается к базе данных. Возвращает
+    пары (письмо, текст ошибки или None).
+    """
+    results = []
+    try:
+        connection = get_connection(fail_silently=False)
+        connection.open()
+    except Exception as error:
+        return [(email, f'соединение: {error}') for email in emails]
+    try:
+        for email in emails:
+            try:
+                EmailMessage(
+                    subject=email.subject,
+                    body=email.message,
+                    from_email=email.from_email,
+                    to=(email.recipient,),
+                    connection=connection,
+                ).send()
+            except Exception as error:
+                results.append((email, str(error) or repr(error)))
+            else:
+                results.append((email, None))
+    finally:
+        connection.close()
+    return results
+
+
+class Command(BaseCommand):
+    """Команда отправки исходящих писем."""
+
+    help = (
+        'Отправляет письма из таблицы исходящих пачками в пуле потоков, '
+        'повторяя неудачные попытки с растущей задержкой.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='число писем, отправляемых через одно соединение',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='число потоков отправки',
+        )
+        parser.add_argument(
+            '--max-attempts',
+            type=int,
+            default=5,
+            help='после стольких неудач письмо больше не отправляется',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='не завершаться, а ждать новые письма',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5,
+            help='пауза между проверками в режиме --loop, с',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1 or options['workers'] < 1:
+            raise CommandError(
+                '--batch-size и --workers должны быть больше нуля'
+            )
+        self.batch_size = options['batch_size']
+        self.max_attempts = options['max_attempts']
+        self.totals = {'sent': 0, 'retry': 0, 'failed': 0}
+        started = time.perf_counter()
+        with ThreadPoolExecutor(options['workers']) as executor:
+            while True:
+                batches = [
+                    batch for batch in (
+                        self.claim_batch()
+                        for _ in range(options['workers'])
+                    ) if batch
+                ]
+                if not batches:
+                    if not options['loop']:
+                        break
+                    time.sleep(options['interval'])
+                    continue
+                for results in executor.map(send_batch, batches):
+                    self.record(results)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Отправлено {self.totals["sent"]}, отложено для повтора '
+            f'{self.totals["retry"]}, не отправлено {self.totals["failed"]} '
+            f'за {elapsed:.2f} с '
+            f'({self.totals["sent"] / elapsed:.0f} писем/с)'
+        ))
+
+    def claim_batch(self):
+        """Закрепляет пачку писем, готовых к отправке, за этим запуском.
+
+        Срок следующей попытки переносится вперёд условным UPDATE, поэтому
+        параллельный запуск команды не возьмёт те же письма.
+        """
+        pks = list(
+            OutboxEmail.objects.due(self.max_attempts)
+            .values_list('pk', flat=True)[:self.batch_size]
+        )
+        if not pks:
+            return []
+        lease = timezone.now() + timedelta(seconds=LEASE_SECONDS)
+        OutboxEmail.objects.due(self.max_attempts).filter(
+            pk__in=pks
+        ).update(next_attempt_at=lease)
+        return list(
+            OutboxEmail.objects.filter(pk__in=pks, next_attempt_at=lease)
+        )
+
+    def record(self, results):
+        now = timezone.now()
+        sent = [email.pk for email, error in results if error is None]
+        OutboxEmail.objects.filter(pk__in=sent).update(
+            sent_at=now, attempts=F('attempts') + 1, last_error=''
+        )
+        self.totals['sent'] += len(sent)
+        for email, error in results:
+            if error is None:
+                continue
+            attempts = email.attempts + 1
+            OutboxEmail.objects.filter(pk=email.pk).update(
+                attempts=attempts,
+                last_error=error,
+                next_attempt_at=now + timedelta(
+                    seconds=RETRY_DELAY_SECONDS * 2 ** (attempts - 1)
+                ),
+            )
+            outcome = 'retry' if attempts < self.max_attempts else 'failed'
+            self.totals[outcome] += 1
+            self.stderr.write(f'{email.recipient}: {error}')
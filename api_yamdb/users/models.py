@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils import timezone
 
 from .constants import (
     MAX_USERNAME_LENGTH,
@@ -7,6 +8,7 @@ from .constants import (
     MAX_FIRSTNAME_LENGTH,
     MAX_LASTNAME_LENGTH,
     MAX_CONFIRMATION_CODE_LENGTH,
+    MAX_EMAIL_SUBJECT_LENGTH,
 )
 from .validators import username_validator
 
@@ -81,3 +83,73 @@ class User(AbstractUser):
 
     def __str__(self):
         return self.username
+
+
+class OutboxEmailQuerySet(models.QuerySet):
+    """Запросы к исходящим письмам."""
+
+    def due(self, max_attempts):
+        """Неотправленные письма, которые пора отправить или повторить."""
+        return self.filter(
+            sent_at__isnull=True,
+            attempts__lt=max_attempts,
+            next_attempt_at__lte=timezone.now(),
+        )
+
+    def stats(self):
+        """Число отправленных, новых и повторяемых писем одним запросом."""
+        unsent = models.Q(sent_at__isnull=True)
+        return self.aggregate(
+            sent=models.Count('pk', filter=~unsent),
+            pending=models.Count('pk', filter=unsent & models.Q(attempts=0)),
+            retrying=models.Count(
+                'pk', filter=unsent & models.Q(attempts__gt=0)
+            ),
+        )
+
+
+class OutboxEmail(models.Model):
+    """Письмо, ожидающее отправки командой send_outbox."""
+
+    subject = models.CharField(
+        max_length=MAX_EMAIL_SUBJECT_LENGTH,
+        verbose_name='Тема'
+    )
+    message = models.TextField(verbose_name='Текст')
+    from_email = models.EmailField(
+        max_length=MAX_EMAIL_LENGTH,
+        verbose_name='Отправитель'
+    )
+    recipient = models.EmailField(
+        max_length=MAX_EMAIL_LENGTH,
+        verbose_name='Получатель'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата создания'
+    )
+    next_attempt_at = models.DateTimeField(
+        default=timezone.now,
+        db_index=True,
+        verbose_name='Следующая попытка'
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Число попыток'
+    )
+    last_error = models.TextField(blank=True, verbose_name='Последняя ошибка')
+    sent_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Дата отправки'
+    )
+
+    objects = OutboxEmailQuerySet.as_manager()
+
+    class Meta:
+        ordering = ('pk',)
+        verbose_name = 'Исходящее письмо'
+        verbose_name_plural = 'Исходящие письма'
+
+    def __str__(self):
+        return f'{self.recipient}: {self.subject}'
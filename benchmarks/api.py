@@ -0,0 +1,189 @@
+"""Нагрузочный замер основных эндпоинтов API.
+
+Для каждого масштаба каталог заполняется заново, после чего эндпоинты
+вызываются клиентом Django внутри процесса. Запуск из корня репозитория:
+
+    python -m benchmarks.api --titles 1000 100000 --requests 200
+"""
+import argparse
+import json
+import random
+import tempfile
+import time
+from itertools import count
+from pathlib import Path
+
+from benchmarks.seed import seed_catalog
+from benchmarks.utils import setup_django, summarize
+
+API_URL = '/api/v1/'
+
+
+def make_scenarios(rng):
+    """Возвращает функции, строящие запрос (метод, адрес, данные)."""
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.tokens import default_token_generator
+    from reviews.models import Genre, Review, Title
+
+    User = get_user_model()
+    title_ids = list(Title.objects.values_list('pk', flat=True)[:1000])
+    reviews = list(
+        Review.objects.values_list('title_id', 'pk')[:1000]
+    )
+    genres = list(Genre.objects.values_list('slug', flat=True))
+    words = [
+        name.split()[0].lower()
+        for name in Title.objects.values_list('name', flat=True)[:100]
+    ]
+    users = [
+        (user.username, default_token_generator.make_token(user))
+        for user in User.objects.all()[:100]
+    ]
+    signups = count()
+
+    def signup():
+        number = next(signups)
+        return 'post', f'{API_URL}auth/signup/', {
+            'username': f'bench{number}',
+            'email': f'bench{number}@yamdb.fake',
+        }
+
+    def titles_url(**params):
+        query = '&'.join(f'{key}={value}' for key, value in params.items())
+        return f'{API_URL}titles/?{query}'
+
+    return {
+        'titles-list': lambda: ('get', titles_url(), None),
+        'titles-list-filtered': lambda: ('get', titles_url(
+            genre=rng.choice(genres), year=rng.randint(1900, 2020)
+        ), None),
+        'titles-list-ordered': lambda: ('get', titles_url(
+            ordering='-rating'
+        ), None),
+        'titles-top': lambda: ('get', f'{API_URL}titles/top/', None),
+        'titles-top-filtered': lambda: ('get', (
+            f'{API_URL}titles/top/?by=trending&genre={rng.choice(genres)}'
+        ), None),
+        'titles-similar': lambda: ('get', (
+            f'{API_URL}titles/{rng.choice(title_ids)}/similar/'
+        ), None),
+        'titles-search': lambda: ('get', titles_url(
+            name=rng.choice(words)
+        ), None),
+        'reviews-list': lambda: ('get', (
+            f'{API_URL}titles/{rng.choice(title_ids)}/reviews/'
+        ), None),
+        'reviews-list-cursor': lambda: ('get', (
+            f'{API_URL}titles/{rng.choice(title_ids)}/reviews/'
+            '?pagination=cursor'
+        ), None),
+        'comments-list': lambda: ('get', (
+            '{}titles/{}/reviews/{}/comments/'.format(
+                API_URL, *rng.choice(reviews)
+            )
+        ), None),
+        'signup': signup,
+        'token': lambda: ('post', f'{API_URL}auth/token/', dict(zip(
+            ('username', 'confirmation_code'), rng.choice(users)
+        ))),
+    }
+
+
+def drive(client, make_request, requests, warmup, use_cache):
+    """Выполняет запросы и возвращает сводку по задержкам и запросам к БД.
+
+    Без `use_cache` кэш ответов очищается перед каждым запросом (вне
+    замера), чтобы мерить построение ответа, а не чтение из кэша.
+    """
+    from django.db import connection
+
+    from api.cache import get_cache
+    from api.metrics import RequestMetrics
+
+    for _ in range(warmup):
+        method, url, data = make_request()
+        getattr(client, method)(url, data)
+    durations, queries, statuses = [], [], set()
+    elapsed = 0.0
+    for _ in range(requests):
+        method, url, data = make_request()
+        if not use_cache:
+            get_cache().clear()
+        metrics = RequestMetrics()
+        with connection.execute_wrapper(metrics):
+            request_started = time.perf_counter()
+            response = getattr(client, method)(url, data)
+            duration = time.perf_counter() - request_started
+        elapsed += duration
+        durations.append(duration * 1000)
+        queries.append(metrics.queries)
+        statuses.add(response.status_code)
+    return {
+        **summarize(durations),
+        'queries_per_request': round(sum(queries) / requests, 2),
+        'requests_per_second': round(requests / elapsed, 1),
+        'statuses': sorted(statuses),
+    }
+
+
+def run(titles, args):
+    from django.core.management import call_command
+    from rest_framework.test import APIClient
+
+    from api.cache import get_cache
+
+    call_command('flush', interactive=False, verbosity=0)
+    get_cache().clear()
+    seeded = time.perf_counter()
+    sizes = seed_catalog(
+        titles, args.reviews_per_title, args.comments_per_review
+    )
+    seeded = time.perf_counter() - seeded
+    rng = random.Random(titles)
+    client = APIClient()
+    scenarios = make_scenarios(rng)
+    return {
+        'catalog': sizes,
+        'seed_seconds': round(seeded, 2),
+        'endpoints': {
+            name: drive(
+                client, make_request, args.requests, args.warmup, args.cache
+            )
+            for name, make_request in scenarios.items()
+            if not args.endpoints or name in args.endpoints
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--titles', type=int, nargs='+', default=(1000,))
+    parser.add_argument('--reviews-per-title', type=int, default=3)
+    parser.add_argument('--comments-per-review', type=int, default=1)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument(
+        '--endpoints', nargs='+',
+        help='замерять только перечисленные сценарии'
+    )
+    parser.add_argument(
+        '--cache', action='store_true',
+        help='не очищать кэш ответов перед запросами'
+    )
+    parser.add_argument(
+        '--db', type=Path,
+        help='файл базы данных; по умолчанию временный'
+    )
+    args = parser.parse_args()
+
+    overrides = {
+        'EMAIL_BACKEND': 'django.core.mail.backends.dummy.EmailBackend',
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_django(args.db or Path(tmp) / 'api.sqlite3', **overrides)
+        results = [run(titles, args) for titles in sorted(args.titles)]
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
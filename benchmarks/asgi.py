@@ -0,0 +1,226 @@
+"""Пропускная способность чтения под WSGI и ASGI при параллельных клиентах.
+
+Каталог заполняется один раз, после чего для каждого режима в отдельном
+процессе запускаются обработчики Django без HTTP-сервера:
+
+- `wsgi` — WSGIHandler в пуле из `--threads` потоков, как у сервера с
+  потоками (gunicorn --threads);
+- `asgi` — ASGIHandler с синхронными представлениями;
+- `asgi-async` — ASGIHandler с API_ASYNC_VIEWS=1.
+
+Клиенты запрашивают страницы списка произведений, произведения и списки
+отзывов; кэш ответов очищается перед каждым запросом. Для каждого числа
+одновременных клиентов выводятся задержки, число запросов в секунду и
+наибольшее число потоков процесса. Запуск из корня репозитория:
+
+    python -m benchmarks.asgi --concurrency 1 16 64 --seconds 5
+"""
+import argparse
+import asyncio
+import io
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from benchmarks.utils import setup_django, summarize
+
+API_URL = '/api/v1/'
+MODES = ('wsgi', 'asgi', 'asgi-async')
+OVERRIDES = {
+    'EMAIL_BACKEND': 'django.core.mail.backends.dummy.EmailBackend',
+}
+
+
+def seed(db_path, titles, reviews_per_title):
+    setup_django(db_path, **OVERRIDES)
+
+    from benchmarks.seed import seed_catalog
+    seed_catalog(titles, reviews_per_title, 0)
+
+
+def make_path(rng, title_ids):
+    choice = rng.random()
+    if choice < 0.4:
+        return f'{API_URL}titles/?page={rng.randint(1, 10)}'
+    if choice < 0.7:
+        return f'{API_URL}titles/{rng.choice(title_ids)}/'
+    return f'{API_URL}titles/{rng.choice(title_ids)}/reviews/'
+
+
+def wsgi_request(application, url):
+    path, _, query = url.partition('?')
+    environ = {
+        'REQUEST_METHOD': 'GET',
+        'SCRIPT_NAME': '',
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'SERVER_NAME': 'testserver',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'REMOTE_ADDR': '127.0.0.1',
+        'HTTP_HOST': 'testserver',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    statuses = []
+    response = application(
+        environ, lambda status, headers, exc_info=None: statuses.append(status)
+    )
+    try:
+        b''.join(response)
+    finally:
+        response.close()
+    return int(statuses[0].split()[0])
+
+
+async def asgi_request(application, url):
+    path, _, query = url.partition('?')
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': query.encode(),
+        'root_path': '',
+        'headers': [(b'host', b'testserver')],
+        'client': ('127.0.0.1', 50000),
+        'server': ('testserver', 80),
+    }
+    received = False
+    statuses = []
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        # клиент не отключается: Django отменит ожидание после ответа
+        return await asyncio.get_running_loop().create_future()
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            statuses.append(message['status'])
+
+    await application(scope, receive, send)
+    return statuses[0]
+
+
+async def drive(request, rng, title_ids, concurrency, seconds):
+    from api.cache import get_cache
+
+    durations, errors, threads = [], 0, threading.active_count()
+    deadline = time.perf_counter() + seconds
+
+    async def client():
+        nonlocal errors, threads
+        while time.perf_counter() < deadline:
+            get_cache().clear()
+            started = time.perf_counter()
+            status = await request(make_path(rng, title_ids))
+            threads = max(threads, threading.active_count())
+            if status >= 400:
+                errors += 1
+                continue
+            durations.append((time.perf_counter() - started) * 1000)
+
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return {
+        **(summarize(durations) if durations else {'count': 0}),
+        'requests_per_second': round(len(durations) / seconds, 1),
+        'errors': errors,
+        'max_threads': threads,
+    }
+
+
+def measure(mode, db_path, args, results):
+    """Замеряет режим `mode` для всех значений --concurrency."""
+    os.environ['API_ASYNC_VIEWS'] = '1' if mode == 'asgi-async' else ''
+    setup_django(db_path, migrate=False, **OVERRIDES)
+
+    from django.core.asgi import get_asgi_application
+    from django.core.wsgi import get_wsgi_application
+
+    from reviews.models import Title
+
+    rng = random.Random(0)
+    title_ids = list(Title.objects.values_list('pk', flat=True)[:1000])
+    collected = {}
+    try:
+        for concurrency in args.concurrency:
+            if mode == 'wsgi':
+                application = get_wsgi_application()
+                pool = ThreadPoolExecutor(max_workers=args.threads)
+
+                def request(url):
+                    return asyncio.get_running_loop().run_in_executor(
+                        pool, wsgi_request, application, url
+                    )
+            else:
+                application = get_asgi_application()
+
+                def request(url):
+                    return asgi_request(application, url)
+            collected[concurrency] = asyncio.run(drive(
+                request, rng, title_ids, concurrency, args.seconds
+            ))
+            if mode == 'wsgi':
+                pool.shutdown()
+    finally:
+        results.put((mode, collected))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--titles', type=int, default=2000)
+    parser.add_argument('--reviews-per-title', type=int, default=3)
+    parser.add_argument(
+        '--concurrency', type=int, nargs='+', default=(1, 16, 64)
+    )
+    parser.add_argument(
+        '--threads', type=int, default=8,
+        help='размер пула потоков WSGI'
+    )
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument(
+        '--modes', nargs='+', choices=MODES, default=MODES
+    )
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context('spawn')
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = Path(directory) / 'asgi.sqlite3'
+        seeder = context.Process(
+            target=seed, args=(db_path, args.titles, args.reviews_per_title)
+        )
+        seeder.start()
+        seeder.join()
+        queue = context.Queue()
+        for mode in args.modes:
+            worker = context.Process(
+                target=measure, args=(mode, db_path, args, queue)
+            )
+            worker.start()
+            name, collected = queue.get()
+            worker.join()
+            results[name] = collected
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
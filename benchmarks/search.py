@@ -0,0 +1,92 @@
+"""Сравнение поиска произведений по названию: LIKE против FTS5.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.search --titles 100000 1000000
+"""
+import argparse
+import json
+import random
+import tempfile
+from pathlib import Path
+
+from benchmarks.utils import make_vocabulary, setup_django, summarize, timed
+
+PAGE_SIZE = 10
+
+
+def seed_titles(total, vocabulary, batch_size=10000, seed=0):
+    from reviews.models import Title
+
+    rng = random.Random(seed)
+    existing = Title.objects.count()
+    for start in range(existing, total, batch_size):
+        Title.objects.bulk_create(
+            Title(
+                name=' '.join(rng.choices(vocabulary, k=3)).capitalize(),
+                year=rng.randint(1900, 2020),
+                description='',
+            )
+            for _ in range(min(batch_size, total - start))
+        )
+
+
+def run(total, vocabulary, queries, repeat):
+    from reviews.models import Title
+    from reviews.search import full_text_search
+
+    seed_titles(total, vocabulary)
+    rng = random.Random(total)
+    terms = [rng.choice(vocabulary) for _ in range(queries)]
+    titles = Title.objects.order_by('name')
+
+    def page(queryset):
+        queryset.count()
+        list(queryset[:PAGE_SIZE])
+
+    def like():
+        for term in terms:
+            page(titles.filter(name__icontains=term))
+
+    def fts():
+        for term in terms:
+            page(full_text_search(titles, (term,)))
+
+    return {
+        'titles': total,
+        'queries': queries,
+        'like': summarize(
+            [duration / queries for duration in timed(like, repeat)]
+        ),
+        'fts': summarize(
+            [duration / queries for duration in timed(fts, repeat)]
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        '--titles', type=int, nargs='+', default=(100_000, 1_000_000)
+    )
+    parser.add_argument('--queries', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--vocabulary', type=int, default=5000)
+    parser.add_argument(
+        '--db', type=Path,
+        help='файл базы данных; по умолчанию временный'
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_django(args.db or Path(tmp) / 'search.sqlite3')
+        vocabulary = make_vocabulary(args.vocabulary)
+        results = [
+            run(total, vocabulary, args.queries, args.repeat)
+            for total in sorted(args.titles)
+        ]
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""Заполнение базы синтетическим каталогом для нагрузочных замеров.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.seed --titles 100000 --db catalog.sqlite3
+"""
+import argparse
+import json
+import random
+from itertools import islice
+from pathlib import Path
+
+from benchmarks.utils import make_vocabulary, setup_django
+
+CATEGORIES = 20
+GENRES = 50
+MAX_GENRES_PER_TITLE = 3
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def make_text(rng, vocabulary, words):
+    return ' '.join(rng.choices(vocabulary, k=words)).capitalize()
+
+
+def seed_catalog(titles, reviews_per_title=3, comments_per_review=1,
+                 users=None, batch_size=5000, seed=0):
+    """Создаёт каталог через bulk_create и возвращает размеры таблиц.
+
+    Произведения записываются пачками; вместе с каждой пачкой в той же
+    транзакции пишутся связи с жанрами, отзывы и комментарии. Сигналы при
+    этом не срабатывают, поэтому агрегаты отзывов пересчитываются в конце.
+    """
+    from django.contrib.auth import get_user_model
+    from django.db import transaction
+    from reviews.models import Category, Comment, Genre, Review, Title
+
+    User = get_user_model()
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(5000, seed)
+    users = users or max(100, titles // 10, reviews_per_title)
+
+    categories = Category.objects.bulk_create(
+        Category(name=f'Категория {number}', slug=f'category-{number}')
+        for number in range(CATEGORIES)
+    )
+    genres = Genre.objects.bulk_create(
+        Genre(name=f'Жанр {number}', slug=f'genre-{number}')
+        for number in range(GENRES)
+    )
+    authors = []
+    for batch in batches(range(users), batch_size):
+        authors += User.objects.bulk_create(
+            User(
+                username=f'user{number}',
+                email=f'user{number}@yamdb.fake',
+                password='!',
+            )
+            for number in batch
+        )
+
+    for batch in batches(range(titles), batch_size):
+        with transaction.atomic():
+            created = Title.objects.bulk_create(
+                Title(
+                    name=make_text(rng, vocabulary, 3),
+                    year=rng.randint(1900, 2020),
+                    description=make_text(rng, vocabulary, 12),
+                    category=rng.choice(categories),
+                )
+                for _ in batch
+            )
+            Title.genre.through.objects.bulk_create(
+                Title.genre.through(title_id=title.pk, genre_id=genre.pk)
+                for title in created
+                for genre in rng.sample(
+                    genres, rng.randint(1, MAX_GENRES_PER_TITLE)
+                )
+            )
+            reviews = Review.objects.bulk_create(
+                Review(
+                    title_id=title.pk,
+                    author=author,
+                    text=make_text(rng, vocabulary, 20),
+                    score=rng.randint(1, 10),
+                )
+                for title in created
+                for author in rng.sample(authors, reviews_per_title)
+            )
+            Comment.objects.bulk_create(
+                Comment(
+                    review_id=review.pk,
+                    author=rng.choice(authors),
+                    text=make_text(rng, vocabulary, 10),
+                )
+                for review in reviews
+                for _ in range(comments_per_review)
+            )
+    Title.objects.rebuild_review_stats()
+    return {
+        'categories': CATEGORIES,
+        'genres': GENRES,
+        'users': users,
+        'titles': titles,
+        'reviews': titles * reviews_per_title,
+        'comments': titles * reviews_per_title * comments_per_review,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--titles', type=int, default=10_000)
+    parser.add_argument('--reviews-per-title', type=int, default=3)
+    parser.add_argument('--comments-per-review', type=int, default=1)
+    parser.add_argument('--db', type=Path, required=True)
+    args = parser.parse_args()
+
+    setup_django(args.db)
+    print(json.dumps(seed_catalog(
+        args.titles, args.reviews_per_title, args.comments_per_review
+    ), indent=2))
+
+
+if __name__ == '__main__':
+    main()
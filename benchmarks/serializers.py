@@ -0,0 +1,102 @@
+"""Сериализация страниц списков: ModelSerializer против планов и orjson.
+
+Для произведений, отзывов и комментариев страница из `--rows` объектов
+выбирается и кодируется в JSON двумя способами: запросом объектов,
+сериализатором и JSONRenderer, как в обычном list(), и запросом
+values_list() с планом сериализатора и FastJSONRenderer, как при
+API_FAST_JSON. Перед замером проверяется, что ответы совпадают байт в
+байт. Запуск из корня репозитория:
+
+    python -m benchmarks.serializers --titles 2000 --rows 10 100 1000
+"""
+import argparse
+import json
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+
+from benchmarks.seed import seed_catalog
+from benchmarks.utils import setup_django, summarize, timed
+
+
+def get_resources():
+    """Запросы объектов и сериализаторы списков API."""
+    from api.serializers import (
+        CommentSerializer,
+        ReviewSerializer,
+        TitleReadSerializer,
+    )
+    from reviews.models import Comment, Review, Title
+
+    return {
+        'titles': (
+            Title.objects.select_related('category')
+            .prefetch_related('genre').order_by('name'),
+            TitleReadSerializer,
+        ),
+        'reviews': (
+            Review.objects.select_related('author').order_by('-pub_date'),
+            ReviewSerializer,
+        ),
+        'comments': (
+            Comment.objects.select_related('author').order_by('-pub_date'),
+            CommentSerializer,
+        ),
+    }
+
+
+def run(rows, repeat):
+    from rest_framework.renderers import JSONRenderer
+
+    from api.plans import get_plan
+    from api.renderers import FastJSONRenderer
+
+    context = {'view': SimpleNamespace(fast_json=True)}
+    results = {}
+    for name, (queryset, serializer_class) in get_resources().items():
+        plan = get_plan(serializer_class)
+
+        def serializer():
+            return JSONRenderer().render(
+                serializer_class(queryset[:rows], many=True).data
+            )
+
+        def fast():
+            return FastJSONRenderer().render(
+                plan.build(plan.queryset(queryset)[:rows]),
+                renderer_context=context,
+            )
+
+        assert serializer() == fast(), f'{name}: ответы различаются'
+        serializer_ms = summarize(timed(serializer, repeat))
+        fast_ms = summarize(timed(fast, repeat))
+        results[name] = {
+            'serializer': serializer_ms,
+            'plan': fast_ms,
+            'speedup': round(serializer_ms['mean_ms'] / fast_ms['mean_ms'], 2),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--titles', type=int, default=2000)
+    parser.add_argument('--reviews-per-title', type=int, default=3)
+    parser.add_argument('--comments-per-review', type=int, default=1)
+    parser.add_argument('--rows', type=int, nargs='+', default=(10, 100))
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_django(Path(tmp) / 'serializers.sqlite3')
+        seed_catalog(
+            args.titles, args.reviews_per_title, args.comments_per_review
+        )
+        results = {
+            rows: run(rows, args.repeat) for rows in sorted(args.rows)
+        }
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+"""Параллельные чтение и запись через API при разных профилях SQLite.
+
+Для каждого профиля (SQLITE_PROFILE) каталог заполняется в отдельной базе,
+после чего процессы-читатели запрашивают списки произведений и отзывов, а
+процессы-писатели меняют оценки отзывов. Кэш ответов очищается перед
+каждым чтением, чтобы все чтения доходили до базы. Запуск из корня
+репозитория:
+
+    python -m benchmarks.sqlite --readers 4 --writers 2 --seconds 10
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.utils import setup_django, summarize
+
+API_URL = '/api/v1/'
+PROFILES = ('default', 'throughput')
+OVERRIDES = {
+    'EMAIL_BACKEND': 'django.core.mail.backends.dummy.EmailBackend',
+}
+
+
+def seed(db_path, profile, titles, reviews_per_title):
+    os.environ['SQLITE_PROFILE'] = profile
+    setup_django(db_path, **OVERRIDES)
+
+    from benchmarks.seed import seed_catalog
+    seed_catalog(titles, reviews_per_title, 0)
+
+
+def make_reader(rng):
+    from reviews.models import Title
+
+    title_ids = list(Title.objects.values_list('pk', flat=True)[:1000])
+
+    def read(client):
+        if rng.random() < 0.5:
+            return client.get(f'{API_URL}titles/?page={rng.randint(1, 10)}')
+        return client.get(
+            f'{API_URL}titles/{rng.choice(title_ids)}/reviews/'
+        )
+    return read
+
+
+def make_writer(rng):
+    from reviews.models import Review
+
+    reviews = list(Review.objects.select_related('author')[:1000])
+
+    def write(client):
+        review = rng.choice(reviews)
+        client.force_authenticate(review.author)
+        return client.patch(
+            f'{API_URL}titles/{review.title_id}/reviews/{review.pk}/',
+            {'score': rng.randint(1, 10)},
+            format='json',
+        )
+    return write
+
+
+def work(role, db_path, profile, seconds, number, barrier, results):
+    """Выполняет запросы одной роли до истечения `seconds`."""
+    os.environ['SQLITE_PROFILE'] = profile
+    setup_django(db_path, migrate=False, **OVERRIDES)
+
+    from django.db import OperationalError
+    from rest_framework.test import APIClient
+
+    from api.cache import get_cache
+
+    durations, errors = [], 0
+    try:
+        rng = random.Random(number)
+        request = (make_reader if role == 'reads' else make_writer)(rng)
+        client = APIClient()
+        barrier.wait()
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            get_cache().clear()
+            started = time.perf_counter()
+            try:
+                response = request(client)
+            except OperationalError:
+                errors += 1
+                continue
+            if response.status_code >= 400:
+                errors += 1
+                continue
+            durations.append((time.perf_counter() - started) * 1000)
+    finally:
+        results.put((role, durations, errors))
+
+
+def run(profile, args, context, directory):
+    db_path = Path(directory) / f'{profile}.sqlite3'
+    seeder = context.Process(
+        target=seed,
+        args=(db_path, profile, args.titles, args.reviews_per_title),
+    )
+    seeder.start()
+    seeder.join()
+    roles = ['reads'] * args.readers + ['writes'] * args.writers
+    barrier = context.Barrier(len(roles))
+    results = context.Queue()
+    workers = [
+        context.Process(target=work, args=(
+            role, db_path, profile, args.seconds, number, barrier, results
+        ))
+        for number, role in enumerate(roles)
+    ]
+    for worker in workers:
+        worker.start()
+    collected = {'reads': ([], 0), 'writes': ([], 0)}
+    for _ in workers:
+        role, durations, errors = results.get()
+        total, total_errors = collected[role]
+        collected[role] = (total + durations, total_errors + errors)
+    for worker in workers:
+        worker.join()
+    return {
+        role: {
+            **(summarize(durations) if durations else {'count': 0}),
+            'requests_per_second': round(len(durations) / args.seconds, 1),
+            'errors': errors,
+        }
+        for role, (durations, errors) in collected.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--titles', type=int, default=2000)
+    parser.add_argument('--reviews-per-title', type=int, default=3)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument(
+        '--profiles', nargs='+', choices=PROFILES, default=PROFILES
+    )
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory() as directory:
+        results = {
+            profile: run(profile, args, context, directory)
+            for profile in args.profiles
+        }
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
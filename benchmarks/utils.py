@@ -0,0 +1,69 @@
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+PROJECT_DIR = ROOT_DIR / 'api_yamdb'
+
+SYLLABLES = (
+    'ка', 'ро', 'ми', 'ла', 'ту', 'не', 'зо', 'ви', 'да', 'ше',
+    'ан', 'ор', 'ес', 'ум', 'ли', 'по', 'ря', 'гу', 'бе', 'со',
+)
+
+
+def setup_django(db_path, migrate=True, **overrides):
+    """Настраивает Django на отдельную базу SQLite и применяет миграции.
+
+    `overrides` заменяют одноимённые настройки проекта.
+    """
+    sys.path.insert(0, str(PROJECT_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
+
+    from django.conf import settings
+    settings.DATABASES['default']['NAME'] = str(db_path)
+    settings.DEBUG = False
+    for name, value in overrides.items():
+        setattr(settings, name, value)
+
+    import django
+    django.setup()
+
+    if migrate:
+        from django.core.management import call_command
+        call_command('migrate', verbosity=0)
+
+
+def make_vocabulary(size, seed=0):
+    rng = random.Random(seed)
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choices(SYLLABLES, k=rng.randint(2, 4))))
+    return sorted(words)
+
+
+def timed(func, repeat):
+    """Выполняет func repeat раз и возвращает длительности в мс."""
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - started) * 1000)
+    return durations
+
+
+def summarize(durations):
+    durations = sorted(durations)
+
+    def percentile(share):
+        return durations[min(len(durations) - 1, int(len(durations) * share))]
+
+    return {
+        'count': len(durations),
+        'mean_ms': round(statistics.fmean(durations), 3),
+        'p50_ms': round(percentile(0.50), 3),
+        'p95_ms': round(percentile(0.95), 3),
+        'p99_ms': round(percentile(0.99), 3),
+    }
@@ -0,0 +1,14 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def shared_api_cache(settings, tmp_path):
+    """Кэш API в файлах: ETag выдаются только с общим для процессов кэшем."""
+    settings.CACHES = {
+        **settings.CACHES,
+        settings.API_CACHE_ALIAS: {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': tmp_path / 'api-cache',
+            'TIMEOUT': 300,
+        },
+    }
@@ -0,0 +1,59 @@
+from contextlib import contextmanager
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+# Наибольшее число запросов к БД для анонимного GET-запроса к маршруту.
+# Бюджет не зависит от размера страницы.
+QUERY_BUDGETS = {
+    'categories-list': 2,
+    'genres-list': 2,
+    'titles-list': 3,
+    'titles-detail': 2,
+    'titles-stats': 1,
+    'titles-top': 2,
+    'titles-similar': 2,
+    'reviews-list': 3,
+    'reviews-list-cursor': 2,
+    'reviews-detail': 2,
+    'comments-list': 3,
+    'comments-list-cursor': 2,
+    'comments-detail': 2,
+    'users-list': 2,
+    'users-detail': 1,
+    'users-me': 0,
+}
+# Запросы на аутентификацию пользователя по токену.
+AUTH_QUERIES = 1
+
+
+@pytest.fixture
+def query_budget():
+    """Проверяет, что код укладывается в бюджет запросов к БД.
+
+    Используется как контекстный менеджер или декоратор:
+
+        with query_budget('titles-list'):
+            client.get('/api/v1/titles/')
+
+    При превышении тест падает со списком выполненных SQL-запросов.
+    """
+
+    @contextmanager
+    def check(route, authenticated=False):
+        budget = QUERY_BUDGETS[route] + (AUTH_QUERIES if authenticated else 0)
+        with CaptureQueriesContext(connection) as context:
+            yield context
+        executed = context.captured_queries
+        if len(executed) > budget:
+            pytest.fail(
+                f'Запрос к маршруту `{route}` выполнил {len(executed)} '
+                f'запросов к БД при бюджете {budget}:\n' + '\n'.join(
+                    f'{number}. {query["sql"]}'
+                    for number, query in enumerate(executed, 1)
+                ),
+                pytrace=False
+            )
+
+    return check
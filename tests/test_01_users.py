@@ -1,6 +1,7 @@
 from http import HTTPStatus
 
 import pytest
+from rest_framework.pagination import PageNumberPagination
 
 from tests.utils import (
     check_pagination, invalid_data_for_user_patch_and_creation
@@ -564,3 +565,23 @@ class Test01UserAPI:
             f'Проверьте, что PATCH-запрос к `{self.USERS_ME_URL}` с ключом '
             '`role` не изменяет роль пользователя.'
         )
+
+    @pytest.mark.parametrize('page_size', (10, 50))
+    def test_11_users_query_budget(self, admin_client, admin, monkeypatch,
+                                   django_user_model, query_budget,
+                                   page_size):
+        monkeypatch.setattr(PageNumberPagination, 'page_size', page_size)
+        django_user_model.objects.bulk_create(
+            django_user_model(
+                username=f'user{idx}', email=f'user{idx}@yamdb.fake'
+            )
+            for idx in range(page_size)
+        )
+
+        with query_budget('users-list', authenticated=True):
+            response = admin_client.get(self.USERS_URL)
+        assert len(response.json()['results']) == page_size
+        with query_budget('users-detail', authenticated=True):
+            admin_client.get(f'{self.USERS_URL}user0/')
+        with query_budget('users-me', authenticated=True):
+            admin_client.get(self.USERS_ME_URL)
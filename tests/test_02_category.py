@@ -1,7 +1,9 @@
 from http import HTTPStatus
 
 import pytest
+from rest_framework.pagination import PageNumberPagination
 
+from reviews.models import Category
 from tests.utils import (
     check_name_and_slug_patterns, check_pagination, check_permissions,
     create_categories
@@ -153,3 +155,65 @@ class Test02CategoryAPI:
                           HTTPStatus.FORBIDDEN)
         check_permissions(moderator_client, self.CATEGORY_URL, data,
                           'модератора', categories, HTTPStatus.FORBIDDEN)
+
+    def test_06_category_bulk_write(self, admin_client):
+        create_categories(admin_client)
+        url = self.CATEGORY_URL + 'bulk/'
+        response = admin_client.post(
+            url,
+            data=[
+                {'name': 'Музыка', 'slug': 'music'},
+                {'name': 'Ещё музыка', 'slug': 'music'},
+                {'name': 'Фильмы', 'slug': 'films'},
+            ],
+            format='json'
+        )
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что POST-запрос администратора к `{url}` возвращает '
+            'ответ со статусом 200.'
+        )
+        assert [result['status'] for result in response.json()] == [
+            HTTPStatus.CREATED, HTTPStatus.BAD_REQUEST, HTTPStatus.BAD_REQUEST
+        ], (
+            f'Проверьте, что POST-запрос к `{url}` отклоняет повторяющиеся и '
+            'уже занятые слаги.'
+        )
+
+        response = admin_client.post(
+            url,
+            data=[
+                {'name': '', 'slug': 'games'},
+                {'name': 'Игры', 'slug': 'games'},
+            ],
+            format='json'
+        )
+        assert [result['status'] for result in response.json()] == [
+            HTTPStatus.BAD_REQUEST, HTTPStatus.CREATED
+        ], (
+            f'Проверьте, что отклонённый объект в POST-запросе к `{url}` не '
+            'занимает слаг для следующих объектов.'
+        )
+
+        response = admin_client.patch(
+            url,
+            data=[{'slug': 'music', 'name': 'Музыкальные альбомы'}],
+            format='json'
+        )
+        assert response.json()[0]['data'] == {
+            'name': 'Музыкальные альбомы', 'slug': 'music'
+        }
+        response = admin_client.get(self.CATEGORY_URL, {'search': 'альбом'})
+        assert response.json()['count'] == 1
+
+    @pytest.mark.parametrize('page_size', (10, 50))
+    def test_07_category_query_budget(self, client, monkeypatch, query_budget,
+                                      page_size):
+        monkeypatch.setattr(PageNumberPagination, 'page_size', page_size)
+        Category.objects.bulk_create(
+            Category(name=f'Категория {idx}', slug=f'slug-{idx}')
+            for idx in range(page_size)
+        )
+
+        with query_budget('categories-list'):
+            response = client.get(self.CATEGORY_URL)
+        assert len(response.json()['results']) == page_size
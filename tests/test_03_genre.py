@@ -1,7 +1,9 @@
 from http import HTTPStatus
 
 import pytest
+from rest_framework.pagination import PageNumberPagination
 
+from reviews.models import Genre
 from tests.utils import (
     check_name_and_slug_patterns, check_pagination, check_permissions,
     create_genre
@@ -136,3 +138,16 @@ class Test03GenreAPI:
                           HTTPStatus.FORBIDDEN)
         check_permissions(moderator_client, self.GENRES_URL, data,
                           'модератора', genres, HTTPStatus.FORBIDDEN)
+
+    @pytest.mark.parametrize('page_size', (10, 50))
+    def test_06_genres_query_budget(self, client, monkeypatch, query_budget,
+                                    page_size):
+        monkeypatch.setattr(PageNumberPagination, 'page_size', page_size)
+        Genre.objects.bulk_create(
+            Genre(name=f'Жанр {idx}', slug=f'slug-{idx}')
+            for idx in range(page_size)
+        )
+
+        with query_budget('genres-list'):
+            response = client.get(self.GENRES_URL)
+        assert len(response.json()['results']) == page_size
@@ -1,10 +1,21 @@
+import json
+from datetime import timedelta
 from http import HTTPStatus
+from io import StringIO
 
 import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.pagination import PageNumberPagination
 
+from reviews.models import (
+    Category, Genre, Review, Title, TitleRanking, TitleScoreCount
+)
 from tests.utils import (
     check_pagination, check_permissions, create_categories, create_genre,
-    create_titles
+    create_single_review, create_titles
 )
 
 
@@ -353,3 +364,513 @@ class Test04TitleAPI:
             f'Проверьте, что PUT-запрос к `{self.TITLES_DETAIL_URL_TEMPLATE} '
             'не предусмотрен и возвращает статус 405.'
         )
+
+    @pytest.mark.parametrize('page_size', (10, 100))
+    def test_07_titles_query_count(self, client, monkeypatch, query_budget,
+                                   page_size):
+        monkeypatch.setattr(PageNumberPagination, 'page_size', page_size)
+        categories = Category.objects.bulk_create(
+            Category(name=f'Категория {idx}', slug=f'category-{idx}')
+            for idx in range(2)
+        )
+        genres = Genre.objects.bulk_create(
+            Genre(name=f'Жанр {idx}', slug=f'genre-{idx}')
+            for idx in range(3)
+        )
+        titles = Title.objects.bulk_create(
+            Title(
+                name=f'Произведение {idx:03}',
+                year=2000,
+                description='',
+                category=categories[idx % len(categories)]
+            )
+            for idx in range(page_size)
+        )
+        Title.genre.through.objects.bulk_create(
+            Title.genre.through(title=title, genre=genre)
+            for title in titles
+            for genre in genres[:2]
+        )
+
+        with query_budget('titles-list'):
+            response = client.get(self.TITLES_URL)
+        results = response.json()['results']
+        assert len(results) == page_size
+        assert all(
+            title['category'] and len(title['genre']) == 2
+            for title in results
+        ), (
+            f'Проверьте, что `{self.TITLES_URL}` возвращает категорию и '
+            'жанры каждого произведения.'
+        )
+
+        with query_budget('titles-detail'):
+            client.get(
+                self.TITLES_DETAIL_URL_TEMPLATE.format(title_id=titles[0].pk)
+            )
+
+    def test_08_titles_list_cache(self, client, admin_client, user_client):
+        titles, _, _ = create_titles(admin_client)
+        url = f'{self.TITLES_URL}?ordering=name&search='
+
+        response = client.get(url)
+        assert response['X-Cache'] == 'MISS'
+        response = client.get(f'{self.TITLES_URL}?search=&ordering=name')
+        assert response['X-Cache'] == 'HIT', (
+            f'Проверьте, что повторный GET-запрос к `{self.TITLES_URL}` с '
+            'теми же параметрами возвращается из кэша.'
+        )
+
+        create_single_review(user_client, titles[0]['id'], 'Отзыв', 7)
+        response = client.get(url)
+        assert response['X-Cache'] == 'MISS'
+        ratings = {
+            title['id']: title['rating']
+            for title in response.json()['results']
+        }
+        assert ratings[titles[0]['id']] == 7, (
+            f'Проверьте, что новый отзыв сбрасывает кэш `{self.TITLES_URL}`.'
+        )
+
+        admin_client.patch(
+            self.TITLES_DETAIL_URL_TEMPLATE.format(title_id=titles[1]['id']),
+            data={'name': 'Новое название'}
+        )
+        names = {
+            title['name'] for title in client.get(url).json()['results']
+        }
+        assert 'Новое название' in names, (
+            'Проверьте, что изменение произведения сбрасывает кэш '
+            f'`{self.TITLES_URL}`.'
+        )
+
+        stats = admin_client.get('/api/v1/cache/stats/').json()
+        assert stats['titles'] == {'hit': 1, 'miss': 3}
+        response = user_client.get('/api/v1/cache/stats/')
+        assert response.status_code == HTTPStatus.FORBIDDEN
+
+        Review.objects.update(score=1)
+        assert client.get(url)['X-Cache'] == 'HIT'
+        call_command('rebuild_title_stats', stdout=StringIO())
+        response = client.get(url)
+        assert response['X-Cache'] == 'MISS', (
+            'Проверьте, что команда `rebuild_title_stats` сбрасывает кэш '
+            f'`{self.TITLES_URL}`.'
+        )
+        assert {
+            title['rating'] for title in response.json()['results']
+        } == {1, None}
+
+    def test_09_titles_full_text_search(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+
+        for query in ('name=ОРЕШ', 'search=крепкий ореш', 'name=нато'):
+            with CaptureQueriesContext(connection) as context:
+                response = client.get(f'{self.TITLES_URL}?{query}')
+            names = [title['name'] for title in response.json()['results']]
+            expected = 'Терминатор' if 'нато' in query else 'Крепкий орешек'
+            assert names == [expected], (
+                f'Проверьте, что `{self.TITLES_URL}?{query}` находит '
+                'произведения по подстроке названия без учёта регистра.'
+            )
+            assert any(
+                'reviews_title_fts' in query['sql']
+                for query in context.captured_queries
+            ), 'Проверьте, что поиск по названию использует индекс FTS5.'
+
+        response = client.get(f'{self.TITLES_URL}?search=ор')
+        assert len(response.json()['results']) == len(titles), (
+            'Проверьте, что поиск по подстрокам короче трёх символов '
+            'работает без полнотекстового индекса.'
+        )
+
+        admin_client.patch(
+            self.TITLES_DETAIL_URL_TEMPLATE.format(title_id=titles[1]['id']),
+            data={'name': 'Смертельное оружие'}
+        )
+        assert client.get(
+            f'{self.TITLES_URL}?name=орешек'
+        ).json()['results'] == [], (
+            'Проверьте, что индекс поиска обновляется при изменении '
+            'названия произведения.'
+        )
+
+    def test_10_titles_export(self, admin_client, user_client):
+        titles, categories, genres = create_titles(admin_client)
+        create_single_review(user_client, titles[0]['id'], 'Отзыв', 8)
+        url = f'{self.TITLES_URL}export/'
+
+        response = user_client.get(url)
+        assert response.status_code == HTTPStatus.FORBIDDEN, (
+            f'Проверьте, что выгрузка `{url}` доступна только '
+            'администратору.'
+        )
+
+        response = admin_client.get(f'{url}?reviews=1')
+        assert response.status_code == HTTPStatus.OK
+        assert response.streaming, (
+            f'Проверьте, что `{url}` отдаёт данные потоком.'
+        )
+        rows = [
+            json.loads(line)
+            for line in b''.join(response.streaming_content).splitlines()
+        ]
+        assert [row['id'] for row in rows] == [
+            title['id'] for title in titles
+        ]
+        assert rows[0]['category'] == categories[0]
+        assert sorted(
+            rows[0]['genre'], key=lambda genre: genre['slug']
+        ) == sorted(genres[:2], key=lambda genre: genre['slug'])
+        assert rows[0]['rating'] == 8
+        assert [
+            (review['text'], review['score']) for review in rows[0]['reviews']
+        ] == [('Отзыв', 8)]
+        assert rows[1]['reviews'] == []
+
+        response = admin_client.get(f'{url}?type=csv')
+        lines = b''.join(
+            response.streaming_content
+        ).decode().splitlines()
+        assert lines[0] == (
+            'id,name,year,description,category,genre,rating'
+        )
+        assert lines[1] == (
+            f'{titles[0]["id"]},Терминатор,1984,I`ll be back,films,'
+            '"comedy,horror",8'
+        )
+        assert admin_client.get(
+            f'{url}?type=csv&reviews=1'
+        ).status_code == HTTPStatus.BAD_REQUEST
+
+    def test_11_titles_bulk_write(self, admin_client, user_client):
+        genres = create_genre(admin_client)
+        categories = create_categories(admin_client)
+        url = self.TITLES_URL + 'bulk/'
+
+        def make_items(count):
+            return [
+                {
+                    'name': f'Произведение {number}',
+                    'year': 2000,
+                    'description': 'Загружено списком.',
+                    'genre': [genres[0]['slug'], genres[1]['slug']],
+                    'category': categories[0]['slug'],
+                }
+                for number in range(count)
+            ]
+
+        response = user_client.post(
+            url, data=make_items(1), format='json'
+        )
+        assert response.status_code == HTTPStatus.FORBIDDEN, (
+            f'Проверьте, что POST-запрос к `{url}` доступен только '
+            'администратору.'
+        )
+
+        items = make_items(3)
+        items[1]['category'] = 'unknown'
+        items[2]['year'] = 'дветыщи'
+        response = admin_client.post(
+            url, data=items, format='json'
+        )
+        assert response.status_code == HTTPStatus.OK
+        results = response.json()
+        assert [result['status'] for result in results] == [
+            HTTPStatus.CREATED, HTTPStatus.BAD_REQUEST, HTTPStatus.BAD_REQUEST
+        ], (
+            f'Проверьте, что ответ на POST-запрос к `{url}` содержит '
+            'результат для каждого объекта в порядке запроса.'
+        )
+        assert 'category' in results[1]['errors']
+        assert 'year' in results[2]['errors']
+        title = Title.objects.get(pk=results[0]['data']['id'])
+        assert sorted(title.genre.values_list('slug', flat=True)) == [
+            'comedy', 'horror'
+        ]
+
+        queries = []
+        for count in (2, 20):
+            with CaptureQueriesContext(connection) as context:
+                admin_client.post(
+                    url, data=make_items(count),
+                    format='json'
+                )
+            queries.append(len(context.captured_queries))
+        assert queries[0] == queries[1], (
+            f'Проверьте, что число запросов к БД при POST-запросе к `{url}` '
+            'не зависит от числа объектов.'
+        )
+
+        response = admin_client.patch(
+            url,
+            data=[
+                {'id': title.pk, 'name': 'Новое имя', 'genre': ['drama']},
+                {'id': 0, 'name': 'Нет такого'},
+                {'id': 'abc', 'name': 'Не число'},
+                {'id': 2 ** 70, 'name': 'Вне диапазона'},
+                {'name': 'Без id'},
+            ],
+            format='json'
+        )
+        results = response.json()
+        assert [result['status'] for result in results] == [
+            HTTPStatus.OK, HTTPStatus.NOT_FOUND, HTTPStatus.BAD_REQUEST,
+            HTTPStatus.BAD_REQUEST, HTTPStatus.BAD_REQUEST
+        ], (
+            f'Проверьте, что PATCH-запрос к `{url}` отвечает 404 для '
+            'несуществующего `id` и 400 для некорректного или пропущенного.'
+        )
+        assert 'id' in results[2]['errors']
+        assert results[0]['data']['name'] == 'Новое имя'
+        assert [genre['slug'] for genre in results[0]['data']['genre']] == [
+            'drama'
+        ]
+        response = admin_client.get(
+            self.TITLES_DETAIL_URL_TEMPLATE.format(title_id=title.pk)
+        )
+        assert response.json()['name'] == 'Новое имя', (
+            f'Проверьте, что PATCH-запрос к `{url}` сбрасывает кэш ответов.'
+        )
+
+        response = admin_client.patch(
+            url,
+            data=[
+                {'id': title.pk, 'genre': ['comedy']},
+                {'id': title.pk, 'genre': ['comedy', 'horror']},
+            ],
+            format='json'
+        )
+        assert response.status_code == HTTPStatus.OK
+        results = response.json()
+        assert [result['status'] for result in results] == [
+            HTTPStatus.OK, HTTPStatus.BAD_REQUEST
+        ], (
+            f'Проверьте, что PATCH-запрос к `{url}` отклоняет повторное '
+            'изменение одного объекта.'
+        )
+        assert 'id' in results[1]['errors']
+        assert list(title.genre.values_list('slug', flat=True)) == ['comedy']
+
+        response = admin_client.post(
+            url, data=make_items(501), format='json'
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    def test_12_titles_stats(self, client, admin_client, user_client,
+                             moderator_client, query_budget):
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        url = self.TITLES_DETAIL_URL_TEMPLATE.format(title_id=title_id)
+        url += 'stats/'
+
+        response = client.get(url)
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что эндпоинт `{url}` доступен без авторизации.'
+        )
+        assert response.json() == {
+            'count': 0, 'mean': None, 'median': None,
+            'histogram': {str(score): 0 for score in range(1, 11)},
+        }
+
+        create_single_review(admin_client, title_id, 'Отзыв', 2)
+        create_single_review(moderator_client, title_id, 'Отзыв', 9)
+        review = create_single_review(user_client, title_id, 'Отзыв', 4)
+        reviews_url = f'/api/v1/titles/{title_id}/reviews/'
+        user_client.patch(
+            f'{reviews_url}{review.json()["id"]}/', data={'score': 10}
+        )
+        other = create_single_review(
+            user_client, titles[1]['id'], 'Отзыв', 5
+        )
+        user_client.delete(
+            f'/api/v1/titles/{titles[1]["id"]}/reviews/{other.json()["id"]}/'
+        )
+
+        with query_budget('titles-stats'):
+            response = client.get(url)
+        stats = response.json()
+        assert (stats['count'], stats['mean'], stats['median']) == (
+            3, 7.0, 9.0
+        ), (
+            f'Проверьте, что `{url}` возвращает число отзывов, среднюю и '
+            'медианную оценку с учётом изменения отзывов.'
+        )
+        assert {
+            score: count for score, count in stats['histogram'].items()
+            if count
+        } == {'2': 1, '9': 1, '10': 1}
+
+        TitleScoreCount.objects.all().delete()
+        call_command('rebuild_title_stats', stdout=StringIO())
+        assert client.get(url).json() == stats, (
+            'Проверьте, что команда `rebuild_title_stats` восстанавливает '
+            'счётчики оценок.'
+        )
+        response = client.get(
+            self.TITLES_DETAIL_URL_TEMPLATE.format(title_id=0) + 'stats/'
+        )
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+    def test_13_titles_top(self, client, admin_client, user_client,
+                           moderator_client, query_budget):
+        titles, _, genres = create_titles(admin_client)
+        first_id, second_id = titles[0]['id'], titles[1]['id']
+        url = f'{self.TITLES_URL}top/'
+
+        response = client.get(url)
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что эндпоинт `{url}` доступен без авторизации.'
+        )
+        assert response.json() == [], (
+            f'Проверьте, что `{url}` не возвращает произведения без отзывов.'
+        )
+
+        for author_client in (admin_client, moderator_client):
+            create_single_review(author_client, first_id, 'Отзыв', 10)
+        for author_client in (admin_client, moderator_client, user_client):
+            create_single_review(author_client, second_id, 'Отзыв', 9)
+
+        with query_budget('titles-top'):
+            response = client.get(url)
+        top = response.json()
+        assert [title['id'] for title in top] == [second_id, first_id], (
+            f'Проверьте, что `{url}` упорядочивает произведения по '
+            'байесовскому рейтингу: больше отзывов с высокой оценкой '
+            'важнее средней по двум отзывам.'
+        )
+        assert top[0]['weighted_rating'] == pytest.approx((27 + 55) / 13)
+        assert top[0]['rating'] == 9
+        assert top[1]['trending'] == pytest.approx(2, rel=1e-3), (
+            'Проверьте, что тренд равен числу свежих отзывов с учётом '
+            'затухания.'
+        )
+
+        response = client.get(url, {'genre': genres[0]['slug']})
+        assert [title['id'] for title in response.json()] == [first_id], (
+            f'Проверьте, что `{url}` фильтруется так же, как список '
+            'произведений.'
+        )
+        response = client.get(url, {'limit': 1})
+        assert [title['id'] for title in response.json()] == [second_id]
+
+        review = Review.objects.get(title_id=second_id, score=9,
+                                    author__username='TestUser')
+        user_client.delete(
+            f'/api/v1/titles/{second_id}/reviews/{review.pk}/'
+        )
+        response = client.get(url)
+        assert [title['id'] for title in response.json()] == [
+            first_id, second_id
+        ], (
+            'Проверьте, что удаление отзыва сразу пересчитывает рейтинг.'
+        )
+
+        Review.objects.filter(title_id=first_id).update(
+            pub_date=timezone.now() - timedelta(days=28)
+        )
+        TitleRanking.objects.all().delete()
+        call_command('refresh_title_ranking', stdout=StringIO())
+        response = client.get(url, {'by': 'trending'})
+        trending = response.json()
+        assert [title['id'] for title in trending] == [second_id, first_id], (
+            f'Проверьте, что `{url}?by=trending` учитывает давность отзывов '
+            'и что команда `refresh_title_ranking` пересчитывает рейтинг.'
+        )
+        assert trending[1]['trending'] == pytest.approx(2 / 16, rel=1e-3)
+        assert trending[0]['trending'] == pytest.approx(2, rel=1e-3)
+
+        for params in ({'by': 'name'}, {'limit': 0}, {'limit': 'ten'}):
+            response = client.get(url, params)
+            assert response.status_code == HTTPStatus.BAD_REQUEST, (
+                f'Проверьте, что `{url}` отклоняет параметры {params}.'
+            )
+
+    def create_similar_titles(self, admin_client, user_client,
+                              moderator_client):
+        titles, categories, genres = create_titles(admin_client)
+        for name, genre, category in (
+            ('Терминатор 2', [genres[0]['slug'], genres[1]['slug']],
+             categories[1]['slug']),
+            ('Хищник', [genres[2]['slug']], categories[0]['slug']),
+        ):
+            response = admin_client.post(self.TITLES_URL, data={
+                'name': name, 'year': 1991, 'genre': genre,
+                'category': category, 'description': name,
+            })
+            titles.append(response.json())
+        for author_client in (user_client, moderator_client):
+            for title in titles[:2]:
+                create_single_review(author_client, title['id'], 'Отзыв', 8)
+        return [title['id'] for title in titles]
+
+    def test_14_titles_similar_without_index(self, client, admin_client,
+                                             user_client, moderator_client,
+                                             settings, tmp_path):
+        settings.SIMILARITY_INDEX_DIR = tmp_path
+        ids = self.create_similar_titles(
+            admin_client, user_client, moderator_client
+        )
+        url = self.TITLES_DETAIL_URL_TEMPLATE.format(title_id=ids[0])
+        url += 'similar/'
+
+        response = client.get(url)
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что эндпоинт `{url}` доступен без авторизации.'
+        )
+        assert [title['id'] for title in response.json()] == [
+            ids[2], ids[3]
+        ], (
+            f'Проверьте, что без индекса `{url}` упорядочивает произведения '
+            'по числу общих жанров и совпадению категории.'
+        )
+        response = client.get(
+            self.TITLES_DETAIL_URL_TEMPLATE.format(title_id=0) + 'similar/'
+        )
+        assert response.status_code == HTTPStatus.NOT_FOUND
+        response = client.get(url, {'limit': 1000})
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    def test_15_titles_similar_index(self, client, admin_client,
+                                     user_client, moderator_client,
+                                     settings, tmp_path, query_budget):
+        pytest.importorskip('numpy')
+        pytest.importorskip('scipy')
+        settings.SIMILARITY_INDEX_DIR = tmp_path
+        ids = self.create_similar_titles(
+            admin_client, user_client, moderator_client
+        )
+        call_command('build_similarity_index', stdout=StringIO())
+        url = self.TITLES_DETAIL_URL_TEMPLATE.format(title_id=ids[0])
+        url += 'similar/'
+
+        with query_budget('titles-similar'):
+            response = client.get(url)
+        assert [title['id'] for title in response.json()] == [
+            ids[2], ids[1], ids[3]
+        ], (
+            f'Проверьте, что `{url}` упорядочивает произведения по '
+            'косинусному сходству жанров, категорий и авторов отзывов.'
+        )
+        assert response.json()[0] == client.get(
+            self.TITLES_DETAIL_URL_TEMPLATE.format(title_id=ids[2])
+        ).json()
+        response = client.get(url, {'limit': 1})
+        assert [title['id'] for title in response.json()] == [ids[2]]
+
+        admin_client.delete(
+            self.TITLES_DETAIL_URL_TEMPLATE.format(title_id=ids[2])
+        )
+        assert [title['id'] for title in client.get(url).json()] == [
+            ids[1], ids[3]
+        ], 'Проверьте, что удалённые произведения не попадают в ответ.'
+        response = client.get(
+            self.TITLES_DETAIL_URL_TEMPLATE.format(title_id=ids[2])
+            + 'similar/'
+        )
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+        call_command('build_similarity_index', stdout=StringIO())
+        assert len(list(tmp_path.iterdir())) == 2, (
+            'Проверьте, что новая сборка индекса удаляет предыдущую.'
+        )
@@ -1,8 +1,13 @@
 from http import HTTPStatus
 
 import pytest
+from django.core.management import call_command
+from django.db import connection
 from django.db.utils import IntegrityError
+from django.test.utils import CaptureQueriesContext
+from rest_framework.pagination import PageNumberPagination
 
+from reviews.models import Review, Title, TitleQuerySet
 from tests.utils import (
     check_fields, check_pagination, create_reviews, create_single_review,
     create_titles
@@ -413,3 +418,302 @@ class Test05ReviewAPI:
             f'Проверьте, что PUT-запрос к `{self.REVIEW_DETAIL_URL_TEMPLATE} '
             'не предусмотрен и возвращает статус 405.'
         )
+
+    def test_07_title_rating_follows_review_changes(
+            self, client, admin_client, admin, user_client, user,
+            moderator_client, moderator):
+        author_map = {
+            admin: admin_client,
+            user: user_client,
+            moderator: moderator_client
+        }
+        reviews, titles = create_reviews(admin_client, author_map)
+        title_url = self.TITLE_DETAIL_URL_TEMPLATE.format(
+            title_id=titles[0]['id']
+        )
+
+        def review_url(review):
+            return self.REVIEW_DETAIL_URL_TEMPLATE.format(
+                title_id=titles[0]['id'], review_id=review['id']
+            )
+
+        admin_client.patch(review_url(reviews[1]), data={'score': 8})
+        assert client.get(title_url).json().get('rating') == 6, (
+            'Проверьте, что после изменения оценки в отзыве рейтинг '
+            'произведения пересчитывается.'
+        )
+
+        for review, expected_rating in (
+                (reviews[0], 6), (reviews[2], 8), (reviews[1], None)
+        ):
+            admin_client.delete(review_url(review))
+            assert client.get(title_url).json().get('rating') == (
+                expected_rating
+            ), (
+                'Проверьте, что после удаления отзыва рейтинг произведения '
+                'пересчитывается.'
+            )
+
+        create_single_review(user_client, titles[0]['id'], 'Снова', 3)
+        Title.objects.update(reviews_count=0, score_sum=0, rating=None)
+        call_command('rebuild_title_stats')
+        title = Title.objects.get(pk=titles[0]['id'])
+        assert (title.reviews_count, title.score_sum, title.rating) == (
+            1, 3, 3
+        ), (
+            'Проверьте, что команда `rebuild_title_stats` восстанавливает '
+            'агрегаты отзывов произведения.'
+        )
+
+    def test_08_reviews_cursor_pagination(
+            self, client, admin_client, admin, user_client, user,
+            moderator_client, moderator, monkeypatch):
+        monkeypatch.setattr(PageNumberPagination, 'page_size', 2)
+        author_map = {
+            admin: admin_client,
+            user: user_client,
+            moderator: moderator_client
+        }
+        reviews, titles = create_reviews(admin_client, author_map)
+        url = self.REVIEWS_URL_TEMPLATE.format(title_id=titles[0]['id'])
+        expected_ids = [review['id'] for review in reversed(reviews)]
+
+        first_page = client.get(f'{url}?pagination=cursor').json()
+        assert first_page['count'] is None and first_page['previous'] is None
+        assert [
+            review['id'] for review in first_page['results']
+        ] == expected_ids[:2], (
+            f'Проверьте, что в режиме курсора `{self.REVIEWS_URL_TEMPLATE}` '
+            'возвращает отзывы от новых к старым.'
+        )
+
+        second_page = client.get(first_page['next']).json()
+        assert second_page['next'] is None
+        assert [
+            review['id'] for review in second_page['results']
+        ] == expected_ids[2:], (
+            f'Проверьте, что ссылка `next` в режиме курсора для '
+            f'`{self.REVIEWS_URL_TEMPLATE}` ведёт на следующую страницу.'
+        )
+
+        previous_page = client.get(second_page['previous']).json()
+        assert previous_page['results'] == first_page['results'], (
+            f'Проверьте, что ссылка `previous` в режиме курсора для '
+            f'`{self.REVIEWS_URL_TEMPLATE}` ведёт на предыдущую страницу.'
+        )
+
+        response = client.get(f'{url}?cursor=broken')
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+    @pytest.mark.parametrize('page_size', (10, 50))
+    def test_09_reviews_query_count(self, client, monkeypatch,
+                                    django_user_model, query_budget,
+                                    page_size):
+        monkeypatch.setattr(PageNumberPagination, 'page_size', page_size)
+        title = Title.objects.create(
+            name='Произведение', year=2000, description=''
+        )
+        authors = django_user_model.objects.bulk_create(
+            django_user_model(
+                username=f'author{idx}', email=f'author{idx}@yamdb.fake'
+            )
+            for idx in range(page_size)
+        )
+        reviews = Review.objects.bulk_create(
+            Review(title=title, author=author, text='Отзыв', score=5)
+            for author in authors
+        )
+        url = self.REVIEWS_URL_TEMPLATE.format(title_id=title.pk)
+
+        with query_budget('reviews-list'):
+            response = client.get(url)
+        results = response.json()['results']
+        assert len(results) == page_size
+        assert {review['author'] for review in results} == {
+            author.username for author in authors
+        }, (
+            f'Проверьте, что `{self.REVIEWS_URL_TEMPLATE}` возвращает '
+            'имена авторов отзывов.'
+        )
+
+        with query_budget('reviews-list-cursor'):
+            client.get(f'{url}?pagination=cursor')
+        with query_budget('reviews-detail'):
+            client.get(self.REVIEW_DETAIL_URL_TEMPLATE.format(
+                title_id=title.pk, review_id=reviews[0].pk
+            ))
+
+    def test_10_review_post_resolves_title_once(self, user_client):
+        title = Title.objects.create(
+            name='Произведение', year=2000, description=''
+        )
+        url = self.REVIEWS_URL_TEMPLATE.format(title_id=title.pk)
+        data = {'text': 'Отзыв', 'score': 5}
+
+        for expected_status in (HTTPStatus.CREATED, HTTPStatus.BAD_REQUEST):
+            with CaptureQueriesContext(connection) as context:
+                response = user_client.post(url, data=data)
+            assert response.status_code == expected_status
+            queries = [query['sql'] for query in context.captured_queries]
+            insert = next(
+                idx for idx, sql in enumerate(queries)
+                if sql.startswith('INSERT INTO "reviews_review"')
+            )
+            selects = [sql for sql in queries if sql.startswith('SELECT')]
+            assert sum('"reviews_title"' in sql for sql in selects) == 1, (
+                f'Проверьте, что POST-запрос к `{self.REVIEWS_URL_TEMPLATE}` '
+                'получает произведение из базы данных один раз.'
+            )
+            assert not any(
+                sql.startswith('SELECT') and '"reviews_review"' in sql
+                for sql in queries[:insert]
+            ), (
+                f'Проверьте, что POST-запрос к `{self.REVIEWS_URL_TEMPLATE}` '
+                'не проверяет повторный отзыв отдельным запросом: за это '
+                'отвечает ограничение уникальности.'
+            )
+
+    def test_11_reviews_conditional_get(self, client, admin_client, admin,
+                                        user_client, user,
+                                        django_assert_num_queries):
+        reviews, titles = create_reviews(admin_client, {admin: admin_client})
+        url = self.REVIEWS_URL_TEMPLATE.format(title_id=titles[0]['id'])
+
+        response = client.get(url)
+        etag = response.get('ETag')
+        assert etag and response.get('Last-Modified'), (
+            f'Проверьте, что ответ на GET-запрос к '
+            f'`{self.REVIEWS_URL_TEMPLATE}` содержит заголовки `ETag` и '
+            '`Last-Modified`.'
+        )
+
+        with django_assert_num_queries(0):
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.NOT_MODIFIED, (
+            f'Проверьте, что GET-запрос к `{self.REVIEWS_URL_TEMPLATE}` с '
+            'актуальным `If-None-Match` возвращает ответ со статусом 304.'
+        )
+        assert response['ETag'] == etag
+
+        detail_url = self.REVIEW_DETAIL_URL_TEMPLATE.format(
+            title_id=titles[0]['id'], review_id=reviews[0]['id']
+        )
+        detail_etag = client.get(detail_url)['ETag']
+        assert detail_etag != etag
+
+        create_single_review(user_client, titles[0]['id'], 'Отзыв', 7)
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что после добавления отзыва GET-запрос к '
+            f'`{self.REVIEWS_URL_TEMPLATE}` с прежним `If-None-Match` '
+            'возвращает новые данные.'
+        )
+        assert len(response.json()['results']) == 2
+
+        etag = response['ETag']
+        admin_client.patch(
+            f'/api/v1/users/{user.username}/', data={'username': 'renamed'}
+        )
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK
+        assert 'renamed' in {
+            review['author'] for review in response.json()['results']
+        }
+
+    def test_12_reviews_full_text_search(self, client, admin_client, admin,
+                                         user_client, user):
+        titles, _, _ = create_titles(admin_client)
+        url = self.REVIEWS_URL_TEMPLATE.format(title_id=titles[0]['id'])
+        create_single_review(admin_client, titles[0]['id'], 'Шедевр кино', 9)
+        create_single_review(user_client, titles[0]['id'], 'Скучное кино', 3)
+        create_single_review(user_client, titles[1]['id'], 'Шедевральный', 9)
+
+        response = client.get(f'{url}?search=шедевр')
+        assert [
+            review['text'] for review in response.json()['results']
+        ] == ['Шедевр кино'], (
+            f'Проверьте, что `{self.REVIEWS_URL_TEMPLATE}?search=` ищет по '
+            'тексту отзывов к произведению.'
+        )
+        response = client.get(f'{url}?search=кино')
+        assert len(response.json()['results']) == 2
+
+    def test_13_stale_review_changes_keep_aggregates(self, admin, user):
+        title = Title.objects.create(name='Произведение', year=2000)
+        review = Review.objects.create(
+            title=title, author=admin, text='Отзыв', score=5
+        )
+        Review.objects.create(title=title, author=user, text='Ещё', score=3)
+        first, second, third = (
+            Review.objects.get(pk=review.pk) for _ in range(3)
+        )
+        first.score = 7
+        first.save()
+        second.score = 9
+        second.save()
+        title.refresh_from_db()
+        assert (title.reviews_count, title.score_sum) == (2, 12), (
+            'Проверьте, что изменение отзыва, загруженного до другого '
+            'изменения, сдвигает агрегаты произведения от оценки из БД.'
+        )
+        third.delete()
+        third.delete()
+        title.refresh_from_db()
+        assert (title.reviews_count, title.score_sum) == (1, 3), (
+            'Проверьте, что удаление отзыва, загруженного до его изменения, '
+            'вычитает из агрегатов оценку из БД.'
+        )
+
+    def test_14_conditional_get_requires_shared_cache(
+            self, client, admin_client, admin, settings):
+        reviews, titles = create_reviews(admin_client, {admin: admin_client})
+        url = self.REVIEWS_URL_TEMPLATE.format(title_id=titles[0]['id'])
+        etag = client.get(url)['ETag']
+        settings.CACHES = {
+            **settings.CACHES,
+            settings.API_CACHE_ALIAS: {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            },
+        }
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK
+        assert 'ETag' not in response and 'Last-Modified' not in response, (
+            'Проверьте, что с кэшем API в памяти процесса ответы не '
+            'содержат `ETag` и `Last-Modified`: метки версий в других '
+            'процессах сервера не сбрасываются.'
+        )
+
+    def test_15_other_integrity_errors_not_reported_as_duplicate(
+            self, user_client, monkeypatch):
+        title = Title.objects.create(
+            name='Произведение', year=2000, description=''
+        )
+
+        def fail(*args, **kwargs):
+            raise IntegrityError('CHECK constraint failed')
+
+        monkeypatch.setattr(TitleQuerySet, 'apply_review_delta', fail)
+        url = self.REVIEWS_URL_TEMPLATE.format(title_id=title.pk)
+        with pytest.raises(IntegrityError):
+            user_client.post(url, data={'text': 'Отзыв', 'score': 5})
+        assert not Review.objects.exists(), (
+            'Проверьте, что при ошибке целостности отзыв не сохраняется, а '
+            'ошибка не выдаётся за повторный отзыв.'
+        )
+
+    def test_16_review_write_invalidates_once(self, admin, monkeypatch):
+        title = Title.objects.create(name='Произведение', year=2000)
+        bumps = []
+        monkeypatch.setattr(
+            'api.signals.bump_versions', lambda *names: bumps.append(names)
+        )
+        review = Review.objects.create(
+            title=title, author=admin, text='Отзыв', score=5
+        )
+        review.score = 7
+        review.save()
+        review.delete()
+        assert sum(names.count('titles') for names in bumps) == 3, (
+            'Проверьте, что создание, изменение и удаление отзыва сбрасывают '
+            'версию списка произведений по одному разу.'
+        )
@@ -1,7 +1,9 @@
 from http import HTTPStatus
 
 import pytest
+from rest_framework.pagination import PageNumberPagination
 
+from reviews.models import Comment, Review, Title
 from tests.utils import (check_fields, check_pagination, create_comments,
                          create_reviews, create_single_comment)
 
@@ -366,3 +368,97 @@ class Test06CommentAPI:
             f'Проверьте, что PUT-запрос к `{self.COMMENT_DETAIL_URL_TEMPLATE} '
             'не предусмотрен и возвращает статус 405.'
         )
+
+    @pytest.mark.parametrize('page_size', (10, 50))
+    def test_08_comments_query_count(self, client, admin, monkeypatch,
+                                     django_user_model, query_budget,
+                                     page_size):
+        monkeypatch.setattr(PageNumberPagination, 'page_size', page_size)
+        title = Title.objects.create(
+            name='Произведение', year=2000, description=''
+        )
+        review = Review.objects.create(
+            title=title, author=admin, text='Отзыв', score=5
+        )
+        authors = django_user_model.objects.bulk_create(
+            django_user_model(
+                username=f'author{idx}', email=f'author{idx}@yamdb.fake'
+            )
+            for idx in range(page_size)
+        )
+        comments = Comment.objects.bulk_create(
+            Comment(review=review, author=author, text='Комментарий')
+            for author in authors
+        )
+        url = self.COMMENTS_URL_TEMPLATE.format(
+            title_id=title.pk, review_id=review.pk
+        )
+
+        with query_budget('comments-list'):
+            response = client.get(url)
+        results = response.json()['results']
+        assert len(results) == page_size
+        assert {comment['author'] for comment in results} == {
+            author.username for author in authors
+        }, (
+            f'Проверьте, что `{self.COMMENTS_URL_TEMPLATE}` возвращает '
+            'имена авторов комментариев.'
+        )
+
+        with query_budget('comments-list-cursor'):
+            client.get(f'{url}?pagination=cursor')
+        with query_budget('comments-detail'):
+            client.get(self.COMMENT_DETAIL_URL_TEMPLATE.format(
+                title_id=title.pk, review_id=review.pk,
+                comment_id=comments[0].pk
+            ))
+
+    def test_09_comments_conditional_get(self, client, admin_client, admin):
+        comments, reviews, titles = create_comments(
+            admin_client, {admin: admin_client}
+        )
+        url = self.COMMENTS_URL_TEMPLATE.format(
+            title_id=titles[0]['id'], review_id=reviews[0]['id']
+        )
+        detail_url = self.COMMENT_DETAIL_URL_TEMPLATE.format(
+            title_id=titles[0]['id'], review_id=reviews[0]['id'],
+            comment_id=comments[0]['id']
+        )
+        etag = client.get(detail_url)['ETag']
+
+        response = client.get(detail_url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.NOT_MODIFIED, (
+            'Проверьте, что GET-запрос к '
+            f'`{self.COMMENT_DETAIL_URL_TEMPLATE}` с актуальным '
+            '`If-None-Match` возвращает ответ со статусом 304.'
+        )
+
+        admin_client.patch(detail_url, data={'text': 'Новый текст'})
+        response = client.get(detail_url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()['text'] == 'Новый текст'
+        list_etag = client.get(url)['ETag']
+        assert client.get(
+            url, HTTP_IF_NONE_MATCH=list_etag
+        ).status_code == HTTPStatus.NOT_MODIFIED
+
+    def test_10_deleted_parent_not_modified(self, client, admin):
+        title = Title.objects.create(name='Без отзывов', year=2000)
+        review = Review.objects.create(
+            title=title, author=admin, text='Без комментариев', score=5
+        )
+        urls = (
+            self.COMMENTS_URL_TEMPLATE.format(
+                title_id=title.pk, review_id=review.pk
+            ),
+            f'/api/v1/titles/{title.pk}/reviews/',
+        )
+        for url, parent in zip(urls, (review, title)):
+            etag = client.get(url)['ETag']
+            parent.delete()
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == HTTPStatus.NOT_FOUND, (
+                'Проверьте, что после удаления родительского объекта '
+                f'GET-запрос к `{url}` с прежним `If-None-Match` возвращает '
+                'ответ со статусом 404.'
+            )
@@ -0,0 +1,214 @@
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from reviews.models import Category, Review, Title, TitleQuerySet
+
+
+CSV_FILES = {
+    'users.csv': (
+        'id,username,email,role,bio,first_name,last_name\n'
+        '100,reader,reader@yamdb.fake,user,,,\n'
+        '101,bad name,bad@yamdb.fake,user,,,\n'
+        '102,writer,writer@yamdb.fake,user,,,\n'
+    ),
+    'category.csv': 'id,name,slug\n1,Фильм,movie\n1,Книга,book\n',
+    'titles.csv': (
+        'id,name,year,category\n'
+        '1,Побег из Шоушенка,1994,1\n'
+        '2,Крестный отец,сто,1\n'
+        '3,Список Шиндлера,1993,7\n'
+    ),
+    'review.csv': (
+        'id,title_id,text,author,score,pub_date\n'
+        '1,1,Отлично,100,10,2019-09-24T21:08:21.567Z\n'
+        '2,1,"Многострочный\nотзыв",102,9,2019-09-24T21:08:21.567Z\n'
+        '3,1,Мимо,100,11,2019-09-24T21:08:21.567Z\n'
+        '4,1,Повтор,100,1,2019-09-24T21:08:21.567Z\n'
+    ),
+}
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    for filename, content in CSV_FILES.items():
+        (tmp_path / filename).write_text(content, encoding='utf-8')
+    return tmp_path
+
+
+def run_load_csv(data_dir, *args):
+    stdout, stderr = StringIO(), StringIO()
+    call_command(
+        'load_csv', '--data-dir', str(data_dir), '--batch-size', '2', *args,
+        stdout=stdout, stderr=stderr
+    )
+    return stdout.getvalue(), stderr.getvalue()
+
+
+@pytest.mark.django_db(transaction=True)
+class Test08LoadCSV:
+
+    def test_01_dry_run_reports_rejected_rows(self, data_dir):
+        stdout, stderr = run_load_csv(data_dir, '--dry-run')
+
+        assert not Category.objects.exists(), (
+            'Проверьте, что в режиме `--dry-run` команда `load_csv` ничего '
+            'не записывает в базу данных.'
+        )
+        rejected = {line.split(': ')[0] for line in stderr.splitlines()}
+        assert rejected == {
+            'users.csv:3', 'category.csv:3', 'titles.csv:3',
+            'titles.csv:4', 'review.csv:5'
+        }, (
+            'Проверьте, что команда `load_csv` сообщает о каждой отклонённой '
+            'строке с номером строки файла.'
+        )
+        assert 'category.csv:3: id: запись 1 уже существует' in stderr
+        assert 'Проверено 7 из 12 строк' in stdout
+
+    @pytest.mark.parametrize('workers', ('1', '2'))
+    def test_02_load(self, data_dir, workers):
+        stdout, stderr = run_load_csv(data_dir, '--workers', workers)
+
+        assert set(Title.objects.values_list('pk', flat=True)) == {1}
+        assert set(Review.objects.values_list('pk', flat=True)) == {1, 2}
+        assert Review.objects.get(pk=2).text == 'Многострочный\nотзыв'
+        title = Title.objects.get(pk=1)
+        assert (title.reviews_count, title.score_sum) == (2, 19), (
+            'Проверьте, что после загрузки CSV агрегаты отзывов '
+            'пересчитываются.'
+        )
+        assert 'titles.csv:4: category_id: запись 7 не найдена' in stderr
+        assert 'review.csv:6: UNIQUE constraint failed' in stderr, (
+            'Проверьте, что строки, нарушающие ограничение уникальности, '
+            'отклоняются без потери остальных строк пачки.'
+        )
+        assert 'Загружено 6 из 12 строк' in stdout
+        assert 'строк/с' in stdout
+
+    def test_03_incremental_reload(self, data_dir):
+        (data_dir / 'review.csv').write_text(
+            ''.join(CSV_FILES['review.csv'].splitlines(True)[:4]),
+            encoding='utf-8'
+        )
+        run_load_csv(data_dir, '--incremental')
+        (data_dir / 'titles.csv').write_text(
+            CSV_FILES['titles.csv'].replace('Побег из Шоушенка', 'Побег'),
+            encoding='utf-8'
+        )
+
+        stdout, stderr = run_load_csv(data_dir, '--incremental')
+
+        assert Title.objects.get(pk=1).name == 'Побег', (
+            'Проверьте, что в режиме `--incremental` изменённые строки '
+            'обновляют существующие записи.'
+        )
+        assert 'review.csv: без изменений, пропущен' in stdout, (
+            'Проверьте, что в режиме `--incremental` неизменённые файлы '
+            'пропускаются.'
+        )
+        assert 'titles.csv: строк 3, принято 1, отклонено 2, ' \
+            'неизменённых пачек 0' in stdout, (
+            'Проверьте, что в режиме `--incremental` пачки с отклонёнными '
+            'строками загружаются повторно.'
+        )
+        assert 'titles.csv:2: id: запись 1 уже существует' not in stderr
+        title = Title.objects.get(pk=1)
+        assert (title.reviews_count, title.score_sum) == (2, 19)
+
+    def test_04_incremental_retries_rejected_rows(self, data_dir):
+        run_load_csv(data_dir, '--incremental')
+        (data_dir / 'category.csv').write_text(
+            CSV_FILES['category.csv'].replace('1,Книга', '7,Книга'),
+            encoding='utf-8'
+        )
+
+        stdout, _ = run_load_csv(data_dir, '--incremental')
+
+        assert set(Title.objects.values_list('pk', flat=True)) == {1, 3}, (
+            'Проверьте, что в режиме `--incremental` строки, отклонённые '
+            'при прошлой загрузке, загружаются после исправления причины.'
+        )
+        assert 'titles.csv: без изменений' not in stdout
+
+    def test_05_incremental_rebuilds_affected_titles(self, data_dir,
+                                                     monkeypatch):
+        rebuilt = []
+        rebuild = TitleQuerySet.rebuild_review_stats
+
+        def record(queryset, *args, **kwargs):
+            rebuilt.append(set(queryset.values_list('pk', flat=True)))
+            return rebuild(queryset, *args, **kwargs)
+
+        monkeypatch.setattr(TitleQuerySet, 'rebuild_review_stats', record)
+        for filename, lines in (('titles.csv', 2), ('review.csv', 4)):
+            (data_dir / filename).write_text(
+                ''.join(CSV_FILES[filename].splitlines(True)[:lines]),
+                encoding='utf-8'
+            )
+        run_load_csv(data_dir, '--incremental')
+        run_load_csv(data_dir, '--incremental')
+        assert rebuilt == [{1}], (
+            'Проверьте, что в режиме `--incremental` агрегаты не '
+            'пересчитываются, если произведения и отзывы не менялись.'
+        )
+
+        Title.objects.create(pk=5, name='Без отзывов', year=2000)
+        (data_dir / 'review.csv').write_text(
+            ''.join(CSV_FILES['review.csv'].splitlines(True)[:4]).replace(
+                'Отлично,100,10', 'Плохо,100,1'
+            ),
+            encoding='utf-8'
+        )
+        run_load_csv(data_dir, '--incremental')
+        assert rebuilt[1:] == [{1}], (
+            'Проверьте, что в режиме `--incremental` пересчитываются только '
+            'произведения, отзывы которых загружены.'
+        )
+        assert Title.objects.get(pk=1).score_sum == 10
+
+    def test_06_reload_invalidates_conditional_get(self, client, data_dir):
+        run_load_csv(data_dir, '--incremental')
+        urls = ('/api/v1/titles/1/', '/api/v1/titles/1/reviews/')
+        etags = [client.get(url)['ETag'] for url in urls]
+        (data_dir / 'review.csv').write_text(
+            CSV_FILES['review.csv'].replace('Отлично,100,10', 'Плохо,100,1'),
+            encoding='utf-8'
+        )
+
+        run_load_csv(data_dir, '--incremental')
+
+        for url, etag in zip(urls, etags):
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == HTTPStatus.OK, (
+                f'Проверьте, что после загрузки CSV GET-запрос к `{url}` с '
+                'прежним `If-None-Match` возвращает новые данные.'
+            )
+        assert client.get(urls[0]).json()['rating'] == 5
+
+    def test_07_reload_invalidates_cached_lists(self, client, data_dir):
+        run_load_csv(data_dir, '--incremental')
+        for url in ('/api/v1/titles/', '/api/v1/categories/'):
+            client.get(url)
+            assert client.get(url)['X-Cache'] == 'HIT'
+        (data_dir / 'review.csv').write_text(
+            CSV_FILES['review.csv'].replace('Отлично,100,10', 'Плохо,100,1'),
+            encoding='utf-8'
+        )
+        (data_dir / 'category.csv').write_text(
+            CSV_FILES['category.csv'].replace('Фильм', 'Кино'),
+            encoding='utf-8'
+        )
+
+        run_load_csv(data_dir, '--incremental')
+
+        response = client.get('/api/v1/titles/')
+        assert response['X-Cache'] == 'MISS', (
+            'Проверьте, что загрузка CSV сбрасывает кэш списка произведений.'
+        )
+        assert response.json()['results'][0]['rating'] == 5
+        response = client.get('/api/v1/categories/')
+        assert response['X-Cache'] == 'MISS'
+        assert response.json()['results'][0]['name'] == 'Кино'
@@ -0,0 +1,69 @@
+import re
+from http import HTTPStatus
+
+import pytest
+
+from api.metrics import registry
+from tests.utils import create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test09Metrics:
+
+    METRICS_URL = '/api/v1/metrics/'
+
+    def get_sample(self, text, name, **labels):
+        label_text = ','.join(
+            f'{key}="{value}"' for key, value in labels.items()
+        )
+        match = re.search(
+            rf'^{name}{{{re.escape(label_text)}}} (\S+)$', text, re.M
+        )
+        assert match, f'Проверьте, что метрики содержат `{name}`.'
+        return float(match.group(1))
+
+    def test_01_metrics_permissions(self, client, user_client, admin_client):
+        response = client.get(self.METRICS_URL)
+        assert response.status_code == HTTPStatus.UNAUTHORIZED
+        response = user_client.get(self.METRICS_URL)
+        assert response.status_code == HTTPStatus.FORBIDDEN, (
+            f'Проверьте, что `{self.METRICS_URL}` доступен только '
+            'администратору.'
+        )
+        response = admin_client.get(self.METRICS_URL)
+        assert response.status_code == HTTPStatus.OK
+        assert response['Content-Type'].startswith('text/plain')
+
+    def test_02_metrics_by_route(self, client, admin_client):
+        create_titles(admin_client)
+        registry.clear()
+        client.get('/api/v1/titles/')
+        response = client.get('/api/v1/titles/')
+        titles_size = len(response.content)
+
+        text = admin_client.get(self.METRICS_URL).content.decode()
+        route = 'api:titles-list'
+        assert self.get_sample(
+            text, 'api_requests_total', route=route, status=200
+        ) == 2, (
+            'Проверьте, что метрики группируются по имени маршрута.'
+        )
+        assert self.get_sample(
+            text, 'api_request_duration_seconds_bucket', route=route,
+            le='+Inf'
+        ) == 2
+        assert self.get_sample(
+            text, 'api_db_queries_total', route=route
+        ) > 0, 'Проверьте, что учитываются запросы к БД.'
+        assert self.get_sample(
+            text, 'api_serializer_duration_seconds_sum', route=route
+        ) > 0, 'Проверьте, что учитывается время сериализации.'
+        assert self.get_sample(
+            text, 'api_response_bytes_total', route=route
+        ) == 2 * titles_size
+        assert self.get_sample(
+            text, 'api_cache_lookups_total', resource='titles', outcome='hit'
+        ) == 1
+        assert self.get_sample(
+            text, 'api_email_outbox', state='pending'
+        ) == 0
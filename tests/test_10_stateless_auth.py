@@ -0,0 +1,77 @@
+from http import HTTPStatus
+
+import pytest
+from django.contrib.auth.tokens import default_token_generator
+from rest_framework.test import APIClient
+from rest_framework.views import APIView
+
+from api.authentication import StatelessJWTAuthentication, user_changes
+from reviews.models import Title
+
+
+@pytest.fixture
+def stateless_auth(monkeypatch):
+    monkeypatch.setattr(
+        APIView, 'authentication_classes', (StatelessJWTAuthentication,)
+    )
+    user_changes.clear()
+
+
+def get_client(user):
+    response = APIClient().post('/api/v1/auth/token/', data={
+        'username': user.username,
+        'confirmation_code': default_token_generator.make_token(user),
+    })
+    assert response.status_code == HTTPStatus.OK
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {response.json()["token"]}')
+    return client
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.usefixtures('stateless_auth')
+class Test10StatelessAuth:
+
+    USERS_URL = '/api/v1/users/'
+
+    def test_01_no_user_query(self, admin, user, query_budget):
+        admin_client = get_client(admin)
+        with query_budget('users-list'):
+            response = admin_client.get(self.USERS_URL)
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что при аутентификации без запроса к БД роль '
+            'берётся из утверждений токена.'
+        )
+        response = admin_client.get(f'{self.USERS_URL}me/')
+        assert response.json()['username'] == admin.username
+
+        title = Title.objects.create(
+            name='Произведение', year=2000, description=''
+        )
+        user_client = get_client(user)
+        url = f'/api/v1/titles/{title.pk}/reviews/'
+        response = user_client.post(url, data={'text': 'Отзыв', 'score': 5})
+        assert response.status_code == HTTPStatus.CREATED
+        assert response.json()['author'] == user.username
+        response = user_client.patch(
+            f'{url}{response.json()["id"]}/', data={'score': 6}
+        )
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что автор может изменить свой отзыв при '
+            'аутентификации без запроса к БД.'
+        )
+
+    def test_02_user_changes_apply_to_issued_tokens(self, admin):
+        admin_client = get_client(admin)
+        admin.role = 'user'
+        admin.save()
+        response = admin_client.get(self.USERS_URL)
+        assert response.status_code == HTTPStatus.FORBIDDEN, (
+            'Проверьте, что смена роли действует на уже выданные токены.'
+        )
+
+        admin.delete()
+        response = admin_client.get(self.USERS_URL)
+        assert response.status_code == HTTPStatus.UNAUTHORIZED, (
+            'Проверьте, что токены удалённого пользователя отклоняются.'
+        )
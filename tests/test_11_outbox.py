@@ -0,0 +1,101 @@
+from io import StringIO
+
+import pytest
+from django.core import mail
+from django.core.mail import EmailMessage
+from django.core.management import call_command
+from django.utils import timezone
+
+from users.management.commands import send_outbox as command
+from users.models import OutboxEmail
+
+
+def send_outbox(*args):
+    stdout, stderr = StringIO(), StringIO()
+    call_command('send_outbox', *args, stdout=stdout, stderr=stderr)
+    return stdout.getvalue(), stderr.getvalue()
+
+
+@pytest.fixture
+def outbox_settings(settings, tmp_path):
+    settings.EMAIL_OUTBOX = True
+    settings.EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+    settings.EMAIL_FILE_PATH = tmp_path
+    return tmp_path
+
+
+@pytest.mark.django_db(transaction=True)
+class Test11Outbox:
+
+    URL_SIGNUP = '/api/v1/auth/signup/'
+
+    def signup(self, client, count):
+        for idx in range(count):
+            client.post(self.URL_SIGNUP, data={
+                'username': f'user{idx}', 'email': f'user{idx}@yamdb.fake'
+            })
+
+    def test_01_signup_writes_outbox(self, client, outbox_settings,
+                                     monkeypatch):
+        self.signup(client, 3)
+        connections = []
+        original_get_connection = command.get_connection
+
+        def get_connection(*args, **kwargs):
+            connections.append(original_get_connection(*args, **kwargs))
+            return connections[-1]
+
+        monkeypatch.setattr(command, 'get_connection', get_connection)
+
+        assert not mail.outbox and not any(outbox_settings.iterdir()), (
+            'Проверьте, что при EMAIL_OUTBOX регистрация не отправляет '
+            'письмо в обработчике запроса.'
+        )
+        assert OutboxEmail.objects.count() == 3
+
+        stdout, _ = send_outbox('--workers', '2', '--batch-size', '2')
+
+        sent = ''.join(
+            path.read_text() for path in outbox_settings.iterdir()
+        )
+        assert sent.count('Ваш код подтверждения') == 3, (
+            'Проверьте, что команда `send_outbox` отправляет все письма.'
+        )
+        assert len(connections) == 2, (
+            'Проверьте, что пачка писем отправляется через одно соединение.'
+        )
+        assert not OutboxEmail.objects.filter(sent_at__isnull=True).exists()
+        assert 'Отправлено 3' in stdout
+        send_outbox()
+        assert sent == ''.join(
+            path.read_text() for path in outbox_settings.iterdir()
+        ), 'Проверьте, что отправленные письма не отправляются повторно.'
+
+    def test_02_failed_email_is_retried_later(self, client, outbox_settings,
+                                              monkeypatch):
+        self.signup(client, 2)
+        send = EmailMessage.send
+
+        def failing_send(message, *args, **kwargs):
+            if message.to == ['user1@yamdb.fake']:
+                raise ConnectionError('отказ сервера')
+            return send(message, *args, **kwargs)
+
+        monkeypatch.setattr(EmailMessage, 'send', failing_send)
+        stdout, stderr = send_outbox()
+
+        failed = OutboxEmail.objects.get(recipient='user1@yamdb.fake')
+        assert failed.sent_at is None
+        assert failed.attempts == 1
+        assert failed.last_error == 'отказ сервера'
+        assert failed.next_attempt_at > timezone.now(), (
+            'Проверьте, что неудачная отправка откладывается для повтора.'
+        )
+        assert 'user1@yamdb.fake: отказ сервера' in stderr
+        assert 'Отправлено 1, отложено для повтора 1' in stdout
+
+        OutboxEmail.objects.update(next_attempt_at=timezone.now())
+        monkeypatch.setattr(EmailMessage, 'send', send)
+        send_outbox()
+        failed.refresh_from_db()
+        assert failed.sent_at is not None and failed.attempts == 2
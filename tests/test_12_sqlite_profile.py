@@ -0,0 +1,51 @@
+from copy import deepcopy
+
+import pytest
+from django.db import connections
+
+
+def open_connection(path):
+    default = connections['default']
+    settings_dict = deepcopy(default.settings_dict)
+    settings_dict['NAME'] = str(path)
+    wrapper = type(default)(settings_dict, alias='default')
+    wrapper.ensure_connection()
+    return wrapper
+
+
+def pragma(wrapper, name):
+    return wrapper.connection.execute(f'PRAGMA {name}').fetchone()[0]
+
+
+@pytest.mark.django_db
+class Test12SQLiteProfile:
+
+    def test_01_throughput_pragmas(self, settings, tmp_path):
+        settings.SQLITE_PRAGMAS = (
+            settings.SQLITE_PROFILES['throughput']['PRAGMAS']
+        )
+        wrapper = open_connection(tmp_path / 'throughput.sqlite3')
+        try:
+            assert pragma(wrapper, 'journal_mode') == 'wal', (
+                'Проверьте, что профиль `throughput` включает журнал WAL '
+                'для каждого нового соединения.'
+            )
+            assert pragma(wrapper, 'synchronous') == 1
+            assert pragma(wrapper, 'busy_timeout') == 5000
+            assert pragma(wrapper, 'cache_size') == -64000
+            assert pragma(wrapper, 'temp_store') == 2
+        finally:
+            wrapper.close()
+
+    def test_02_default_profile_keeps_pragmas(self, settings, tmp_path):
+        settings.SQLITE_PRAGMAS = settings.SQLITE_PROFILES['default'][
+            'PRAGMAS'
+        ]
+        wrapper = open_connection(tmp_path / 'default.sqlite3')
+        try:
+            assert pragma(wrapper, 'journal_mode') == 'delete', (
+                'Проверьте, что профиль по умолчанию не меняет настройки '
+                'SQLite.'
+            )
+        finally:
+            wrapper.close()
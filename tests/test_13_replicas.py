@@ -0,0 +1,97 @@
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+
+from api.metrics import registry
+from reviews.models import Title
+from tests.utils import create_titles
+
+REPLICA = 'replica1'
+
+
+@pytest.fixture
+def replica(settings, tmp_path):
+    default = connections['default']
+    wrapper = type(default)(
+        {**default.settings_dict, 'NAME': str(tmp_path / 'replica.sqlite3')},
+        alias=REPLICA,
+    )
+    connections[REPLICA] = wrapper
+    settings.DATABASE_REPLICAS = [REPLICA]
+    yield wrapper
+    wrapper.close()
+    del connections[REPLICA]
+
+
+def sync_replicas():
+    call_command('sync_replicas', stdout=StringIO())
+
+
+@pytest.mark.django_db(transaction=True)
+class Test13Replicas:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    def get_titles(self, client):
+        with CaptureQueriesContext(connections['default']) as primary:
+            response = client.get(self.TITLES_URL)
+        assert response.status_code == HTTPStatus.OK
+        return response, len(primary)
+
+    def test_01_reads_go_to_replica(self, client, admin_client, replica):
+        registry.clear()
+        _, categories, genres = create_titles(admin_client)
+        sync_replicas()
+
+        with CaptureQueriesContext(replica) as replica_queries:
+            response, primary_queries = self.get_titles(client)
+        assert response.json()['count'] == 2
+        assert replica_queries and not primary_queries, (
+            'Проверьте, что безопасные запросы читают из реплики.'
+        )
+
+        response = admin_client.post(self.TITLES_URL, data={
+            'name': 'Чужой', 'year': 1979, 'description': 'Космос',
+            'genre': [genres[0]['slug']], 'category': categories[0]['slug'],
+        })
+        assert response.status_code == HTTPStatus.CREATED
+        for _ in range(2):
+            response, _ = self.get_titles(client)
+            assert response.json()['count'] == 2
+            assert response['X-Cache'] == 'MISS', (
+                'Проверьте, что ответы, построенные по отстающей реплике, '
+                'не кэшируются.'
+            )
+            assert 'ETag' not in response
+        response, primary_queries = self.get_titles(admin_client)
+        assert response.json()['count'] == 3 and primary_queries, (
+            'Проверьте, что после записи клиент читает из основной базы и '
+            'видит свои изменения.'
+        )
+
+        sync_replicas()
+        assert Title.objects.using(REPLICA).count() == 3, (
+            'Проверьте, что команда `sync_replicas` обновляет реплики.'
+        )
+
+        metrics = registry.render()
+        for database, reason, count in (
+            (REPLICA, 'replica', 3), ('default', 'pinned', 1),
+            ('default', 'write', 3),
+        ):
+            sample = (
+                'api_db_routing_total{route="api:titles-list",'
+                f'database="{database}",reason="{reason}"}} {count}'
+            )
+            assert sample in metrics, (
+                f'Проверьте, что метрики содержат `{sample}`.'
+            )
+
+    def test_02_sync_requires_replicas(self, settings):
+        settings.DATABASE_REPLICAS = []
+        with pytest.raises(CommandError):
+            sync_replicas()
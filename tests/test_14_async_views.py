@@ -0,0 +1,150 @@
+import re
+from http import HTTPStatus
+from importlib import import_module, reload
+from types import SimpleNamespace
+
+import pytest
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.db import connection
+from django.test import AsyncClient
+from django.test.utils import CaptureQueriesContext
+from django.urls import clear_url_caches, resolve
+
+from api.metrics import registry
+from tests.utils import create_read_urls, get_uncached
+
+
+def reload_urls():
+    for module in ('api.urls', 'api_yamdb.urls'):
+        reload(import_module(module))
+    clear_url_caches()
+
+
+@pytest.fixture
+def async_views(settings):
+    enabled = settings.API_ASYNC_VIEWS
+    settings.API_ASYNC_VIEWS = True
+    reload_urls()
+    yield
+    settings.API_ASYNC_VIEWS = enabled
+    reload_urls()
+
+
+def async_get(url, **headers):
+    return async_to_sync(AsyncClient().get)(url, headers=headers)
+
+
+async_client = SimpleNamespace(get=async_get)
+
+
+@pytest.mark.django_db
+@pytest.mark.filterwarnings('ignore:Converter')
+class Test14AsyncViews:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    def get_urls(self, admin_client, admin):
+        urls = create_read_urls(admin_client, {admin: admin_client})
+        return (
+            urls['titles'],
+            f'{urls["titles_by_genre"]}&ordering=-year',
+            f'{self.TITLES_URL}?page=2',
+            urls['title'],
+            f'{self.TITLES_URL}999/',
+            f'{self.TITLES_URL}abc/',
+            urls['reviews'],
+            f'{urls["reviews"]}?pagination=cursor',
+            urls['review'],
+            f'{self.TITLES_URL}999/reviews/',
+            urls['comments'],
+            urls['comment'],
+        )
+
+    def test_01_async_views_are_opt_in(self, settings, async_views):
+        for url in (self.TITLES_URL, f'{self.TITLES_URL}1/reviews/1/'):
+            assert iscoroutinefunction(resolve(url).func), (
+                'Проверьте, что при `API_ASYNC_VIEWS` списки и объекты '
+                'отдаются асинхронными представлениями.'
+            )
+        assert not iscoroutinefunction(
+            resolve(f'{self.TITLES_URL}top/').func
+        )
+        settings.API_ASYNC_VIEWS = False
+        reload_urls()
+        assert not iscoroutinefunction(resolve(self.TITLES_URL).func), (
+            'Проверьте, что без `API_ASYNC_VIEWS` представления остаются '
+            'синхронными.'
+        )
+
+    def test_02_async_responses_match_sync(self, client, admin_client,
+                                           admin, settings):
+        urls = self.get_urls(admin_client, admin)
+        expected = [client.get(url) for url in urls]
+
+        settings.API_ASYNC_VIEWS = True
+        reload_urls()
+        try:
+            for url, sync_response in zip(urls, expected):
+                response, _ = get_uncached(async_client, url)
+                assert (
+                    response.status_code, response.content
+                ) == (sync_response.status_code, sync_response.content), (
+                    f'Проверьте, что асинхронный GET-запрос к `{url}` '
+                    'возвращает тот же ответ, что и синхронный.'
+                )
+            response = async_get(
+                self.TITLES_URL, authorization='Bearer invalid'
+            )
+            assert response.status_code == HTTPStatus.UNAUTHORIZED
+        finally:
+            settings.API_ASYNC_VIEWS = False
+            reload_urls()
+
+    def test_03_async_views_keep_cache_and_writes(self, admin_client,
+                                                  admin, async_views):
+        registry.clear()
+        url = self.get_urls(admin_client, admin)[3]
+        response = async_get(url)
+        assert response.status_code == HTTPStatus.OK
+        with CaptureQueriesContext(connection) as queries:
+            response = async_get(url, if_none_match=response['ETag'])
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+        assert not queries, (
+            'Проверьте, что асинхронное представление отдаёт ответ 304 без '
+            'запросов к БД.'
+        )
+        async_get(self.TITLES_URL)
+        assert async_get(self.TITLES_URL)['X-Cache'] == 'HIT'
+
+        response = admin_client.patch(url, data={'name': 'Терминатор 2'})
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что запросы на запись обрабатываются синхронным '
+            'кодом и при включённых асинхронных представлениях.'
+        )
+        assert async_get(url).json()['name'] == 'Терминатор 2'
+        assert (
+            'api_requests_total{route="api:titles-detail",status="304"} 1'
+            in registry.render()
+        ), 'Проверьте, что асинхронные запросы попадают в метрики.'
+
+    def test_04_async_requests_count_queries(self, admin_client,
+                                             admin, settings):
+        urls = self.get_urls(admin_client, admin)
+        samples = {}
+        for enabled in (False, True):
+            settings.API_ASYNC_VIEWS = enabled
+            reload_urls()
+            registry.clear()
+            for url in (urls[0], urls[7]):
+                get_uncached(async_client, url)
+            samples[enabled] = re.findall(
+                r'^api_db_queries_total{route="(\S+)"} (\S+)$',
+                registry.render(), re.M
+            )
+        settings.API_ASYNC_VIEWS = False
+        reload_urls()
+        assert samples[True] == samples[False] and len(samples[True]) == 2, (
+            'Проверьте, что запросы к БД асинхронных представлений '
+            'учитываются в метриках так же, как синхронных.'
+        )
+        assert all(float(value) > 0 for _, value in samples[True])
@@ -0,0 +1,85 @@
+from types import SimpleNamespace
+
+import pytest
+from rest_framework.renderers import JSONRenderer
+
+from api.renderers import FastJSONRenderer
+from reviews.models import Comment, Review, Title
+from tests.utils import create_read_urls, get_uncached
+
+TRICKY_TEXT = 'Строка\u2028абзац\u2029 "кавычки" \\ \t\x01 😀'
+
+
+@pytest.mark.django_db
+class Test15FastJSON:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    def get_urls(self, admin_client, admin, user_client, user,
+                 moderator_client, moderator):
+        urls = create_read_urls(admin_client, {
+            admin: admin_client,
+            user: user_client,
+            moderator: moderator_client,
+        })
+        title = Title.objects.create(
+            name=TRICKY_TEXT, year=None, description=TRICKY_TEXT
+        )
+        review = Review.objects.create(
+            title=title, author=user, text=TRICKY_TEXT, score=7
+        )
+        Comment.objects.create(review=review, author=admin, text=TRICKY_TEXT)
+        return (
+            urls['titles'],
+            f'{self.TITLES_URL}?ordering=-rating',
+            urls['titles_by_genre'],
+            f'{self.TITLES_URL}?name=Строка',
+            urls['reviews'],
+            f'{urls["reviews"]}?pagination=cursor',
+            urls['comments'],
+            f'{self.TITLES_URL}{title.pk}/reviews/',
+            f'{self.TITLES_URL}{title.pk}/reviews/{review.pk}/comments/',
+        )
+
+    def test_01_fast_lists_match_serializers(
+        self, client, admin_client, admin, user_client, user,
+        moderator_client, moderator, settings
+    ):
+        urls = self.get_urls(
+            admin_client, admin, user_client, user, moderator_client,
+            moderator
+        )
+        for url in urls:
+            settings.API_FAST_JSON = False
+            expected, expected_queries = get_uncached(client, url)
+            settings.API_FAST_JSON = True
+            response, queries = get_uncached(client, url)
+            assert response.renderer_context['view'].fast_json, (
+                f'Проверьте, что список `{url}` строится по плану '
+                'сериализатора при `API_FAST_JSON`.'
+            )
+            assert response.content == expected.content, (
+                f'Проверьте, что быстрый ответ на `{url}` совпадает с '
+                'ответом сериализатора байт в байт.'
+            )
+            assert len(queries) <= len(expected_queries), (
+                f'Проверьте, что быстрый ответ на `{url}` не делает '
+                'лишних запросов к БД.'
+            )
+
+    def test_02_renderer_matches_json_renderer(self):
+        data = {
+            'count': 1,
+            'next': None,
+            'results': [{'text': TRICKY_TEXT, 'flag': True, 'genre': []}],
+        }
+        context = {'view': SimpleNamespace(fast_json=True)}
+        assert FastJSONRenderer().render(
+            data, 'application/json', context
+        ) == JSONRenderer().render(data, 'application/json', context), (
+            'Проверьте, что FastJSONRenderer кодирует данные так же, как '
+            'JSONRenderer, включая U+2028 и U+2029.'
+        )
+        assert FastJSONRenderer().render(
+            data, 'application/json; indent=4', context
+        ) == JSONRenderer().render(data, 'application/json; indent=4')
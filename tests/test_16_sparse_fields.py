@@ -0,0 +1,98 @@
+from http import HTTPStatus
+
+import pytest
+
+from tests.utils import create_read_urls, get_uncached
+
+
+@pytest.mark.django_db
+class Test16SparseFields:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    def get(self, client, url):
+        response, queries = get_uncached(client, url)
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что GET-запрос к `{url}` возвращает ответ со '
+            'статусом 200.'
+        )
+        return response, queries
+
+    def get_urls(self, admin_client, admin, user_client, user):
+        urls = create_read_urls(admin_client, {
+            admin: admin_client,
+            user: user_client,
+        })
+        return (
+            (urls['titles'], ('id', 'name', 'rating')),
+            (f'{urls["titles"]}?ordering=-rating', ('name', 'category')),
+            (urls['title'], ('id', 'genre')),
+            (urls['reviews'], ('id', 'score')),
+            (f'{urls["reviews"]}?pagination=cursor&page_size=1', ('text',)),
+            (urls['comments'], ('id', 'author')),
+        )
+
+    @pytest.mark.parametrize('fast_json', (False, True))
+    def test_01_fields_trim_output_and_sql(
+        self, client, admin_client, admin, user_client, user, settings,
+        fast_json
+    ):
+        settings.API_FAST_JSON = fast_json
+        urls = self.get_urls(admin_client, admin, user_client, user)
+        for url, fields in urls:
+            full, full_queries = self.get(client, url)
+            separator = '&' if '?' in url else '?'
+            sparse_url = f'{url}{separator}fields={",".join(fields)}'
+            response, queries = self.get(client, sparse_url)
+            full_data, data = full.json(), response.json()
+            expected = [
+                {name: item[name] for name in fields}
+                for item in full_data.get('results', [full_data])
+            ]
+            assert data.get('results', [data]) == expected, (
+                f'Проверьте, что ответ на `{sparse_url}` содержит только '
+                'запрошенные поля с теми же значениями.'
+            )
+            if 'next' in full_data:
+                assert (data['next'] is None) == (full_data['next'] is None)
+            assert len(response.content) < len(full.content), (
+                f'Проверьте, что ответ на `{sparse_url}` короче полного.'
+            )
+            assert len(queries) <= len(full_queries), (
+                f'Проверьте, что запрос к `{sparse_url}` не делает лишних '
+                'запросов к БД.'
+            )
+
+    def test_02_titles_skip_genre_and_category(
+        self, client, admin_client, admin, user_client, user
+    ):
+        self.get_urls(admin_client, admin, user_client, user)
+        full, full_queries = self.get(client, self.TITLES_URL)
+        response, queries = self.get(
+            client, f'{self.TITLES_URL}?fields=id,name,rating'
+        )
+        assert len(queries) == len(full_queries) - 1, (
+            'Проверьте, что без поля `genre` список произведений не '
+            'загружает жанры отдельным запросом.'
+        )
+        sql = '\n'.join(query['sql'] for query in queries)
+        assert 'description' not in sql and 'reviews_category' not in sql, (
+            'Проверьте, что `?fields=` загружает только столбцы '
+            'запрошенных полей, без описания и категории.'
+        )
+        assert len(response.content) * 2 < len(full.content), (
+            'Проверьте, что `?fields=id,name,rating` заметно сокращает '
+            'ответ списка произведений.'
+        )
+
+    def test_03_unknown_fields(
+        self, client, admin_client, admin, user_client, user
+    ):
+        self.get_urls(admin_client, admin, user_client, user)
+        for fields in ('id,unknown', '', ','):
+            response = client.get(f'{self.TITLES_URL}?fields={fields}')
+            assert response.status_code == HTTPStatus.BAD_REQUEST, (
+                'Проверьте, что при недопустимом значении `?fields=` '
+                'возвращается ответ со статусом 400.'
+            )
+            assert 'fields' in response.json()
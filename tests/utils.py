@@ -1,5 +1,10 @@
 from http import HTTPStatus
 
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
 
 check_name_and_slug_patterns = (
     (
@@ -281,6 +286,32 @@ def create_comments(admin_client, authors_map):
     return result, reviews, titles
 
 
+def create_read_urls(admin_client, authors_map):
+    """Создаёт комментарии с отзывами и возвращает адреса для GET-запросов."""
+    comments, reviews, titles = create_comments(admin_client, authors_map)
+    titles_url = '/api/v1/titles/'
+    title_url = f'{titles_url}{titles[0]["id"]}/'
+    reviews_url = f'{title_url}reviews/'
+    comments_url = f'{reviews_url}{reviews[0]["id"]}/comments/'
+    return {
+        'titles': titles_url,
+        'titles_by_genre': f'{titles_url}?genre={titles[0]["genre"][0]}',
+        'title': title_url,
+        'reviews': reviews_url,
+        'review': f'{reviews_url}{reviews[0]["id"]}/',
+        'comments': comments_url,
+        'comment': f'{comments_url}{comments[0]["id"]}/',
+    }
+
+
+def get_uncached(client, url):
+    """GET-запрос мимо кэша ответов API; возвращает ответ и запросы к БД."""
+    caches[settings.API_CACHE_ALIAS].clear()
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url)
+    return response, queries
+
+
 def check_fields(obj_type, url_pattern, obj, expected_data, detail=False):
     obj_types = {
         'comment': 'комментария(ев) к отзыву',